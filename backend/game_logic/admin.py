@@ -5,6 +5,7 @@ from .models import PlayerProfile, Room, Enemy
 class PlayerProfileAdmin(admin.ModelAdmin):
     # Columns to show in the list view
     list_display = ('user', 'solana_wallet', 'high_score')
+    list_select_related = ('user',)
     # Add a search bar for usernames and wallets
     search_fields = ('user__username', 'solana_wallet')
     # Add a filter sidebar
@@ -19,6 +20,12 @@ class RoomAdmin(admin.ModelAdmin):
 @admin.register(Enemy)
 class EnemyAdmin(admin.ModelAdmin):
     list_display = ('enemy_type', 'room', 'health', 'is_alive')
-    list_filter = ('enemy_type', 'is_alive', 'room')
+    # Join the room in the changelist query instead of one query per row
+    list_select_related = ('room',)
+    # A 'room' filter would list every room in the sidebar; search instead
+    list_filter = ('enemy_type', 'is_alive')
+    search_fields = ('room__room_id', 'enemy_type')
+    # Room picker on the edit form searches instead of rendering every room
+    autocomplete_fields = ('room',)
     # Allows you to edit health directly from the list view
     list_editable = ('health', 'is_alive')
\ No newline at end of file
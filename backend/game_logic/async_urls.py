@@ -0,0 +1,15 @@
+from django.urls import path
+from . import async_views
+
+# Same routes as urls.py, served by the async views under ASGI
+urlpatterns = [
+    path('generate/room/',        async_views.generate_room,    name='generate_room'),
+    path('generate/rooms/',       async_views.generate_rooms,   name='generate_rooms'),
+    path('generate/run/',         async_views.start_run,        name='start_run'),
+    path('generate/next-room/',   async_views.next_room,        name='next_room'),
+    path('generate/kill-enemy/',  async_views.kill_enemy,       name='kill_enemy'),
+    path('generate/combat-events/', async_views.combat_events, name='combat_events'),
+    path('generate/leave-room/',  async_views.leave_room,       name='leave_room'),
+    path('generate/enemy/',       async_views.generate_enemy,   name='generate_enemy'),
+    path('leaderboard/',          async_views.leaderboard_view, name='leaderboard'),
+]
@@ -0,0 +1,189 @@
+"""
+Async-native game endpoints, served by src/asgi.py (see src/urls_async.py).
+
+Same URLs, request and response shapes as the DRF views: both call the
+request flows in views.py and differ only in how they apply the flows' DB
+effects. Here that's the async ORM, so a request never holds a thread while
+it waits on the database. Room generation is pure CPU work in the
+microsecond range and runs inline on the event loop. The JWT, when there is
+one, is only decoded when a flow actually needs the user.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import leaderboard, persistence, views
+from .persistence import persistence_enabled
+from .renderers import FastJSONRenderer
+from .tile_encoding import negotiate_tile_encoding
+
+_JWT      = JWTAuthentication()
+_RENDERER = FastJSONRenderer()
+
+
+class _BadRequest(Exception):
+    pass
+
+
+def _json(payload: dict, code: int = 200) -> HttpResponse:
+    # Same renderer as the DRF views
+    return HttpResponse(_RENDERER.render(payload), status=code, content_type='application/json')
+
+
+def _request_data(request) -> dict:
+    """The POST body as a dict, like DRF's request.data."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as e:
+            raise _BadRequest(f'JSON parse error - {e}') from e
+        if not isinstance(data, dict):
+            raise _BadRequest('JSON body must be an object.')
+        return data
+    return request.POST
+
+
+async def _aget_user(request):
+    """
+    The user named by the request's Bearer token, or None when there is no
+    token. Raises InvalidToken for a bad one, as DRF's JWTAuthentication does.
+    """
+    header = _JWT.get_header(request)
+    if header is None:
+        return None
+    raw = _JWT.get_raw_token(header)
+    if raw is None:
+        return None
+    return await _auser_for_token(raw)
+
+
+async def _auser_for_token(raw):
+    """The active user a raw access token names; InvalidToken otherwise."""
+    token   = _JWT.get_validated_token(raw)
+    user_id = token.get(jwt_settings.USER_ID_CLAIM)
+    user    = await get_user_model().objects.filter(
+        **{jwt_settings.USER_ID_FIELD: user_id}, is_active=True
+    ).afirst()
+    if user is None:
+        raise InvalidToken('User not found')
+    return user
+
+
+async def _aapply_effects(outcome: views.Outcome, auser) -> views.Outcome:
+    """
+    views.apply_effects() with the async ORM. `auser` is an async callable
+    returning the user (or None), only awaited when a score is recorded.
+    """
+    for name, *args in outcome.effects:
+        if name == 'record_score':
+            user = await auser()
+            if user is not None:
+                ranked = await leaderboard.arecord_score(user, *args)
+                if ranked is not None:
+                    outcome.payload['rank'], outcome.payload['high_score'] = ranked
+        elif persistence_enabled():
+            # transaction.atomic() has no async form; one hop for the whole write
+            await sync_to_async(getattr(persistence, name))(*args)
+    return outcome
+
+
+async def _arespond(flow, request, *args) -> HttpResponse:
+    try:
+        outcome = await _aapply_effects(flow(*args), functools.partial(_aget_user, request))
+    except (InvalidToken, TokenError) as e:
+        return _json({'detail': str(e)}, 401)
+    return _json(outcome.payload, outcome.status)
+
+
+async def _arespond_seeded(flow, request, etag_keys) -> HttpResponse:
+    """_arespond() for room GETs, with the ETag handling of views._respond_seeded()."""
+    encoding = negotiate_tile_encoding(request)
+    etag     = views.seeded_etag(request.GET, encoding, etag_keys)
+    if etag is not None and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return views.seeded_headers(HttpResponseNotModified(), etag)
+    return views.seeded_headers(await _arespond(flow, request, request.GET, encoding), etag)
+
+
+def _with_body(view):
+    """Parse the JSON body up front and answer 400 if it's malformed."""
+    @functools.wraps(view)
+    async def wrapper(request):
+        try:
+            data = _request_data(request)
+        except _BadRequest as e:
+            return _json({'detail': str(e)}, 400)
+        return await view(request, data)
+    return wrapper
+
+
+# =============================================================================
+#  VIEWS
+# =============================================================================
+
+@require_GET
+async def generate_room(request):
+    return await _arespond_seeded(views.generate_room_flow, request, ('rooms_cleared', 'room_type'))
+
+
+@require_GET
+async def generate_rooms(request):
+    return await _arespond_seeded(views.generate_rooms_flow, request, ('from', 'count'))
+
+
+@csrf_exempt
+@require_POST
+@_with_body
+async def kill_enemy(request, data):
+    return await _arespond(views.kill_enemy_flow, request, data)
+
+
+@csrf_exempt
+@require_POST
+@_with_body
+async def combat_events(request, data):
+    return await _arespond(views.combat_events_flow, request, data)
+
+
+@csrf_exempt
+@require_POST
+@_with_body
+async def start_run(request, data):
+    return await _arespond(views.start_run_flow, request, negotiate_tile_encoding(request), data)
+
+
+@csrf_exempt
+@require_POST
+@_with_body
+async def next_room(request, data):
+    return await _arespond(views.next_room_flow, request, data, negotiate_tile_encoding(request))
+
+
+@csrf_exempt
+@require_POST
+@_with_body
+async def leave_room(request, data):
+    return await _arespond(views.leave_room_flow, request, data, negotiate_tile_encoding(request))
+
+
+@require_GET
+async def generate_enemy(request):
+    return await _arespond(views.generate_enemy_flow, request, request.GET)
+
+
+@require_GET
+async def leaderboard_view(request):
+    try:
+        user = await _aget_user(request)
+    except (InvalidToken, TokenError) as e:
+        return _json({'detail': str(e)}, 401)
+    await leaderboard.aensure_loaded()
+    return await _arespond(views.leaderboard_flow, request, request.GET, user)
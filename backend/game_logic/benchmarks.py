@@ -0,0 +1,232 @@
+"""
+Micro-benchmarks for the room generation hot path.
+
+Cases are registered with @benchmark and run by `manage.py benchmark_game`,
+which reports ops/sec and latency percentiles and compares them against a
+stored baseline.
+"""
+import io
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.test import Client
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from . import views
+from .renderers import FastJSONParser, FastJSONRenderer
+
+# One representative rooms_cleared value per difficulty level benchmarked.
+BENCH_DIFFICULTIES = (1, 3, 6, 10, 13, 20)
+
+# Room sizes for the serialization cases.
+BENCH_ROOM_SIZES = (8, 16, 24, 32)
+
+# URLconfs whose cold import the startup cases time.
+BENCH_URLCONFS = {'wsgi': 'src.urls', 'asgi': 'src.urls_async'}
+
+CASES = {}
+
+
+def benchmark(name):
+    """
+    Register a case factory. The factory runs once (untimed) and returns the
+    zero-argument callable that gets timed.
+    """
+    def decorator(factory):
+        CASES[name] = factory
+        return factory
+    return decorator
+
+
+def rooms_cleared_for(difficulty: int) -> int:
+    return (difficulty - 1) * views.ROOMS_PER_DIFFICULTY
+
+
+def measure(fn, min_time: float = 0.2, max_samples: int = 50_000) -> dict:
+    """
+    Time `fn` call by call until `min_time` seconds or `max_samples` calls
+    have elapsed. Returns ops/sec plus p50/p90/p99 latency in microseconds.
+    """
+    fn()  # warm-up
+    samples  = []
+    clock    = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(samples) < max_samples:
+        start = clock()
+        fn()
+        end = clock()
+        samples.append(end - start)
+        if end >= deadline:
+            break
+
+    samples.sort()
+    n = len(samples)
+
+    def pct(q):
+        return samples[min(n - 1, int(q * n))] / 1000
+
+    return {
+        'ops_per_sec': n / (sum(samples) / 1e9),
+        'p50_us':      pct(0.50),
+        'p90_us':      pct(0.90),
+        'p99_us':      pct(0.99),
+        'samples':     n,
+    }
+
+
+def run_case(name: str, min_time: float = 0.2) -> dict:
+    """Build and time one registered case. View cases must answer 2xx."""
+    fn       = CASES[name]()
+    response = fn()
+    status   = getattr(response, 'status_code', None)
+    if status is not None and not 200 <= status < 300:
+        raise RuntimeError(f'{name} returned HTTP {status}')
+    return measure(fn, min_time=min_time)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Names of cases whose ops/sec dropped more than `threshold` (a fraction)
+    below the baseline. Cases missing from the baseline are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and result['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+# =============================================================================
+#  GENERATION FUNCTIONS
+# =============================================================================
+
+def _register_difficulty_cases(d):
+    cfg           = views.get_difficulty_config(d)
+    rooms_cleared = rooms_cleared_for(d)
+
+    @benchmark(f'generate_room_layout[d={d}]')
+    def layout():
+        return lambda: views.generate_room_layout(cfg['room_size'])
+
+    @benchmark(f'generate_enemies_for_room[d={d}]')
+    def enemies():
+        return lambda: views.generate_enemies_for_room(cfg, rooms_cleared)
+
+    @benchmark(f'generate_room[d={d}]')
+    def room():
+        return lambda: views.generate_room(rooms_cleared)
+
+    @benchmark(f'clear_room[d={d}]')
+    def clear():
+        room = views.generate_room(rooms_cleared)
+        return lambda: views.clear_room(room)
+
+    @benchmark(f'GenerateRoomView[d={d}]')
+    def generate_room_view():
+        client = Client()
+        return lambda: client.get('/game/generate/room/', {'rooms_cleared': rooms_cleared})
+
+    @benchmark(f'RunNextRoomView[d={d}]')
+    def next_room_view():
+        client = Client()
+        body   = {
+            'player_health': 100,
+            'rooms_cleared': rooms_cleared,
+            'current_room':  views.generate_room(rooms_cleared),
+        }
+        return lambda: client.post('/game/generate/next-room/', body, content_type='application/json')
+
+    @benchmark(f'LeaveRoomView[d={d}]')
+    def leave_room_view():
+        client = Client()
+        room   = views.generate_room(rooms_cleared)
+        body   = {'room': {**room, 'enemies': [{**e, 'is_dead': True} for e in room['enemies']]}}
+        return lambda: client.post('/game/generate/leave-room/', body, content_type='application/json')
+
+    @benchmark(f'GenerateEnemyView[d={d}]')
+    def generate_enemy_view():
+        client = Client()
+        return lambda: client.get('/game/generate/enemy/', {'rooms_cleared': rooms_cleared})
+
+
+for _d in BENCH_DIFFICULTIES:
+    _register_difficulty_cases(_d)
+
+
+# =============================================================================
+#  VIEWS WITHOUT A DIFFICULTY AXIS
+# =============================================================================
+
+@benchmark('GenerateRoomsView[count=5]')
+def _generate_rooms_view():
+    client = Client()
+    return lambda: client.get('/game/generate/rooms/', {'from': 0, 'count': 5})
+
+
+@benchmark('StartRunView')
+def _start_run_view():
+    client = Client()
+    return lambda: client.post('/game/generate/run/', {}, content_type='application/json')
+
+
+@benchmark('KillEnemyView')
+def _kill_enemy_view():
+    client = Client()
+    body   = {'enemy_id': 'r0_e0', 'coin_reward': 10}
+    return lambda: client.post('/game/generate/kill-enemy/', body, content_type='application/json')
+
+
+# =============================================================================
+#  SERIALIZATION  (stdlib-backed DRF classes vs the orjson-backed ones)
+# =============================================================================
+
+def room_of_size(size: int) -> dict:
+    """A generated room with its layout swapped for a `size` x `size` one."""
+    room = views.generate_room(rooms_cleared_for(10))
+    return {**room, 'width': size, 'height': size, 'layout': views.generate_room_layout(size)}
+
+
+def _register_serialization_cases(size):
+    renderers = {'stdlib': JSONRenderer(), 'orjson': FastJSONRenderer()}
+    parsers   = {'stdlib': JSONParser(), 'orjson': FastJSONParser()}
+
+    for lib, renderer in renderers.items():
+        @benchmark(f'render_room[{lib},size={size}]')
+        def render(renderer=renderer):
+            room = room_of_size(size)
+            return lambda: renderer.render(room)
+
+    for lib, parser in parsers.items():
+        @benchmark(f'parse_room[{lib},size={size}]')
+        def parse(parser=parser):
+            body = JSONRenderer().render(room_of_size(size))
+            return lambda: parser.parse(io.BytesIO(body))
+
+
+for _size in BENCH_ROOM_SIZES:
+    _register_serialization_cases(_size)
+
+
+# =============================================================================
+#  STARTUP  (fresh interpreter: django.setup() plus importing every view)
+# =============================================================================
+
+def startup_script(urlconf: str) -> str:
+    return f'import django; django.setup(); import {urlconf}'
+
+
+def _register_startup_case(server, urlconf):
+    @benchmark(f'startup[{server}]')
+    def startup():
+        cmd = [sys.executable, '-c', startup_script(urlconf)]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'src.settings'}
+        return lambda: subprocess.run(cmd, cwd=settings.BASE_DIR, env=env, check=True)
+
+
+for _server, _urlconf in BENCH_URLCONFS.items():
+    _register_startup_case(_server, _urlconf)
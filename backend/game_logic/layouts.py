@@ -0,0 +1,183 @@
+"""
+Procedural room interiors and their pathfinding flow fields.
+
+Each room size has LAYOUT_VARIANTS layouts. A layout is a border wall with
+two exits and a BSP-partitioned interior: dividing walls with doorways,
+plus pillars in the larger cells. Every floor tile is reachable from the
+spawn point and from both exits.
+
+A layout also carries BFS flow fields toward its spawn point and toward its
+exits. Each field is one string per row with one character per tile: the
+step to take from that tile (N/E/S/W), X on a target, # where you can't
+stand. Enemies move by looking up their tile instead of pathfinding.
+
+Variants are built on first use from a fixed per-(size, variant) seed, so
+every worker process hands out identical layouts. They are then cached for
+the life of the process, with their tile grids shared between rooms.
+"""
+import random
+from collections import deque
+
+TILE_FLOOR = 0
+TILE_WALL  = 1
+TILE_EXIT  = 2
+
+LAYOUT_VARIANTS = 8
+
+# Smallest BSP cell side; a wall is only placed where both halves get this much.
+MIN_LEAF   = 4
+DOOR_WIDTH = 2
+
+# Flow field characters
+FLOW_BLOCKED = '#'
+FLOW_TARGET  = 'X'
+_STEPS       = (('N', 0, -1), ('E', 1, 0), ('S', 0, 1), ('W', -1, 0))
+
+_TEMPLATES = {}   # (size, variant) → layout template
+
+
+def _split(rng, tiles, x0, y0, x1, y1, leaves):
+    """Recursively wall off the inclusive rect (x0, y0)-(x1, y1)."""
+    width, height = x1 - x0 + 1, y1 - y0 + 1
+    can_v = width  >= 2 * MIN_LEAF + 1
+    can_h = height >= 2 * MIN_LEAF + 1
+    if not (can_v or can_h):
+        leaves.append((x0, y0, x1, y1))
+        return
+
+    vertical = can_v and (not can_h or width > height or (width == height and rng.random() < 0.5))
+    if vertical:
+        x    = rng.randint(x0 + MIN_LEAF, x1 - MIN_LEAF)
+        door = rng.randint(y0, y1 - DOOR_WIDTH + 1)
+        for y in range(y0, y1 + 1):
+            if not door <= y < door + DOOR_WIDTH:
+                tiles[y][x] = TILE_WALL
+        _split(rng, tiles, x0, y0, x - 1, y1, leaves)
+        _split(rng, tiles, x + 1, y0, x1, y1, leaves)
+    else:
+        y    = rng.randint(y0 + MIN_LEAF, y1 - MIN_LEAF)
+        door = rng.randint(x0, x1 - DOOR_WIDTH + 1)
+        for x in range(x0, x1 + 1):
+            if not door <= x < door + DOOR_WIDTH:
+                tiles[y][x] = TILE_WALL
+        _split(rng, tiles, x0, y0, x1, y - 1, leaves)
+        _split(rng, tiles, x0, y + 1, x1, y1, leaves)
+
+
+def _place_pillars(rng, tiles, leaves):
+    """Up to four pillars per cell, two tiles in from its walls; never near the spawn."""
+    for x0, y0, x1, y1 in leaves:
+        if x1 - x0 < 4 or y1 - y0 < 4 or rng.random() < 0.4:
+            continue
+        for x, y in {(x0 + 2, y0 + 2), (x1 - 2, y0 + 2), (x0 + 2, y1 - 2), (x1 - 2, y1 - 2)}:
+            if x >= 3 or y >= 3:
+                tiles[y][x] = TILE_WALL
+
+
+def bfs_distances(tiles, targets) -> list:
+    """Steps from every tile to the nearest target; None for walls and unreachable tiles."""
+    height, width = len(tiles), len(tiles[0])
+    dist  = [[None] * width for _ in range(height)]
+    queue = deque()
+    for point in targets:
+        dist[point['y']][point['x']] = 0
+        queue.append((point['x'], point['y']))
+    while queue:
+        x, y = queue.popleft()
+        for _, dx, dy in _STEPS:
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < width and 0 <= ny < height
+                    and dist[ny][nx] is None and tiles[ny][nx] != TILE_WALL):
+                dist[ny][nx] = dist[y][x] + 1
+                queue.append((nx, ny))
+    return dist
+
+
+def flow_field(dist) -> tuple:
+    """Row strings of the first step (N/E/S/W) downhill in `dist`."""
+    height, width = len(dist), len(dist[0])
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            d = dist[y][x]
+            if d is None:
+                row.append(FLOW_BLOCKED)
+            elif d == 0:
+                row.append(FLOW_TARGET)
+            else:
+                row.append(next(
+                    name for name, dx, dy in _STEPS
+                    if 0 <= x + dx < width and 0 <= y + dy < height and dist[y + dy][x + dx] == d - 1
+                ))
+        rows.append(''.join(row))
+    return tuple(rows)
+
+
+def _draw(rng, size: int, exits: list, partition: bool) -> list:
+    tiles = [
+        [TILE_WALL if x in (0, size - 1) or y in (0, size - 1) else TILE_FLOOR for x in range(size)]
+        for y in range(size)
+    ]
+    if partition:
+        leaves = []
+        _split(rng, tiles, 1, 1, size - 2, size - 2, leaves)
+        _place_pillars(rng, tiles, leaves)
+
+    for point in exits:
+        tiles[point['y']][point['x']] = TILE_EXIT
+    # The tile inside each exit always stays open
+    tiles[size - 2][size // 2] = TILE_FLOOR
+    tiles[size // 2][size - 2] = TILE_FLOOR
+    return tiles
+
+
+def build_layout(size: int, variant: int = 0) -> dict:
+    """A fresh layout template; use layout_template() for the cached one."""
+    rng   = random.Random(size * 1000 + variant)
+    spawn = {'x': 1, 'y': 1}
+    exits = [{'x': size // 2, 'y': size - 1}, {'x': size - 1, 'y': size // 2}]
+
+    # Redraw until both exits connect to the spawn (nearly always first
+    # time); the last attempt is an open room, which always does.
+    for attempt in range(4, -1, -1):
+        tiles    = _draw(rng, size, exits, partition=attempt > 0)
+        to_spawn = bfs_distances(tiles, [spawn])
+        if all(to_spawn[point['y']][point['x']] is not None for point in exits):
+            break
+
+    # Pockets the spawn can't reach are filled in, so every floor tile is usable
+    for y, row in enumerate(to_spawn):
+        for x, d in enumerate(row):
+            if d is None and tiles[y][x] == TILE_FLOOR:
+                tiles[y][x] = TILE_WALL
+
+    return {
+        'tiles':       tuple(tuple(row) for row in tiles),
+        'spawn_point': spawn,
+        'exit_points': exits,
+        'exits_open':  False,
+        'variant':     variant,
+        'flow_fields': {
+            'spawn': flow_field(to_spawn),
+            'exits': flow_field(bfs_distances(tiles, exits)),
+        },
+    }
+
+
+def layout_template(size: int, variant: int = 0) -> dict:
+    """Cached build_layout(); callers must not mutate it."""
+    key      = (size, variant)
+    template = _TEMPLATES.get(key)
+    if template is None:
+        template = _TEMPLATES[key] = build_layout(size, variant)
+    return template
+
+
+def cached_tiles(size: int, variant):
+    """The shared tile grid for (size, variant) if that layout has been built, else None."""
+    # variant may come from a client-posted room: anything unhashable must not reach the dict
+    if type(variant) is not int:
+        return None
+    template = _TEMPLATES.get((size, variant))
+    return template and template['tiles']
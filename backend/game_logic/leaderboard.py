@@ -0,0 +1,132 @@
+"""
+In-memory high-score leaderboard.
+
+Every player with a high score sits in one list sorted by (-score, user_id),
+so top-K is a slice and a rank is one bisect (O(log n)) instead of an
+ORDER BY / COUNT(*) per request. Scores only ever go up, and every update
+goes through record_score(), which writes PlayerProfile.high_score first
+and then moves the player's entry. The index is built from the DB on first
+use; each process keeps its own copy.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from asgiref.sync import sync_to_async
+
+from .models import PlayerProfile
+
+
+def run_score(rooms_cleared: int, coins_earned: int) -> int:
+    """Score for a finished run: depth matters most, coins break ties."""
+    return max(0, rooms_cleared) * 100 + max(0, coins_earned)
+
+
+class Leaderboard:
+
+    def __init__(self, load=None):
+        self._lock    = threading.Lock()
+        self._entries = []   # sorted (-score, user_id)
+        self._players = {}   # user_id → (score, username)
+        self._load    = load
+
+    def ensure_loaded(self):
+        """Build the index from the DB if it hasn't been yet (sync ORM)."""
+        if self._load is None:
+            return
+        with self._lock:
+            if self._load is None:
+                return
+            rows = list(self._load())
+            self._players = {user_id: (score, name) for user_id, name, score in rows}
+            self._entries = sorted((-score, user_id) for user_id, (score, _) in self._players.items())
+            self._load = None
+
+    def update(self, user_id: int, username: str, score: int) -> bool:
+        """Raise a player's score; lower scores are ignored. True if it changed."""
+        self.ensure_loaded()
+        with self._lock:
+            old = self._players.get(user_id)
+            if old is not None and old[0] >= score:
+                return False
+            if old is not None:
+                i = bisect_left(self._entries, (-old[0], user_id))
+                del self._entries[i]
+            insort(self._entries, (-score, user_id))
+            self._players[user_id] = (score, username)
+            return True
+
+    def top(self, k: int) -> list:
+        """The k best players, ties sharing a rank."""
+        self.ensure_loaded()
+        with self._lock:
+            result = []
+            for i, (neg_score, user_id) in enumerate(self._entries[:k]):
+                # Tied scores share the rank of the first one
+                rank = result[-1]['rank'] if result and result[-1]['score'] == -neg_score else i + 1
+                result.append({
+                    'rank':     rank,
+                    'username': self._players[user_id][1],
+                    'score':    -neg_score,
+                })
+            return result
+
+    def rank(self, user_id: int):
+        """(rank, score) for a player, or None if they have no score yet."""
+        self.ensure_loaded()
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return None
+            # Players with a strictly higher score sort before (-score,)
+            return bisect_left(self._entries, (-player[0],)) + 1, player[0]
+
+    @property
+    def loaded(self) -> bool:
+        return self._load is None
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self._entries)
+
+
+def _load_from_db():
+    return (
+        PlayerProfile.objects
+        .filter(high_score__gt=0)
+        .values_list('user_id', 'user__username', 'high_score')
+    )
+
+
+LEADERBOARD = Leaderboard(load=_load_from_db)
+
+
+def _index_score(user, score: int, raised: bool, previous: int):
+    if raised:
+        LEADERBOARD.update(user.pk, user.get_username(), score)
+    elif previous > 0:
+        LEADERBOARD.update(user.pk, user.get_username(), previous)
+    return LEADERBOARD.rank(user.pk)
+
+
+def record_score(user, score: int):
+    """
+    Store a finished run's score for `user` if it beats their high score.
+    Returns the player's (rank, high_score) afterwards.
+    """
+    profile, _ = PlayerProfile.objects.get_or_create(user=user)
+    # Conditional update so concurrent game-overs can't lower the score
+    raised = PlayerProfile.objects.filter(pk=profile.pk, high_score__lt=score).update(high_score=score)
+    return _index_score(user, score, raised, profile.high_score)
+
+
+async def aensure_loaded():
+    if not LEADERBOARD.loaded:
+        await sync_to_async(LEADERBOARD.ensure_loaded)()
+
+
+async def arecord_score(user, score: int):
+    """record_score() for async views, using the async ORM."""
+    await aensure_loaded()
+    profile, _ = await PlayerProfile.objects.aget_or_create(user=user)
+    raised = await PlayerProfile.objects.filter(pk=profile.pk, high_score__lt=score).aupdate(high_score=score)
+    return _index_score(user, score, raised, profile.high_score)
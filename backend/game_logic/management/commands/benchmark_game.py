@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from game_logic import benchmarks
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'bench_baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmarks for room generation, the game_logic API views and process startup. '
+        'Reports ops/sec and p50/p90/p99 latency and fails on regressions against a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filter', default='', help='Only run cases whose name contains this text.')
+        parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to spend timing each case.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file.')
+        parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.20,
+            help='Allowed ops/sec drop versus baseline before failing (fraction, default 0.20).',
+        )
+
+    def handle(self, *args, **options):
+        # The test client's 'testserver' host needs the test environment's ALLOWED_HOSTS
+        setup_test_environment()
+
+        names = [name for name in benchmarks.CASES if options['filter'] in name]
+        if not names:
+            raise CommandError(f'No benchmark matches {options["filter"]!r}.')
+
+        baseline_path = Path(options['baseline'])
+        baseline      = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+
+        self.stdout.write(
+            f'{"case":<40} {"ops/sec":>12} {"p50 us":>10} {"p90 us":>10} {"p99 us":>10} {"vs base":>8}'
+        )
+        results = {}
+        for name in names:
+            result = results[name] = benchmarks.run_case(name, min_time=options['min_time'])
+            base   = baseline.get(name)
+            delta  = f'{(result["ops_per_sec"] / base["ops_per_sec"] - 1) * 100:+.1f}%' if base else '-'
+            self.stdout.write(
+                f'{name:<40} {result["ops_per_sec"]:>12.0f} {result["p50_us"]:>10.1f} '
+                f'{result["p90_us"]:>10.1f} {result["p99_us"]:>10.1f} {delta:>8}'
+            )
+
+        if options['save_baseline']:
+            baseline_path.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True))
+            self.stdout.write(f'Baseline written to {baseline_path}')
+            return
+
+        if not baseline:
+            self.stdout.write(f'No baseline at {baseline_path}; run with --save-baseline to create one.')
+            return
+
+        regressions = benchmarks.compare(results, baseline, options['threshold'])
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} case(s) regressed more than {options["threshold"]:.0%}: '
+                + ', '.join(regressions)
+            )
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game_logic.tile_encoding import TILE_ENCODINGS
+from game_logic.views import MAX_SEED, encode_room_tiles, seeded_room
+
+
+def _room_type(value: str) -> tuple:
+    number, _, room_type = value.partition('=')
+    if not number.isdigit() or not room_type:
+        raise ValueError(value)
+    return int(number), room_type
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerate a run's rooms from its seed (returned by POST /game/generate/run/). "
+        'Rooms are printed as JSON lines, exactly as the run was served them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('seed', type=int, help='The run seed.')
+        parser.add_argument('--from', dest='start', type=int, default=0, help='First room number.')
+        parser.add_argument('--rooms', type=int, default=10, help='Number of rooms.')
+        parser.add_argument(
+            '--type', dest='types', type=_room_type, action='append', default=[], metavar='N=TYPE',
+            help='room_type the client asked for at room N (next-room with room_type); repeatable.',
+        )
+        parser.add_argument('--tiles', default='json', choices=TILE_ENCODINGS, help='Tile encoding.')
+        parser.add_argument('--summary', action='store_true', help='One line per room instead of JSON.')
+
+    def handle(self, *args, **options):
+        seed, start, count = options['seed'], options['start'], options['rooms']
+        if not 0 <= seed <= MAX_SEED:
+            raise CommandError(f'seed must be between 0 and {MAX_SEED}.')
+        if start < 0 or count < 1:
+            raise CommandError('--from must be non-negative and --rooms positive.')
+
+        types = dict(options['types'])
+        for n in range(start, start + count):
+            room = seeded_room(seed, n, types.get(n, 'entrance' if n == 0 else None))
+            if options['summary']:
+                self.stdout.write(
+                    f'{n:>4} {room["type"]:<10} d{room["difficulty"]:<3} '
+                    f'variant {room["layout"]["variant"]}  {room["enemy_count"]} enemies  '
+                    f'{room["total_coins_available"]} coins{"  locked" if room["is_locked"] else ""}'
+                )
+            else:
+                self.stdout.write(json.dumps(encode_room_tiles(room, options['tiles']), separators=(',', ':')))
@@ -0,0 +1,207 @@
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+import numpy as np
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from game_logic.batch_generation import generate_rooms
+
+ROOM_TYPES = ('entrance', 'corridor', 'chamber', 'boss_room')
+ROOM_TYPE_CODES = {name: code for code, name in enumerate(ROOM_TYPES)}
+
+# One row per simulated room. Written as raw little-endian column files so
+# they can be streamed out chunk by chunk and read back with np.fromfile().
+COLUMNS = {
+    'run_id':        np.dtype('<u4'),
+    'room_number':   np.dtype('<u2'),
+    'difficulty':    np.dtype('<u2'),
+    'room_type':     np.dtype('u1'),
+    'is_locked':     np.dtype('u1'),
+    'enemy_count':   np.dtype('u1'),
+    'boss_count':    np.dtype('u1'),
+    'coins':         np.dtype('<u4'),
+    'enemy_hp_sum':  np.dtype('<u4'),
+    'enemy_atk_sum': np.dtype('<u4'),
+}
+
+
+def _init_worker():
+    # Spawned (non-fork) workers start without Django configured
+    if not apps.ready:
+        django.setup()
+
+
+def simulate_chunk(first_run_id: int, n_runs: int, max_rooms: int, death_rate: float, seed: int) -> dict:
+    """
+    Play `n_runs` synthetic runs. Each run keeps going until the player dies
+    (chance `death_rate` per room) or reaches `max_rooms`, so run lengths are
+    drawn up front and the whole chunk's rooms are generated as one batch
+    (batch_generation.generate_rooms()). Returns the per-room columns as
+    NumPy arrays.
+    """
+    rng = np.random.default_rng(seed)
+    if death_rate > 0:
+        lengths = np.minimum(rng.geometric(death_rate, n_runs), max_rooms)
+    else:
+        lengths = np.full(n_runs, max_rooms)
+
+    run_ids  = np.repeat(np.arange(first_run_id, first_run_id + n_runs), lengths)
+    starts   = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    numbers  = np.arange(len(run_ids)) - starts
+    rows     = {name: [] for name in COLUMNS if name not in ('run_id', 'room_number')}
+
+    for room in generate_rooms(numbers, rng=rng):
+        enemies = room['enemies']
+        rows['difficulty'].append(room['difficulty'])
+        rows['room_type'].append(ROOM_TYPE_CODES[room['type']])
+        rows['is_locked'].append(room['is_locked'])
+        rows['enemy_count'].append(len(enemies))
+        rows['boss_count'].append(sum(1 for e in enemies if e['is_boss']))
+        rows['coins'].append(room['total_coins_available'])
+        rows['enemy_hp_sum'].append(sum(e['max_health'] for e in enemies))
+        rows['enemy_atk_sum'].append(sum(e['attack'] for e in enemies))
+
+    rows['run_id'], rows['room_number'] = run_ids, numbers
+    return {name: np.asarray(rows[name], dtype=COLUMNS[name]) for name in COLUMNS}
+
+
+class DifficultyStats:
+    """Running per-difficulty totals, merged chunk by chunk in the parent."""
+
+    SUMS = ('rooms', 'coins', 'boss_rooms', 'locked', 'enemies', 'enemy_hp', 'enemy_atk')
+
+    def __init__(self):
+        self.sums       = {name: np.zeros(0) for name in self.SUMS}
+        self.coin_hists = {}   # difficulty → bincount of coins per room
+
+    def add(self, chunk: dict):
+        d       = chunk['difficulty'].astype(np.int64)
+        weights = {
+            'rooms':      None,
+            'coins':      chunk['coins'],
+            'boss_rooms': chunk['boss_count'] > 0,
+            'locked':     chunk['is_locked'],
+            'enemies':    chunk['enemy_count'],
+            'enemy_hp':   chunk['enemy_hp_sum'],
+            'enemy_atk':  chunk['enemy_atk_sum'],
+        }
+        size = max(int(d.max()) + 1 if len(d) else 0, len(self.sums['rooms']))
+        for name, w in weights.items():
+            counts = np.bincount(d, weights=w, minlength=size)
+            self.sums[name] = np.pad(self.sums[name], (0, size - len(self.sums[name]))) + counts
+
+        for difficulty in np.unique(d).tolist():
+            hist = np.bincount(chunk['coins'][d == difficulty])
+            old  = self.coin_hists.get(difficulty, np.zeros(0, dtype=np.int64))
+            n    = max(len(old), len(hist))
+            self.coin_hists[difficulty] = np.pad(old, (0, n - len(old))) + np.pad(hist, (0, n - len(hist)))
+
+    def coin_percentile(self, difficulty: int, q: float) -> int:
+        cdf = np.cumsum(self.coin_hists[difficulty])
+        return int(np.searchsorted(cdf, q * cdf[-1]))
+
+    def rows(self):
+        for d in range(1, len(self.sums['rooms'])):
+            rooms = self.sums['rooms'][d]
+            if not rooms:
+                continue
+            enemies = self.sums['enemies'][d] or 1
+            yield {
+                'difficulty':      d,
+                'rooms':           int(rooms),
+                'coins_mean':      self.sums['coins'][d] / rooms,
+                'coins_p50':       self.coin_percentile(d, 0.50),
+                'coins_p90':       self.coin_percentile(d, 0.90),
+                'boss_rate':       self.sums['boss_rooms'][d] / rooms,
+                'locked_rate':     self.sums['locked'][d] / rooms,
+                'enemies_mean':    self.sums['enemies'][d] / rooms,
+                'enemy_hp_mean':   self.sums['enemy_hp'][d] / enemies,
+                'enemy_atk_mean':  self.sums['enemy_atk'][d] / enemies,
+            }
+
+
+class Command(BaseCommand):
+    help = (
+        'Monte Carlo balance simulation: plays synthetic runs through batched room generation '
+        'across a process pool and reports per-difficulty distributions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=100_000, help='Number of synthetic runs.')
+        parser.add_argument('--max-rooms', type=int, default=60, help='Room cap per run.')
+        parser.add_argument('--death-rate', type=float, default=0.1, help='Chance the player dies in each room.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes.')
+        parser.add_argument('--chunk-size', type=int, default=2_000, help='Runs per worker task.')
+        parser.add_argument('--seed', type=int, default=None, help='Base seed for reproducible output.')
+        parser.add_argument('--output', default=None, help='Directory for the columnar per-room output.')
+
+    def handle(self, *args, **options):
+        runs       = options['runs']
+        max_rooms  = options['max_rooms']
+        death_rate = options['death_rate']
+        chunk_size = options['chunk_size']
+
+        if runs < 1 or max_rooms < 1 or chunk_size < 1:
+            raise CommandError('--runs, --max-rooms and --chunk-size must be positive.')
+        if not 0 <= death_rate <= 1:
+            raise CommandError('--death-rate must be between 0 and 1.')
+
+        base_seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        seeds     = np.random.SeedSequence(base_seed).generate_state((runs + chunk_size - 1) // chunk_size)
+        tasks     = [
+            (first, min(chunk_size, runs - first), max_rooms, death_rate, int(seed))
+            for first, seed in zip(range(0, runs, chunk_size), seeds)
+        ]
+
+        output = Path(options['output']) if options['output'] else None
+        files  = {}
+        if output is not None:
+            output.mkdir(parents=True, exist_ok=True)
+            files = {name: open(output / f'{name}.bin', 'wb') for name in COLUMNS}
+
+        stats      = DifficultyStats()
+        total_rows = 0
+        try:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                chunks = pool.map(simulate_chunk, *zip(*tasks))
+                for done, chunk in enumerate(chunks, start=1):
+                    stats.add(chunk)
+                    total_rows += len(chunk['run_id'])
+                    for name, f in files.items():
+                        chunk[name].tofile(f)
+                    if options['verbosity'] > 1:
+                        self.stderr.write(f'{done}/{len(tasks)} chunks')
+        finally:
+            for f in files.values():
+                f.close()
+
+        if output is not None:
+            schema = {
+                'rows':       total_rows,
+                'columns':    {name: dtype.str for name, dtype in COLUMNS.items()},
+                'room_types': list(ROOM_TYPES),
+                'options':    {'runs': runs, 'max_rooms': max_rooms, 'death_rate': death_rate, 'seed': base_seed},
+            }
+            (output / 'schema.json').write_text(json.dumps(schema, indent=2))
+
+        self._report(stats, runs, total_rows)
+
+    def _report(self, stats, runs, total_rows):
+        self.stdout.write(f'{runs} runs, {total_rows} rooms\n')
+        header = (
+            f'{"diff":>4} {"rooms":>10} {"coins":>8} {"p50":>6} {"p90":>6} '
+            f'{"boss%":>6} {"lock%":>6} {"enem":>5} {"hp":>8} {"atk":>7}'
+        )
+        self.stdout.write(header)
+        for row in stats.rows():
+            self.stdout.write(
+                f'{row["difficulty"]:>4} {row["rooms"]:>10} {row["coins_mean"]:>8.1f} '
+                f'{row["coins_p50"]:>6} {row["coins_p90"]:>6} '
+                f'{row["boss_rate"] * 100:>6.1f} {row["locked_rate"] * 100:>6.1f} '
+                f'{row["enemies_mean"]:>5.2f} {row["enemy_hp_mean"]:>8.1f} {row["enemy_atk_mean"]:>7.1f}'
+            )
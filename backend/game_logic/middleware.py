@@ -0,0 +1,66 @@
+"""
+Lean routing for the cheap, unauthenticated game endpoints.
+
+LeanRouteMiddleware sits near the top of MIDDLEWARE. For paths under
+settings.LEAN_ROUTE_PREFIXES it resolves and calls the view itself, so
+everything below it (sessions, common, CSRF, auth, messages, clickjacking)
+is skipped. Those views don't use sessions or cookies, are CSRF-exempt and
+authenticate lazily (GenerateAPIView), so none of that work is needed.
+Paths that don't resolve fall through to the normal stack.
+"""
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, get_resolver
+
+DEFAULT_PREFIXES = ('/game/generate/',)
+
+
+def _prefixes():
+    return tuple(getattr(settings, 'LEAN_ROUTE_PREFIXES', DEFAULT_PREFIXES))
+
+
+def _render(response):
+    # What BaseHandler does for TemplateResponse-style responses (DRF's Response)
+    if hasattr(response, 'render') and callable(response.render):
+        response = response.render()
+    return response
+
+
+class LeanRouteMiddleware:
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes     = _prefixes()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _match(self, request):
+        if not request.path_info.startswith(self.prefixes):
+            return None
+        try:
+            match = get_resolver(getattr(request, 'urlconf', None)).resolve(request.path_info)
+        except Resolver404:
+            return None
+        request.resolver_match = match
+        return match
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        match = self._match(request)
+        if match is None:
+            return self.get_response(request)
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        return _render(view(request, *match.args, **match.kwargs))
+
+    async def __acall__(self, request):
+        match = self._match(request)
+        if match is None:
+            return await self.get_response(request)
+        if iscoroutinefunction(match.func):
+            response = await match.func(request, *match.args, **match.kwargs)
+        else:
+            response = await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+        return await sync_to_async(_render)(response) if hasattr(response, 'render') else response
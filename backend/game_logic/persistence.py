@@ -0,0 +1,64 @@
+"""
+Opt-in persistence of run rooms to the Room / Enemy models.
+
+Off by default (the views run in no-auth mode and keep runs in the run
+store). With settings.GAME_PERSISTENCE['ENABLED'] every room generated for
+a run is written together with its enemies: one transaction, one
+bulk_create for the rooms and one for all of their enemies, however many
+rooms the request generated.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import Enemy, Room
+
+
+def persistence_enabled() -> bool:
+    return getattr(settings, 'GAME_PERSISTENCE', {}).get('ENABLED', False)
+
+
+def room_key(run_id: str, room_number: int) -> str:
+    """Room.room_id for a run's room."""
+    return f'{run_id}:{room_number}'
+
+
+def persist_rooms(run_id: str, rooms: list) -> list:
+    """
+    Store `rooms` (generate_room() dicts) for a run. The room dict minus its
+    enemies goes in Room.layout_data; enemies become Enemy rows. A room that
+    was already stored under the same number is replaced. Returns the Rooms.
+    """
+    if not rooms:
+        return []
+
+    keys = [room_key(run_id, room['room_number']) for room in rooms]
+    with transaction.atomic():
+        # Re-generated rooms (e.g. a repeated prefetch) replace the old rows
+        Room.objects.filter(room_id__in=keys).delete()
+        stored = Room.objects.bulk_create([
+            Room(
+                room_id=key,
+                is_cleared=room.get('is_cleared', False),
+                layout_data={k: v for k, v in room.items() if k != 'enemies'},
+            )
+            for key, room in zip(keys, rooms)
+        ])
+        Enemy.objects.bulk_create([
+            Enemy(
+                room=stored_room,
+                enemy_type=enemy['type'],
+                health=enemy['health'],
+                is_alive=not enemy.get('is_dead', False),
+            )
+            for stored_room, room in zip(stored, rooms)
+            for enemy in room['enemies']
+        ])
+    return stored
+
+
+def mark_room_cleared(run_id: str, room_number: int):
+    """Flag a stored room cleared and its enemies dead (two UPDATEs)."""
+    key = room_key(run_id, room_number)
+    with transaction.atomic():
+        Room.objects.filter(room_id=key).update(is_cleared=True)
+        Enemy.objects.filter(room__room_id=key).update(is_alive=False)
@@ -0,0 +1,60 @@
+"""
+orjson-backed JSON renderer and parser for DRF.
+
+Drop-in replacements for rest_framework's JSONRenderer / JSONParser,
+registered in settings.REST_FRAMEWORK. Both fall back to the stdlib-based
+DRF classes when orjson isn't installed, and the renderer also does so when
+a client asks for indented output (e.g. the browsable API).
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Types orjson doesn't know (Decimal, lazy strings, querysets, ...) go
+# through DRF's own encoder.
+_fallback_default = JSONEncoder().default
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_fallback_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class JSONOnlyNegotiation(DefaultContentNegotiation):
+    """
+    Skip Accept-header negotiation and always answer with the first
+    renderer. For endpoints that only ever speak JSON (game/generate/*); the
+    tile encoding's own Accept parameter is read separately by the views.
+    Parsers are still picked by Content-Type.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = renderers[0]
+        return renderer, renderer.media_type
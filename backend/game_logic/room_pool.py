@@ -0,0 +1,139 @@
+"""
+Pre-generated rooms, buffered per (difficulty, room_type) by a background
+thread.
+
+Handlers take a ready room from the buffer for the requested tier and only
+patch in the room number and enemy ids (see views.take_room()). An empty
+buffer is a miss: the handler generates the room inline, as before, and the
+thread is woken to refill. Buffers are refilled to SIZE once they drop to
+LOW_WATER, so a burst of room transitions is served from rooms built while
+the worker was idle. Only sustained overload drains a buffer and falls back
+to inline generation.
+
+A buffer is created the first time its key is asked for. The WARM lowest
+tiers are filled as soon as the thread starts, because every run begins
+there. Hits, misses and generated rooms are counted in src.metrics, and buffer
+levels and watermarks are exported as gauges.
+"""
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED':   True,
+    'AUTOSTART': True,  # start the refill thread on first take()
+    'SIZE':      8,     # rooms kept per (difficulty, room_type)
+    'LOW_WATER': 2,     # refill a buffer once it's down to this many
+    'WARM':      3,     # difficulty tiers filled before any request asks
+}
+
+# Room types a buffer is kept for (None: the random corridor/chamber/boss mix).
+# Anything else a client names is generated inline.
+POOLED_ROOM_TYPES = (None, 'entrance', 'corridor', 'chamber', 'boss_room')
+
+REGISTRY.describe('room_pool_hits_total', 'counter', 'Rooms served from the pre-generated pool, by tier.')
+REGISTRY.describe('room_pool_misses_total', 'counter', 'Room requests that found the pool empty, by tier.')
+REGISTRY.describe('room_pool_generated_total', 'counter', 'Rooms generated by the pool thread, by tier.')
+REGISTRY.describe('room_pool_rooms', 'gauge', 'Rooms currently buffered, by tier.')
+REGISTRY.describe('room_pool_size', 'gauge', 'Rooms a buffer is refilled to.')
+REGISTRY.describe('room_pool_low_water', 'gauge', 'Buffer level that triggers a refill.')
+
+
+def _conf():
+    return {**DEFAULTS, **getattr(settings, 'GAME_ROOM_POOL', {})}
+
+
+def _tier_labels(key) -> tuple:
+    difficulty, room_type = key
+    return (('difficulty', difficulty), ('room_type', room_type or 'any'))
+
+
+class RoomPool:
+    """
+    `generate([(difficulty, room_type, count), ...])` builds rooms for the
+    buffers, one list per entry, so a refill of several tiers is one call;
+    `max_difficulty` bounds which tiers get one.
+    """
+
+    def __init__(self, generate, max_difficulty: int):
+        self._generate      = generate
+        self.max_difficulty = max_difficulty
+        self._buffers       = {}   # (difficulty, room_type) → deque of rooms
+        self._wake          = threading.Event()
+        self._lock          = threading.Lock()
+        self._thread        = None
+
+    def take(self, difficulty: int, room_type: str = None):
+        """A buffered room for the tier, or None (generate it yourself)."""
+        conf = _conf()
+        if not conf['ENABLED'] or difficulty > self.max_difficulty or room_type not in POOLED_ROOM_TYPES:
+            return None
+        if conf['AUTOSTART']:
+            self._start(conf)
+
+        key    = (difficulty, room_type)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers.setdefault(key, deque())
+        try:
+            room = buffer.popleft()
+        except IndexError:
+            REGISTRY.inc('room_pool_misses_total', _tier_labels(key))
+            self._wake.set()
+            return None
+
+        REGISTRY.inc('room_pool_hits_total', _tier_labels(key))
+        if len(buffer) <= conf['LOW_WATER']:
+            self._wake.set()
+        return room
+
+    def stats(self) -> dict:
+        """Buffer level per (difficulty, room_type)."""
+        return {key: len(buffer) for key, buffer in list(self._buffers.items())}
+
+    def _start(self, conf):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                for key in [(1, 'entrance')] + [(d, None) for d in range(1, conf['WARM'] + 1)]:
+                    self._buffers.setdefault(key, deque())
+                self._thread = threading.Thread(target=self._run, name='room-pool', daemon=True)
+                self._thread.start()
+                self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.fill()
+
+    def fill(self):
+        """Top every buffer up to SIZE; the thread's work, callable directly."""
+        size   = _conf()['SIZE']
+        wanted = [(key, size - len(buffer)) for key, buffer in list(self._buffers.items()) if len(buffer) < size]
+        if not wanted:
+            return
+        try:
+            rooms = self._generate([(*key, count) for key, count in wanted])
+        except Exception:
+            logger.exception('Room pool refill failed')
+            return
+        # deque append / popleft are atomic, so handlers never wait on this
+        for (key, count), batch in zip(wanted, rooms):
+            self._buffers[key].extend(batch)
+            REGISTRY.inc('room_pool_generated_total', _tier_labels(key), count)
+
+    def gauges(self):
+        """Collector for REGISTRY.add_collector()."""
+        conf = _conf()
+        yield 'room_pool_size', (), conf['SIZE']
+        yield 'room_pool_low_water', (), conf['LOW_WATER']
+        for key, level in self.stats().items():
+            yield 'room_pool_rooms', _tier_labels(key), level
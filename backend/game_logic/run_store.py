@@ -0,0 +1,128 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+DEFAULT_MAX_RUNS    = 10_000
+DEFAULT_TTL_SECONDS = 60 * 60
+
+
+class RunStore:
+    """
+    Bounded in-process store for run state, keyed by run id.
+
+    Entries are evicted least-recently-used once `max_runs` is reached, and
+    expire `ttl` seconds after their last write. With `sqlite_path` set every
+    write also goes to a SQLite table, so runs evicted from memory (or lost
+    to a worker restart) are reloaded on the next lookup.
+    """
+
+    def __init__(self, max_runs=DEFAULT_MAX_RUNS, ttl=DEFAULT_TTL_SECONDS, sqlite_path=None, clock=time.monotonic):
+        self.max_runs = max_runs
+        self.ttl      = ttl
+        self._clock   = clock
+        self._runs    = OrderedDict()   # run_id → (expires_at, state)
+        self._lock    = threading.Lock()
+        self._db      = None
+
+        if sqlite_path:
+            # Wall clock for rows on disk: monotonic time doesn't survive restarts
+            self._db = sqlite3.connect(str(sqlite_path), check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS game_runs ('
+                'run_id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._runs)
+
+    def create(self, state: dict) -> str:
+        run_id = secrets.token_urlsafe(12)
+        self.put(run_id, state)
+        return run_id
+
+    def get(self, run_id: str):
+        with self._lock:
+            entry = self._runs.get(run_id)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._runs.move_to_end(run_id)
+                    return entry[1]
+                del self._runs[run_id]
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                'SELECT state, expires_at FROM game_runs WHERE run_id = ?', (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._db.execute('DELETE FROM game_runs WHERE run_id = ?', (run_id,))
+                self._db.commit()
+                return None
+
+            state = json.loads(row[0])
+            self._remember(run_id, state)
+            return state
+
+    def put(self, run_id: str, state: dict):
+        with self._lock:
+            self._remember(run_id, state)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO game_runs (run_id, state, expires_at) VALUES (?, ?, ?)',
+                    (run_id, json.dumps(state, separators=(',', ':')), time.time() + self.ttl),
+                )
+                self._db.commit()
+
+    def delete(self, run_id: str):
+        with self._lock:
+            self._runs.pop(run_id, None)
+            if self._db is not None:
+                self._db.execute('DELETE FROM game_runs WHERE run_id = ?', (run_id,))
+                self._db.commit()
+
+    def purge_expired(self) -> int:
+        """Drop expired runs from memory and disk. Returns the in-memory count removed."""
+        with self._lock:
+            now     = self._clock()
+            expired = [run_id for run_id, (expires_at, _) in self._runs.items() if expires_at <= now]
+            for run_id in expired:
+                del self._runs[run_id]
+            if self._db is not None:
+                self._db.execute('DELETE FROM game_runs WHERE expires_at <= ?', (time.time(),))
+                self._db.commit()
+            return len(expired)
+
+    def _remember(self, run_id, state):
+        # Caller holds the lock
+        self._runs[run_id] = (self._clock() + self.ttl, state)
+        self._runs.move_to_end(run_id)
+        while len(self._runs) > self.max_runs:
+            self._runs.popitem(last=False)
+
+
+_store      = None
+_store_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    """Process-wide store configured from settings.GAME_RUN_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                conf   = getattr(settings, 'GAME_RUN_STORE', {})
+                _store = RunStore(
+                    max_runs=conf.get('MAX_RUNS', DEFAULT_MAX_RUNS),
+                    ttl=conf.get('TTL_SECONDS', DEFAULT_TTL_SECONDS),
+                    sqlite_path=conf.get('SQLITE_PATH'),
+                )
+    return _store
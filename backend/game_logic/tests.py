@@ -1,3 +1,971 @@
-from django.test import TestCase
+import asyncio
+import copy
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import batch_generation, benchmarks, layouts, leaderboard, renderers, room_pool, tile_encoding, views, websocket
+from .models import Enemy, PlayerProfile, Room
+from .run_store import RunStore, get_run_store
+from src.metrics import REGISTRY, Registry
+
+
+class DifficultyTierTests(SimpleTestCase):
+
+    def test_table_matches_fresh_config(self):
+        for d in range(1, views.DIFFICULTY_TIER_CAP + 5):
+            self.assertEqual(
+                dict(views.get_difficulty_config(d)),
+                views._build_difficulty_config(d),
+            )
+
+    def test_table_entries_are_read_only(self):
+        cfg = views.get_difficulty_config(3)
+        with self.assertRaises(TypeError):
+            cfg['room_size'] = 99
+
+
+class LayoutTemplateTests(SimpleTestCase):
+
+    def test_template_covers_every_room_size(self):
+        sizes = {views.get_difficulty_config(d)['room_size'] for d in range(1, 40)}
+        self.assertEqual(sizes, set(views.ROOM_SIZES))
+
+    def test_layouts_share_tiles_but_not_points(self):
+        a = views.generate_room_layout(10, variant=3)
+        b = views.generate_room_layout(10, variant=3)
+        self.assertIs(a['tiles'], b['tiles'])
+        self.assertIsNot(a['spawn_point'], b['spawn_point'])
+        self.assertEqual(a['tiles'][9][5], 2)
+        self.assertEqual(a['tiles'][5][9], 2)
+
+    def test_variants_are_deterministic(self):
+        self.assertEqual(layouts.build_layout(24, 5), layouts.build_layout(24, 5))
+        self.assertNotEqual(layouts.build_layout(24, 5)['tiles'], layouts.build_layout(24, 6)['tiles'])
+
+    def test_interiors_are_connected_and_flow_fields_lead_to_targets(self):
+        steps = {'N': (0, -1), 'E': (1, 0), 'S': (0, 1), 'W': (-1, 0)}
+        for size in views.ROOM_SIZES:
+            for variant in range(layouts.LAYOUT_VARIANTS):
+                layout = layouts.layout_template(size, variant)
+                tiles  = layout['tiles']
+                if size >= 16:
+                    self.assertTrue(any(1 in row[1:-1] for row in tiles[1:-1]), (size, variant))
+                for name, field in layout['flow_fields'].items():
+                    for y, row in enumerate(tiles):
+                        for x, cell in enumerate(row):
+                            if cell == 1:
+                                self.assertEqual(field[y][x], '#')
+                                continue
+                            # Every open tile reaches a target by following the field
+                            cx, cy = x, y
+                            for _ in range(size * size):
+                                if field[cy][cx] == 'X':
+                                    break
+                                dx, dy = steps[field[cy][cx]]
+                                cx, cy = cx + dx, cy + dy
+                                self.assertNotEqual(tiles[cy][cx], 1)
+                            self.assertEqual(field[cy][cx], 'X', (size, variant, name, x, y))
+
+    def test_encoded_template_is_cached_per_variant(self):
+        a = views.generate_room_layout(12, variant=0)
+        b = views.generate_room_layout(12, variant=1)
+        room_a = views.encode_room_tiles({'layout': a}, 'rle')
+        room_b = views.encode_room_tiles({'layout': b}, 'rle')
+        self.assertEqual(tile_encoding.decode_tiles(room_a['layout']['tiles']), [list(r) for r in a['tiles']])
+        self.assertEqual(tile_encoding.decode_tiles(room_b['layout']['tiles']), [list(r) for r in b['tiles']])
+
+
+class TileEncodingTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        tiles = views.generate_room_layout(16)['tiles']
+        for encoding in (tile_encoding.TILE_ENCODING_RLE, tile_encoding.TILE_ENCODING_B64):
+            encoded = tile_encoding.encode_tiles(tiles, encoding)
+            self.assertEqual(tile_encoding.decode_tiles(encoded), [list(r) for r in tiles])
+
+    def test_generate_room_view_encodes_tiles(self):
+        res = self.client.get('/game/generate/room/', {'rooms_cleared': 4, 'tiles': 'rle'})
+        self.assertEqual(res.status_code, 200)
+        tiles = res.json()['layout']['tiles']
+        self.assertEqual(tiles['encoding'], 'rle')
+        self.assertEqual(len(tile_encoding.decode_tiles(tiles)), res.json()['height'])
+
+    def test_accept_header_selects_encoding(self):
+        res = self.client.get('/game/generate/room/', HTTP_ACCEPT='application/json; tiles=b64')
+        self.assertEqual(res.json()['layout']['tiles']['encoding'], 'b64')
+
+    def test_posted_room_tiles_are_checked_before_encoding(self):
+        for encoding, tiles in [('rle', [1, 2, 3]), ('b64', [[300]]), ('rle', [[1, 2], [3]]), ('b64', [['x']])]:
+            room = {'room_number': 1, 'enemies': [], 'layout': {'size': 8, 'variant': 0, 'tiles': tiles}}
+            res  = self.client.post(
+                f'/game/generate/leave-room/?tiles={encoding}', {'room': room}, content_type='application/json'
+            )
+            self.assertEqual(res.status_code, 200, tiles)
+            self.assertEqual(res.json()['cleared_room']['layout']['tiles'], tiles)
+
+        room = {'room_number': 1, 'enemies': [], 'layout': {'tiles': [[0, 1], [1, 0]]}}
+        res  = self.client.post('/game/generate/leave-room/?tiles=b64', {'room': room}, content_type='application/json')
+        self.assertEqual(tile_encoding.decode_tiles(res.json()['cleared_room']['layout']['tiles']), [[0, 1], [1, 0]])
+
+    def test_posted_room_with_odd_variant(self):
+        for variant in ([1], {'a': 1}, '1', None):
+            room = {'room_number': 1, 'enemies': [], 'layout': {'variant': variant, 'tiles': [[0, 1], [1, 0]]}}
+            res  = self.client.post(
+                '/game/generate/leave-room/?tiles=rle', {'room': room}, content_type='application/json'
+            )
+            self.assertEqual(res.status_code, 200, variant)
+
+    def test_unknown_encoding_is_rejected(self):
+        res = self.client.get('/game/generate/room/', {'tiles': 'zip'})
+        self.assertEqual(res.status_code, 400)
+
+
+class GenerateRoomsViewTests(SimpleTestCase):
+
+    def test_returns_consecutive_rooms(self):
+        res = self.client.get('/game/generate/rooms/', {'from': 5, 'count': 3})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r['room_number'] for r in res.json()['rooms']], [5, 6, 7])
+
+    def test_count_is_bounded(self):
+        res = self.client.get('/game/generate/rooms/', {'count': views.MAX_PREFETCH_ROOMS + 1})
+        self.assertEqual(res.status_code, 400)
+
+
+class RunStoreTests(SimpleTestCase):
+
+    def test_lru_eviction(self):
+        store = RunStore(max_runs=2)
+        store.put('a', {'n': 1})
+        store.put('b', {'n': 2})
+        store.get('a')
+        store.put('c', {'n': 3})
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(store.get('a'), {'n': 1})
+
+    def test_ttl_expiry(self):
+        now   = [0.0]
+        store = RunStore(ttl=10, clock=lambda: now[0])
+        store.put('a', {'n': 1})
+        now[0] = 11
+        self.assertIsNone(store.get('a'))
+
+    def test_sqlite_backing_survives_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = RunStore(max_runs=1, sqlite_path=os.path.join(tmp, 'runs.sqlite3'))
+            store.put('a', {'n': 1})
+            store.put('b', {'n': 2})
+            self.assertEqual(store.get('a'), {'n': 1})
+            store._db.close()
+
+
+def _kill_all(room) -> list:
+    """Combat events that kill every enemy in `room`."""
+    return [
+        event
+        for enemy in room['enemies']
+        for event in (
+            {'type': 'damage', 'enemy_id': enemy['id'], 'amount': enemy['health']},
+            {'type': 'kill', 'enemy_id': enemy['id']},
+        )
+    ]
+
+
+def _clear_run_room(client, run_id, room):
+    """Report the room's enemies killed, so the run may move on from it."""
+    client.post(
+        '/game/generate/combat-events/', {'run_id': run_id, 'events': _kill_all(room)},
+        content_type='application/json',
+    )
+
+
+class RunSessionViewTests(SimpleTestCase):
+
+    def test_run_round_trip_with_ids_only(self):
+        res = self.client.post('/game/generate/run/', {}, content_type='application/json')
+        self.assertEqual(res.status_code, 201)
+        run_id  = res.json()['run_id']
+        room    = res.json()['room']
+        killed  = [e['id'] for e in room['enemies']]
+
+        # Claimed kills alone don't clear the room; reconciled ones do
+        res = self.client.post(
+            '/game/generate/leave-room/', {'run_id': run_id, 'killed': killed}, content_type='application/json'
+        )
+        self.assertEqual(res.status_code, 400)
+
+        _clear_run_room(self.client, run_id, room)
+        res = self.client.post('/game/generate/leave-room/', {'run_id': run_id}, content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.json()['cleared_room']['is_cleared'])
+
+        res = self.client.post(
+            '/game/generate/next-room/', {'run_id': run_id, 'player_health': 50}, content_type='application/json'
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['next_room']['room_number'], 1)
+
+    def test_prefetched_rooms_are_reused(self):
+        run    = self.client.post('/game/generate/run/', {}, content_type='application/json').json()
+        run_id = run['run_id']
+        rooms  = self.client.get('/game/generate/rooms/', {'from': 1, 'count': 2, 'run_id': run_id}).json()['rooms']
+        _clear_run_room(self.client, run_id, run['room'])
+        res    = self.client.post(
+            '/game/generate/next-room/', {'run_id': run_id, 'player_health': 50}, content_type='application/json'
+        )
+        self.assertEqual(res.json()['next_room'], rooms[0])
+
+    def test_uncleared_room_cannot_be_advanced(self):
+        run    = self.client.post('/game/generate/run/', {}, content_type='application/json').json()
+        killed = [e['id'] for e in run['room']['enemies']]
+        for _ in range(3):
+            res = self.client.post(
+                '/game/generate/next-room/', {'run_id': run['run_id'], 'player_health': 50, 'killed': killed},
+                content_type='application/json',
+            )
+            self.assertEqual(res.status_code, 400)
+            self.assertEqual(res.json()['enemies_alive'], len(killed))
+        self.assertEqual(get_run_store().get(run['run_id'])['rooms_cleared'], 0)
+
+    def test_unknown_run(self):
+        res = self.client.post(
+            '/game/generate/next-room/', {'run_id': 'nope', 'player_health': 50}, content_type='application/json'
+        )
+        self.assertEqual(res.status_code, 404)
+
+
+def _apply_patch(doc, ops):
+    """Enough of RFC 6902 (add/replace/remove on objects) for room patches."""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        *parents, last = [t.replace('~1', '/').replace('~0', '~') for t in op['path'].split('/')[1:]]
+        target = doc
+        for token in parents:
+            target = target[token]
+        if op['op'] == 'remove':
+            del target[last]
+        else:
+            target[last] = op['value']
+    return doc
+
+
+class DeltaResponseTests(SimpleTestCase):
+
+    def test_patch_rebuilds_cleared_room_without_tiles(self):
+        room = views.generate_room(rooms_cleared=4)
+        ops  = views.room_patch(room, views.clear_room(room))
+        self.assertEqual(_apply_patch(room, ops), views.clear_room(room))
+        self.assertNotIn('/layout/tiles', [op['path'] for op in ops])
+        self.assertIn({'op': 'replace', 'path': '/layout/exits_open', 'value': True}, ops)
+
+    def test_patch_escapes_keys_and_removes(self):
+        ops = views.room_patch({'a/b': 1, 'gone': 2}, {'a/b': 3, 'c~': 4})
+        self.assertEqual(ops, [
+            {'op': 'replace', 'path': '/a~1b', 'value': 3},
+            {'op': 'add', 'path': '/c~0', 'value': 4},
+            {'op': 'remove', 'path': '/gone'},
+        ])
+
+    def test_leave_room_delta_in_a_run(self):
+        res    = self.client.post('/game/generate/run/?tiles=json', {}, content_type='application/json').json()
+        served = res['room']
+        _clear_run_room(self.client, res['run_id'], served)
+        res    = self.client.post(
+            '/game/generate/leave-room/', {'run_id': res['run_id'], 'delta': True},
+            content_type='application/json',
+        ).json()
+        self.assertNotIn('cleared_room', res)
+        cleared = _apply_patch(served, res['cleared_room_patch'])
+        self.assertEqual(cleared, views.clear_room(served))
+
+    def test_next_room_delta(self):
+        room = views.generate_room(rooms_cleared=2)
+        res  = self.client.post(
+            '/game/generate/next-room/',
+            {'current_room': room, 'player_health': 50, 'rooms_cleared': 2, 'delta': True},
+            content_type='application/json',
+        ).json()
+        self.assertNotIn('cleared_room', res)
+        self.assertEqual(_apply_patch(room, res['cleared_room_patch']), views.clear_room(room))
+        self.assertEqual(res['next_room']['room_number'], 3)
+
+
+class CombatEventsTests(SimpleTestCase):
+
+    def setUp(self):
+        res         = self.client.post('/game/generate/run/', {}, content_type='application/json').json()
+        self.run_id = res['run_id']
+        self.enemies = res['room']['enemies']
+
+    def _send(self, events):
+        return self.client.post(
+            '/game/generate/combat-events/', {'run_id': self.run_id, 'events': events},
+            content_type='application/json',
+        )
+
+    def _kill(self, enemy, t=0):
+        return [
+            {'type': 'damage', 'enemy_id': enemy['id'], 'amount': enemy['health'], 't': t},
+            {'type': 'kill', 'enemy_id': enemy['id'], 't': t},
+        ]
+
+    def test_batch_is_reconciled_against_the_room(self):
+        events = [e for enemy in self.enemies for e in self._kill(enemy)]
+        # A repeat kill and an invented enemy earn nothing
+        events += [{'type': 'kill', 'enemy_id': self.enemies[0]['id'], 't': 1},
+                   {'type': 'kill', 'enemy_id': 'r0_e99', 't': 2}]
+        res = self._send(events).json()
+        self.assertEqual(res['accepted'], 2 * len(self.enemies))
+        self.assertEqual([r['reason'] for r in res['rejected']], ['enemy already dead', 'unknown enemy'])
+        self.assertEqual(res['coins_earned'], sum(e['coin_reward'] for e in self.enemies))
+        self.assertTrue(res['room_cleared'])
+
+        # next-room uses the reconciled total, whatever the client claims
+        res = self.client.post(
+            '/game/generate/next-room/', {'run_id': self.run_id, 'player_health': 50, 'coins_earned': 10 ** 6},
+            content_type='application/json',
+        ).json()
+        self.assertEqual(res['total_coins'], sum(e['coin_reward'] for e in self.enemies))
+
+    def test_leave_patch_is_against_the_room_as_served(self):
+        served = get_run_store().get(self.run_id)['current_room']
+        self.assertTrue(self._send([e for enemy in self.enemies for e in self._kill(enemy)]).json()['room_cleared'])
+
+        res = self.client.post(
+            '/game/generate/leave-room/', {'run_id': self.run_id, 'delta': True}, content_type='application/json',
+        ).json()
+        self.assertIn({'op': 'replace', 'path': '/enemies_alive', 'value': 0}, res['cleared_room_patch'])
+        self.assertEqual(_apply_patch(copy.deepcopy(served), res['cleared_room_patch']), views.clear_room(served))
+
+    def test_kill_needs_enough_damage(self):
+        enemy = self.enemies[0]
+        res   = self._send([
+            {'type': 'damage', 'enemy_id': enemy['id'], 'amount': 1, 't': 0},
+            {'type': 'kill', 'enemy_id': enemy['id'], 't': 5},
+        ]).json()
+        self.assertEqual(res['rejected'], [{'index': 1, 'reason': 'not enough damage dealt'}])
+        self.assertEqual(res['coins_earned'], 0)
+        # Damage carries over between batches
+        res = self._send(self._kill(enemy, t=10)).json()
+        self.assertEqual(res['coins_earned'], enemy['coin_reward'])
+
+    def test_malformed_batches(self):
+        enemy_id = self.enemies[0]['id']
+        for events in (
+            [],
+            'nope',
+            [{'type': 'heal', 'enemy_id': enemy_id}],
+            [{'type': 'damage', 'enemy_id': enemy_id, 'amount': True}],
+            [{'type': 'kill', 'enemy_id': enemy_id, 't': 5}, {'type': 'kill', 'enemy_id': enemy_id, 't': 4}],
+        ):
+            self.assertEqual(self._send(events).status_code, 400, events)
+        res = self.client.post(
+            '/game/generate/combat-events/', {'run_id': 'nope', 'events': []}, content_type='application/json'
+        )
+        self.assertEqual(res.status_code, 404)
+
+
+@override_settings(GAME_ROOM_POOL={'ENABLED': True, 'AUTOSTART': False, 'SIZE': 3, 'LOW_WATER': 1, 'WARM': 0})
+class RoomPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = room_pool.RoomPool(views._pool_rooms, max_difficulty=views.DIFFICULTY_TIER_CAP)
+        patcher   = mock.patch.object(views, 'ROOM_POOL', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _count(self, name, difficulty, room_type='any'):
+        counters, _ = REGISTRY.collect()
+        return counters.get((name, (('difficulty', difficulty), ('room_type', room_type))), 0)
+
+    def test_miss_then_hits_from_the_refilled_buffer(self):
+        misses = self._count('room_pool_misses_total', 2)
+        room   = views.take_room(4)
+        self.assertEqual(room['room_number'], 4)
+        self.assertEqual(self._count('room_pool_misses_total', 2), misses + 1)
+
+        self.pool.fill()
+        self.assertEqual(self.pool.stats(), {(2, None): 3})
+        hits = self._count('room_pool_hits_total', 2)
+        room = views.take_room(5)
+        self.assertEqual(self._count('room_pool_hits_total', 2), hits + 1)
+        self.assertEqual(self.pool.stats(), {(2, None): 2})
+
+        # Patched to the position it's served at
+        self.assertEqual((room['room_number'], room['difficulty'], room['next_increase_in']), (5, 2, 1))
+        self.assertEqual([e['id'] for e in room['enemies']], [f'r5_e{i}' for i in range(room['enemy_count'])])
+
+    def test_large_refills_are_batched(self):
+        views.take_room(0)
+        views.take_room(7)
+        with override_settings(GAME_ROOM_POOL={'SIZE': 20}), \
+                mock.patch.object(batch_generation, 'generate_rooms', wraps=batch_generation.generate_rooms) as batch:
+            self.pool.fill()
+        batch.assert_called_once()
+        self.assertEqual(self.pool.stats(), {(1, 'entrance'): 20, (3, None): 20})
+        self.assertEqual(views.take_room(7)['difficulty'], 3)
+
+    def test_entrance_is_never_locked(self):
+        views.take_room(0)
+        self.pool.fill()
+        for _ in range(3):
+            room = views.take_room(0)
+            self.assertEqual((room['type'], room['is_locked']), ('entrance', False))
+
+    def test_unpooled_requests_generate_inline(self):
+        self.assertEqual(views.take_room(3, room_type='vault')['type'], 'vault')
+        self.assertEqual(views.take_room(10 ** 4)['room_number'], 10 ** 4)
+        with override_settings(GAME_ROOM_POOL={'ENABLED': False}):
+            views.take_room(4)
+        self.assertEqual(self.pool.stats(), {})
+
+    def test_levels_are_exported(self):
+        views.take_room(4)
+        self.pool.fill()
+        text = '\n'.join(f'{name} {labels} {value}' for name, labels, value in self.pool.gauges())
+        self.assertIn("room_pool_rooms (('difficulty', 2), ('room_type', 'any')) 3", text)
+        self.assertIn('room_pool_low_water () 1', text)
+
+
+class SeededRoomTests(SimpleTestCase):
+
+    def _json(self, room):
+        return json.loads(json.dumps(room))
+
+    def _post(self, path, body):
+        return self.client.post(path, body, content_type='application/json')
+
+    def test_seed_and_room_number_fix_the_room(self):
+        self.assertEqual(views.seeded_room(42, 7), views.seeded_room(42, 7))
+        self.assertNotEqual(views.seeded_room(42, 7), views.seeded_room(43, 7))
+        self.assertEqual(views.seeded_room(42, 7, 'boss_room')['type'], 'boss_room')
+
+    def test_run_replays_from_its_seed(self):
+        run = self._post('/game/generate/run/', {}).json()
+        self.assertEqual(run['room'], self._json(views.seeded_room(run['seed'], 0, 'entrance')))
+
+        # Prefetched or generated at next-room, a run's rooms come from the seed
+        self.client.get('/game/generate/rooms/', {'from': 1, 'count': 1, 'run_id': run['run_id']})
+        rooms = [run['room']]
+        for _ in range(2):
+            _clear_run_room(self.client, run['run_id'], rooms[-1])
+            res = self._post('/game/generate/next-room/', {'run_id': run['run_id'], 'player_health': 50}).json()
+            rooms.append(res['next_room'])
+
+        replay = self._post('/game/generate/run/', {'seed': run['seed']}).json()
+        self.assertEqual((replay['seed'], replay['room']), (run['seed'], rooms[0]))
+        out = io.StringIO()
+        call_command('replay_run', str(run['seed']), '--rooms', '3', stdout=out)
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], rooms)
+
+    def test_bad_seeds(self):
+        for seed in (-1, views.MAX_SEED + 1, 'x', 1.5, [1]):
+            self.assertEqual(self._post('/game/generate/run/', {'seed': seed}).status_code, 400, seed)
+        self.assertEqual(self.client.get('/game/generate/room/', {'seed': 'x'}).status_code, 400)
+
+    def test_seeded_gets_are_conditional(self):
+        query = {'seed': 9, 'rooms_cleared': 5}
+        res   = self.client.get('/game/generate/room/', query)
+        etag  = res['ETag']
+        self.assertEqual(res['Cache-Control'], views.SEEDED_CACHE_CONTROL)
+        self.assertEqual(res.json(), self._json(views.seeded_room(9, 5)))
+
+        self.assertIn('Accept', res['Vary'])
+
+        res = self.client.get('/game/generate/room/', query, headers={'If-None-Match': etag})
+        self.assertEqual((res.status_code, res['ETag']), (304, etag))
+        self.assertIn('Accept', res['Vary'])
+        self.assertNotEqual(self.client.get('/game/generate/room/', {**query, 'tiles': 'rle'})['ETag'], etag)
+        # Same URL, encoding negotiated from Accept: a different ETag
+        rle = self.client.get('/game/generate/room/', query, headers={'Accept': 'application/json; tiles=rle'})
+        self.assertNotEqual(rle['ETag'], etag)
+        self.assertNotIn('ETag', self.client.get('/game/generate/room/', {'rooms_cleared': 5}))
+
+        res = self.client.get('/game/generate/rooms/', {'seed': 9, 'from': 5, 'count': 2})
+        self.assertIn('ETag', res)
+        self.assertEqual(res.json()['rooms'][0], self._json(views.seeded_room(9, 5)))
+
+
+class BatchEnemyGenerationTests(SimpleTestCase):
+
+    def test_batch_matches_scalar_rules(self):
+        rooms_cleared = np.arange(0, 90)
+        batch = batch_generation.generate_enemy_batch(rooms_cleared, rng=np.random.default_rng(7))
+        rooms = batch_generation.enemy_batch_to_dicts(batch)
+        self.assertEqual(len(rooms), len(rooms_cleared))
+
+        for n, enemies in zip(rooms_cleared.tolist(), rooms):
+            d   = views.get_difficulty_level(n)
+            cfg = views.get_difficulty_config(d)
+            self.assertTrue(cfg['enemy_count'][0] <= len(enemies) <= cfg['enemy_count'][1])
+            for i, e in enumerate(enemies):
+                self.assertEqual(e['id'], f'r{n}_e{i}')
+                self.assertIn(e['type'], views.get_enemy_type_pool(d))
+                self.assertTrue(cfg['enemy_level'][0] <= e['level'] <= cfg['enemy_level'][1])
+                mult = views.ENEMY_TYPE_STATS[e['type']]
+                hp, atk, dfn, coin = views.base_enemy_stats(e['level'], d)
+                self.assertEqual(e['health'], int(hp * mult['hp']))
+                self.assertEqual(e['defense'], int(dfn * mult['def']))
+                self.assertEqual(e['coin_reward'], int(coin * mult['coin']))
+
+    def test_empty_batch(self):
+        batch = batch_generation.generate_enemy_batch([])
+        self.assertEqual(batch_generation.enemy_batch_to_dicts(batch), [])
+
+
+    def test_batched_rooms_match_generate_room(self):
+        rooms = batch_generation.generate_rooms(np.arange(0, 30), rng=np.random.default_rng(3))
+        self.assertEqual([r['room_number'] for r in rooms], list(range(30)))
+        self.assertEqual(rooms[0]['type'], 'entrance')
+        self.assertEqual(set(rooms[5]), set(views.generate_room(5)))
+        for room in rooms:
+            self.assertEqual(room['total_coins_available'], sum(e['coin_reward'] for e in room['enemies']))
+
+        bosses = batch_generation.generate_rooms([4] * 10, room_type='boss_room')
+        self.assertTrue(all(room['has_boss'] for room in bosses))
+
+
+class SimulateRunsCommandTests(SimpleTestCase):
+
+    def test_writes_columnar_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = io.StringIO()
+            call_command(
+                'simulate_runs', runs=20, chunk_size=5, workers=2, seed=3, output=tmp, stdout=out
+            )
+            schema = json.loads(open(os.path.join(tmp, 'schema.json')).read())
+            coins  = np.fromfile(os.path.join(tmp, 'coins.bin'), dtype=schema['columns']['coins'])
+            runs   = np.fromfile(os.path.join(tmp, 'run_id.bin'), dtype=schema['columns']['run_id'])
+
+        self.assertEqual(len(coins), schema['rows'])
+        self.assertEqual(set(runs.tolist()), set(range(20)))
+        self.assertIn('20 runs', out.getvalue())
+
+
+class BenchmarkSuiteTests(SimpleTestCase):
+
+    def test_every_case_runs(self):
+        for name in benchmarks.CASES:
+            result = benchmarks.run_case(name, min_time=0)
+            self.assertGreater(result['ops_per_sec'], 0, name)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'a': {'ops_per_sec': 1000}, 'b': {'ops_per_sec': 1000}}
+        results  = {'a': {'ops_per_sec': 850}, 'b': {'ops_per_sec': 700}, 'c': {'ops_per_sec': 1}}
+        self.assertEqual(benchmarks.compare(results, baseline, threshold=0.2), ['b'])
+
+
+class FastJSONTests(SimpleTestCase):
+
+    def test_renderer_matches_stdlib(self):
+        room = {**benchmarks.room_of_size(12), 'price': Decimal('1.50')}
+        body = renderers.FastJSONRenderer().render(room)
+        self.assertEqual(json.loads(body), json.loads(JSONRenderer().render(room)))
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            body = renderers.FastJSONRenderer().render({'tiles': ((0, 1),)})
+            self.assertEqual(json.loads(body), {'tiles': [[0, 1]]})
+            self.assertEqual(renderers.FastJSONParser().parse(io.BytesIO(b'{"a":1}')), {'a': 1})
+
+    def test_parser_errors(self):
+        self.assertEqual(renderers.FastJSONParser().parse(io.BytesIO(b'{"a":[1,2]}')), {'a': [1, 2]})
+        with self.assertRaises(ParseError):
+            renderers.FastJSONParser().parse(io.BytesIO(b'{"a":'))
+
+    def test_generate_routes_skip_negotiation(self):
+        res = self.client.get('/game/generate/room/', HTTP_ACCEPT='application/xml')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn('layout', res.json())
+
+
+class LeanRouteTests(TestCase):
+
+    def test_generate_routes_skip_the_middleware_stack(self):
+        lean = self.client.get('/game/generate/room/')
+        self.assertEqual(lean.status_code, 200)
+        self.assertNotIn('X-Frame-Options', lean)
+        # Other routes still get the full stack
+        self.assertIn('X-Frame-Options', self.client.get('/game/leaderboard/'))
+
+    def test_jwt_is_not_decoded_unless_needed(self):
+        bad = {'HTTP_AUTHORIZATION': 'Bearer not-a-token'}
+        self.assertEqual(self.client.get('/game/generate/room/', **bad).status_code, 200)
+        # Runs persist and mark rooms, but only a score needs the user
+        res = self.client.post('/game/generate/run/', content_type='application/json', **bad)
+        self.assertEqual(res.status_code, 201)
+        # Game over records the score for request.user, so the token is checked there
+        run_id = self.client.post('/game/generate/run/', content_type='application/json').json()['run_id']
+        res    = self.client.post(
+            '/game/generate/next-room/', {'player_health': 0, 'run_id': run_id},
+            content_type='application/json', **bad,
+        )
+        self.assertEqual(res.status_code, 401)
+
+    def test_unresolved_paths_fall_through(self):
+        res = self.client.get('/game/generate/room')
+        self.assertEqual(res.status_code, 301)   # CommonMiddleware's APPEND_SLASH
+        self.assertEqual(self.client.get('/game/generate/nope/').status_code, 404)
+
+
+class MetricsTests(TestCase):
+
+    def _series(self, name, **labels):
+        counters, histograms = REGISTRY.collect()
+        key = (name, tuple(labels.items()))
+        return counters.get(key, histograms.get(key))
+
+    def test_histogram_rendering(self):
+        registry = Registry(buckets=(0.1, 1.0))
+        registry.describe('latency_seconds', 'histogram', 'Latency.')
+        registry.observe('latency_seconds', (('view', 'a"b'),), 0.5)
+        registry.observe('latency_seconds', (('view', 'a"b'),), 2.0)
+        text = registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{view="a\\"b",le="0.1"} 0', text)
+        self.assertIn('latency_seconds_bucket{view="a\\"b",le="1.0"} 1', text)
+        self.assertIn('latency_seconds_bucket{view="a\\"b",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_sum{view="a\\"b"} 2.5', text)
+        self.assertIn('latency_seconds_count{view="a\\"b"} 2', text)
+
+    def test_requests_are_recorded_per_view(self):
+        before = self._series('http_responses_total', view='generate_room', status=200) or 0
+        self.client.get('/game/generate/room/')   # lean route
+        self.client.get('/game/leaderboard/')
+        self.assertEqual(self._series('http_responses_total', view='generate_room', status=200), before + 1)
+        counts, _ = self._series('http_request_duration_seconds', view='leaderboard', method='GET')
+        self.assertGreaterEqual(sum(counts), 1)
+
+    def test_db_queries_are_counted(self):
+        before = self._series('http_request_db_queries_total', view='leaderboard') or 0
+        # A cold board, so the request has to load it
+        with mock.patch.object(leaderboard, 'LEADERBOARD', leaderboard.Leaderboard(leaderboard._load_from_db)):
+            self.client.get('/game/leaderboard/')
+        self.assertGreater(self._series('http_request_db_queries_total', view='leaderboard'), before)
+        self.assertIsNotNone(self._series('http_request_db_seconds_total', view='leaderboard'))
+
+    def test_metrics_endpoint(self):
+        self.client.get('/game/generate/enemy/')
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('http_request_duration_seconds_bucket{view="generate_enemy",method="GET",le="+Inf"}', res.content.decode())
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        board   = leaderboard.Leaderboard(load=leaderboard._load_from_db)
+        patcher = mock.patch.object(leaderboard, 'LEADERBOARD', board)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _die(self, user, rooms_cleared, coins, claims=None):
+        # Scores come from the run, so start one that has got this far
+        run_id = get_run_store().create({
+            'seed':          1,
+            'rooms_cleared': rooms_cleared,
+            'coins':         coins,
+            'current_room':  views.seeded_room(1, rooms_cleared),
+            'upcoming':      {},
+        })
+        return self.client.post(
+            '/game/generate/next-room/',
+            {'player_health': 0, 'run_id': run_id, **(claims or {})},
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}',
+        ).json()
+
+    def test_index_ranks_and_ties(self):
+        board = leaderboard.Leaderboard()
+        for user_id, score in [(1, 50), (2, 80), (3, 50), (4, 10)]:
+            board.update(user_id, f'p{user_id}', score)
+        self.assertFalse(board.update(2, 'p2', 70))
+        self.assertEqual(board.rank(2), (1, 80))
+        self.assertEqual(board.rank(3), (2, 50))
+        self.assertEqual(board.rank(4), (4, 10))
+        self.assertEqual([e['rank'] for e in board.top(4)], [1, 2, 2, 4])
+
+        board.update(4, 'p4', 100)
+        self.assertEqual(board.rank(4), (1, 100))
+        self.assertEqual(board.rank(2), (2, 80))
+        self.assertIsNone(board.rank(99))
+
+    def test_game_over_records_high_score(self):
+        alice = User.objects.create_user('alice')
+        bob   = User.objects.create_user('bob')
+
+        data = self._die(alice, 5, 30)
+        self.assertEqual(data['score'], leaderboard.run_score(5, 30))
+        self.assertEqual(data['rank'], 1)
+        self.assertEqual(self._die(bob, 9, 0)['rank'], 1)
+
+        # A worse run keeps the old high score
+        data = self._die(alice, 1, 0)
+        self.assertEqual((data['rank'], data['high_score']), (2, leaderboard.run_score(5, 30)))
+        self.assertEqual(PlayerProfile.objects.get(user=alice).high_score, leaderboard.run_score(5, 30))
+
+        res = self.client.get(
+            '/game/leaderboard/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(alice)}'
+        ).json()
+        self.assertEqual([e['username'] for e in res['top']], ['bob', 'alice'])
+        self.assertEqual(res['me']['rank'], 2)
+
+    def test_client_claims_are_not_recorded(self):
+        alice = User.objects.create_user('alice')
+        self._die(alice, 2, 5, {'rooms_cleared': 10 ** 9, 'coins_earned': 10 ** 9})
+        self.assertEqual(PlayerProfile.objects.get(user=alice).high_score, leaderboard.run_score(2, 5))
+
+        # Without a run there's nothing to check the claim against
+        data = self.client.post(
+            '/game/generate/next-room/', {'player_health': 0, 'rooms_cleared': 10 ** 9},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(alice)}',
+        ).json()
+        self.assertNotIn('rank', data)
+        self.assertEqual(PlayerProfile.objects.get(user=alice).high_score, leaderboard.run_score(2, 5))
+
+    def test_anonymous_game_over_is_not_recorded(self):
+        res = self.client.post(
+            '/game/generate/next-room/', {'player_health': 0, 'rooms_cleared': 3}, content_type='application/json'
+        ).json()
+        self.assertNotIn('rank', res)
+        self.assertFalse(PlayerProfile.objects.exists())
+        self.assertIsNone(self.client.get('/game/leaderboard/').json()['me'])
+
+    def test_index_rebuilt_from_db(self):
+        carol = User.objects.create_user('carol')
+        PlayerProfile.objects.create(user=carol, high_score=420)
+        board = leaderboard.Leaderboard(load=leaderboard._load_from_db)
+        self.assertEqual(board.rank(carol.pk), (1, 420))
+        self.assertEqual(board.top(1)[0]['username'], 'carol')
+
+
+@override_settings(GAME_PERSISTENCE={'ENABLED': True})
+class PersistedRunTests(TestCase):
+
+    def test_run_rooms_are_bulk_written(self):
+        run = self.client.post('/game/generate/run/', {}, content_type='application/json').json()
+        self.assertEqual(Room.objects.count(), 1)
+        self.assertEqual(Enemy.objects.count(), run['room']['enemy_count'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/game/generate/rooms/', {'from': 1, 'count': 5, 'run_id': run['run_id']}).json()
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)   # one for the rooms, one for all their enemies
+        self.assertEqual(Room.objects.count(), 6)
+        self.assertEqual(Enemy.objects.count(), run['room']['enemy_count'] + sum(r['enemy_count'] for r in res['rooms']))
+
+        stored = Room.objects.get(room_id=f"{run['run_id']}:3")
+        self.assertEqual(stored.layout_data['room_number'], 3)
+        self.assertNotIn('enemies', stored.layout_data)
+
+    def test_next_room_marks_cleared(self):
+        run    = self.client.post('/game/generate/run/', {}, content_type='application/json').json()
+        run_id = run['run_id']
+        _clear_run_room(self.client, run_id, run['room'])
+        self.client.post(
+            '/game/generate/next-room/', {'run_id': run_id, 'player_health': 50}, content_type='application/json'
+        )
+        first = Room.objects.get(room_id=f'{run_id}:0')
+        self.assertTrue(first.is_cleared)
+        self.assertFalse(first.enemies.filter(is_alive=True).exists())
+        self.assertFalse(Room.objects.get(room_id=f'{run_id}:1').is_cleared)
+
+    @override_settings(GAME_PERSISTENCE={'ENABLED': False})
+    def test_disabled_by_default(self):
+        self.client.post('/game/generate/run/', {}, content_type='application/json')
+        self.assertFalse(Room.objects.exists())
+
+    def test_enemy_admin_query_count_is_flat(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get('/admin/game_logic/enemy/').status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.client.post('/game/generate/run/', {}, content_type='application/json')
+        few = changelist_queries()
+        for _ in range(5):
+            self.client.post('/game/generate/run/', {}, content_type='application/json')
+        self.assertEqual(changelist_queries(), few)
+
+
+@override_settings(ROOT_URLCONF='src.urls_async')
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        board   = leaderboard.Leaderboard(load=leaderboard._load_from_db)
+        patcher = mock.patch.object(leaderboard, 'LEADERBOARD', board)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _post(self, path, body, **extra):
+        return await self.async_client.post(path, body, content_type='application/json', **extra)
+
+    async def test_run_flow_matches_sync_views(self):
+        run = (await self._post('/game/generate/run/', {})).json()
+        self.assertEqual(run['room']['room_number'], 0)
+
+        res = await self.async_client.get('/game/generate/rooms/', {'from': 1, 'count': 2, 'run_id': run['run_id']})
+        self.assertEqual([r['room_number'] for r in res.json()['rooms']], [1, 2])
+
+        await self._post('/game/generate/combat-events/', {'run_id': run['run_id'], 'events': _kill_all(run['room'])})
+        res = await self._post('/game/generate/leave-room/', {'run_id': run['run_id']})
+        self.assertTrue(res.json()['cleared_room']['is_cleared'])
+
+        res = await self._post('/game/generate/next-room/', {'run_id': run['run_id'], 'player_health': 80})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['next_room']['room_number'], 1)
+
+        enemy = res.json()['next_room']['enemies'][0]
+        res   = await self._post('/game/generate/combat-events/', {'run_id': run['run_id'], 'events': [
+            {'type': 'damage', 'enemy_id': enemy['id'], 'amount': enemy['health']},
+            {'type': 'kill', 'enemy_id': enemy['id']},
+        ]})
+        self.assertEqual(res.json()['coins_earned'], enemy['coin_reward'])
+
+    async def test_seeded_rooms_are_conditional(self):
+        query = {'seed': '9', 'rooms_cleared': '5'}
+        etag  = views.seeded_etag(query, 'json', ('rooms_cleared', 'room_type'))
+        res   = await self.async_client.get('/game/generate/room/', query)
+        self.assertEqual(res['ETag'], etag)
+        res   = await self.async_client.get('/game/generate/room/', query, headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertIn('Accept', res['Vary'])
+
+    async def test_errors(self):
+        res = await self.async_client.get('/game/generate/room/', {'rooms_cleared': -1})
+        self.assertEqual(res.status_code, 400)
+        res = await self.async_client.post('/game/generate/kill-enemy/', '{', content_type='application/json')
+        self.assertEqual(res.status_code, 400)
+        res = await self._post('/game/generate/next-room/', {'run_id': 'nope', 'player_health': 1})
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual((await self.async_client.get('/game/generate/run/')).status_code, 405)
+
+    async def test_game_over_records_score_with_async_orm(self):
+        user   = await User.objects.acreate(username='dana')
+        auth   = {'headers': {'Authorization': f'Bearer {AccessToken.for_user(user)}'}}
+        run_id = get_run_store().create(
+            {'seed': 1, 'rooms_cleared': 4, 'current_room': views.seeded_room(1, 4), 'upcoming': {}}
+        )
+        res    = await self._post('/game/generate/next-room/', {'player_health': 0, 'run_id': run_id}, **auth)
+        self.assertEqual(res.json()['rank'], 1)
+        board  = (await self.async_client.get('/game/leaderboard/', **auth)).json()
+        self.assertEqual(board['me']['score'], leaderboard.run_score(4, 0))
+
+        res = await self.async_client.get('/game/leaderboard/', headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(res.status_code, 401)
+
+
+class _Socket:
+    """Drives websocket_application() through the ASGI interface by hand."""
+
+    def __init__(self, path=websocket.WS_PATH, query=''):
+        self.inbox  = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        scope       = {'type': 'websocket', 'path': path, 'query_string': query.encode()}
+        self.task   = asyncio.create_task(websocket.websocket_application(scope, self.inbox.get, self.outbox.put))
+        self.inbox.put_nowait({'type': 'websocket.connect'})
+
+    async def event(self):
+        return await asyncio.wait_for(self.outbox.get(), 5)
+
+    async def frame(self):
+        return json.loads((await self.event())['text'])
+
+    async def call(self, frame_id, op, payload):
+        await self.inbox.put({'type': 'websocket.receive', 'text': json.dumps([frame_id, op, payload])})
+        return await self.frame()
+
+    async def close(self):
+        await self.inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 5)
+
+
+class WebSocketSessionTests(TestCase):
+
+    def setUp(self):
+        board   = leaderboard.Leaderboard(load=leaderboard._load_from_db)
+        patcher = mock.patch.object(leaderboard, 'LEADERBOARD', board)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_run_over_one_socket_with_pushed_next_room(self):
+        user = await User.objects.acreate(username='erin')
+        ws   = _Socket(query=f'tiles=rle&token={AccessToken.for_user(user)}')
+        self.assertEqual((await ws.event())['type'], 'websocket.accept')
+
+        frame_id, code, run = await ws.call(1, 'run', {})
+        self.assertEqual((frame_id, code), (1, 201))
+        self.assertEqual(run['room']['layout']['tiles']['encoding'], 'rle')
+
+        # The session's run id is filled in; clearing the room pushes the next one
+        self.assertEqual((await ws.call(2, 'combat', {'events': _kill_all(run['room'])}))[1], 200)
+        push_id, kind, body = await ws.frame()
+        self.assertEqual((push_id, kind, body['from']), (websocket.PUSH_ID, 'upcoming', 1))
+
+        _, code, res = await ws.call(3, 'next', {'player_health': 90})
+        self.assertEqual(code, 200)
+        self.assertEqual(res['next_room'], body['rooms'][0])
+
+        _, code, res = await ws.call(4, 'next', {'player_health': 0})
+        self.assertEqual(res['rank'], 1)
+        _, code, board = await ws.call(5, 'board', {})
+        self.assertEqual(board['me']['score'], res['score'])
+        await ws.close()
+        self.assertEqual(websocket.LAYER._groups, {})
+
+    async def test_bad_frames_get_400(self):
+        ws = _Socket()
+        await ws.event()
+        await ws.inbox.put({'type': 'websocket.receive', 'text': '{"not": "a frame"}'})
+        self.assertEqual((await ws.frame())[:2], [None, 400])
+        self.assertEqual((await ws.call(7, 'fly', {}))[:2], [7, 400])
+        # Malformed frames still answer their id, and an unhashable op doesn't drop the socket
+        self.assertEqual((await ws.call(10, ['x'], {}))[:2], [10, 400])
+        self.assertEqual((await ws.call(11, 'room', []))[:2], [11, 400])
+        await ws.inbox.put({'type': 'websocket.receive', 'text': '[12, "room"]'})
+        self.assertEqual((await ws.frame())[:2], [12, 400])
+        self.assertEqual((await ws.call(8, 'room', {'rooms_cleared': -1}))[:2], [8, 400])
+        self.assertEqual((await ws.call(9, 'next', {'run_id': 'nope', 'player_health': 1}))[:2], [9, 404])
+        await ws.close()
+
+    async def test_bad_payloads_keep_the_session(self):
+        ws = _Socket()
+        await ws.event()
+        self.assertEqual((await ws.call(1, 'rooms', {'from': [1]}))[:2], [1, 400])
+        self.assertEqual((await ws.call(2, 'rooms', {'run_id': [1]}))[:2], [2, 404])
+        self.assertEqual((await ws.call(3, 'board', {'limit': [1]}))[:2], [3, 400])
+        with mock.patch.dict(websocket.OPS, {'room': mock.Mock(side_effect=RuntimeError('boom'))}), \
+                self.assertLogs('game_logic.websocket', 'ERROR'):
+            self.assertEqual((await ws.call(4, 'room', {}))[:2], [4, 500])
+        self.assertEqual((await ws.call(5, 'room', {}))[:2], [5, 200])
+        await ws.close()
+
+    async def test_rejected_connections_are_closed(self):
+        for path, query, code in [
+            ('/elsewhere/', '', websocket.CLOSE_NOT_FOUND),
+            (websocket.WS_PATH, 'tiles=png', websocket.CLOSE_BAD_REQUEST),
+            (websocket.WS_PATH, 'token=not-a-token', websocket.CLOSE_UNAUTHORIZED),
+        ]:
+            ws = _Socket(path, query)
+            self.assertEqual(await ws.event(), {'type': 'websocket.close', 'code': code})
+            await asyncio.wait_for(ws.task, 5)
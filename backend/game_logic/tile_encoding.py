@@ -0,0 +1,123 @@
+import base64
+
+# Accepted values for the ?tiles= query param / `tiles=` Accept header param.
+TILE_ENCODING_JSON = 'json'
+TILE_ENCODING_RLE  = 'rle'
+TILE_ENCODING_B64  = 'b64'
+TILE_ENCODINGS     = (TILE_ENCODING_JSON, TILE_ENCODING_RLE, TILE_ENCODING_B64)
+
+# Encoded template grids, keyed by (id(grid), encoding). Filled lazily since
+# the templates live in layouts.py and we only want to encode each one once.
+# Template grids are cached for the life of the process, so ids are stable.
+_TEMPLATE_CACHE = {}
+
+
+def is_tile_grid(tiles) -> bool:
+    """True for a non-empty list of equal-length rows of ints in 0..255 (what the encoders take)."""
+    if not isinstance(tiles, (list, tuple)) or not tiles or not isinstance(tiles[0], (list, tuple)):
+        return False
+    width = len(tiles[0])
+    return all(
+        isinstance(row, (list, tuple)) and len(row) == width
+        and all(type(cell) is int and 0 <= cell <= 255 for cell in row)
+        for row in tiles
+    )
+
+
+def encode_tiles_rle(tiles) -> list:
+    """
+    Row-major run-length encoding as a flat [value, count, value, count, ...]
+    list. A bordered 32x32 room is ~20 runs instead of 1,024 ints.
+    """
+    data  = []
+    value = None
+    count = 0
+    for row in tiles:
+        for cell in row:
+            if cell == value:
+                count += 1
+            else:
+                if count:
+                    data.append(value)
+                    data.append(count)
+                value = cell
+                count = 1
+    if count:
+        data.append(value)
+        data.append(count)
+    return data
+
+
+def encode_tiles_b64(tiles) -> str:
+    """One byte per tile, row-major, base64 encoded."""
+    return base64.b64encode(bytes(cell for row in tiles for cell in row)).decode('ascii')
+
+
+_ENCODERS = {
+    TILE_ENCODING_RLE: encode_tiles_rle,
+    TILE_ENCODING_B64: encode_tiles_b64,
+}
+
+
+def encode_tiles(tiles, encoding: str, template_tiles=None) -> dict:
+    """
+    Wrap an encoded grid with enough shape info for the client to rebuild it.
+    If `tiles` is a shared template grid the encoded payload is cached and
+    reused.
+    """
+    height = len(tiles)
+    width  = len(tiles[0]) if height else 0
+
+    if template_tiles is not None and tiles is template_tiles:
+        key  = (id(template_tiles), encoding)
+        data = _TEMPLATE_CACHE.get(key)
+        if data is None:
+            data = _TEMPLATE_CACHE[key] = _ENCODERS[encoding](tiles)
+    else:
+        data = _ENCODERS[encoding](tiles)
+
+    return {
+        'encoding': encoding,
+        'width':    width,
+        'height':   height,
+        'data':     data,
+    }
+
+
+def decode_tiles(encoded: dict) -> list:
+    """Inverse of encode_tiles(); returns a nested list of ints."""
+    width    = encoded['width']
+    height   = encoded['height']
+    encoding = encoded['encoding']
+
+    if encoding == TILE_ENCODING_RLE:
+        data = encoded['data']
+        flat = []
+        for i in range(0, len(data), 2):
+            flat.extend([data[i]] * data[i + 1])
+    elif encoding == TILE_ENCODING_B64:
+        flat = list(base64.b64decode(encoded['data']))
+    else:
+        raise ValueError(f'Unknown tile encoding: {encoding}')
+
+    if len(flat) != width * height:
+        raise ValueError('Encoded tile data does not match width * height.')
+    return [flat[r * width:(r + 1) * width] for r in range(height)]
+
+
+def negotiate_tile_encoding(request):
+    """
+    Pick the tile encoding for a response. `?tiles=` wins over the Accept
+    header's `tiles=` parameter (e.g. `application/json; tiles=rle`).
+    Returns None for an unknown value given via the query param.
+    """
+    encoding = request.GET.get('tiles')
+    if encoding is not None:
+        return encoding if encoding in TILE_ENCODINGS else None
+
+    for media_range in request.META.get('HTTP_ACCEPT', '').split(','):
+        for param in media_range.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'tiles' and value in TILE_ENCODINGS:
+                return value
+    return TILE_ENCODING_JSON
@@ -3,8 +3,12 @@ from . import views
 
 urlpatterns = [
     path('generate/room/', views.GenerateRoomView.as_view(), name='generate_room'),
+    path('generate/rooms/',       views.GenerateRoomsView.as_view(), name='generate_rooms'),
+    path('generate/run/',         views.StartRunView.as_view(),      name='start_run'),
     path('generate/next-room/',   views.RunNextRoomView.as_view(),   name='next_room'),
     path('generate/kill-enemy/',  views.KillEnemyView.as_view(),     name='kill_enemy'),
+    path('generate/combat-events/', views.CombatEventsView.as_view(), name='combat_events'),
     path('generate/leave-room/',  views.LeaveRoomView.as_view(),     name='leave_room'),
     path('generate/enemy/',       views.GenerateEnemyView.as_view(), name='generate_enemy'),
+    path('leaderboard/',          views.LeaderboardView.as_view(),   name='leaderboard'),
 ]   
\ No newline at end of file
@@ -1,20 +1,43 @@
+import hashlib
 import random
-
+import secrets
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.http import HttpResponseNotModified
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
 
+from . import leaderboard, persistence
+from .layouts import LAYOUT_VARIANTS, cached_tiles, layout_template
+from .persistence import persistence_enabled
+from .renderers import FastJSONRenderer, JSONOnlyNegotiation
+from .room_pool import RoomPool
+from .run_store import get_run_store
+from .tile_encoding import TILE_ENCODING_JSON, TILE_ENCODINGS, encode_tiles, is_tile_grid, negotiate_tile_encoding
+from src.metrics import REGISTRY
+
 ROOMS_PER_DIFFICULTY = 3
+MAX_ROOM_SIZE        = 32
+MAX_PREFETCH_ROOMS   = 10
+MAX_COMBAT_EVENTS    = 256
+LEADERBOARD_DEFAULT  = 10
+LEADERBOARD_MAX      = 100
 
 
 def get_difficulty_level(rooms_cleared: int) -> int:
     return (rooms_cleared // ROOMS_PER_DIFFICULTY) + 1
 
 
-def get_difficulty_config(difficulty: int) -> dict:
+def _build_difficulty_config(difficulty: int) -> dict:
     d = difficulty
-    room_size       = min(8 + (d - 1) * 2, 32)
+    room_size       = min(8 + (d - 1) * 2, MAX_ROOM_SIZE)
     enemy_count_min = min(1 + ((d - 1) // 2), 8)
     enemy_count_max = min(enemy_count_min + 2, 12)
     enemy_level_min = max(1, d)
@@ -31,27 +54,46 @@ def get_difficulty_config(difficulty: int) -> dict:
     }
 
 
-def generate_room_layout(size: int) -> dict:
-    width = height = size
-    tiles = []
-    for row in range(height):
-        tile_row = []
-        for col in range(width):
-            is_border = (row == 0 or row == height - 1 or col == 0 or col == width - 1)
-            tile_row.append(1 if is_border else 0)
-        tiles.append(tile_row)
+# Past this difficulty every value except the enemy level range has hit its cap
+# (boss_chance is the last to saturate), so the table stops here.
+DIFFICULTY_TIER_CAP = 25
+
+DIFFICULTY_TIERS = tuple(
+    MappingProxyType(_build_difficulty_config(d))
+    for d in range(1, DIFFICULTY_TIER_CAP + 1)
+)
+
+
+def get_difficulty_config(difficulty: int) -> Mapping:
+    """
+    Read-only config for a difficulty level. Levels up to DIFFICULTY_TIER_CAP
+    come straight from the precomputed table; anything above is built on demand.
+    """
+    if 1 <= difficulty <= DIFFICULTY_TIER_CAP:
+        return DIFFICULTY_TIERS[difficulty - 1]
+    return MappingProxyType(_build_difficulty_config(difficulty))
+
 
-    spawn_point = {'x': 1, 'y': 1}
-    exit_south  = {'x': width // 2, 'y': height - 1}
-    exit_east   = {'x': width - 1,  'y': height // 2}
-    tiles[exit_south['y']][exit_south['x']] = 2
-    tiles[exit_east['y']][exit_east['x']]   = 2
+# Every size get_difficulty_config() can hand out: 8, 10, ... 32.
+ROOM_SIZES = tuple(range(8, MAX_ROOM_SIZE + 1, 2))
 
+def generate_room_layout(size: int, variant: int = None, rng=random) -> dict:
+    """
+    One of the size's LAYOUT_VARIANTS interiors (see layouts.py), picked with
+    `rng` unless `variant` is given. The tile grid and flow fields are
+    shared with the cached template; only the small top-level dict and point
+    dicts are fresh per call.
+    """
+    if variant is None:
+        variant = rng.randrange(LAYOUT_VARIANTS)
+    template = layout_template(size, variant)
     return {
-        'tiles':       tiles,
-        'spawn_point': spawn_point,
-        'exit_points': [exit_south, exit_east],
+        'tiles':       template['tiles'],
+        'spawn_point': dict(template['spawn_point']),
+        'exit_points': [dict(point) for point in template['exit_points']],
         'exits_open':  False,
+        'variant':     variant,
+        'flow_fields': template['flow_fields'],
     }
 
 
@@ -77,24 +119,41 @@ def get_enemy_type_pool(difficulty: int) -> list:
         return ENEMY_TYPE_POOLS['late']
 
 
-def generate_enemies_for_room(cfg: dict, room_number: int) -> list:
+ENEMY_SPEED_RANGE = (3, 10)
+
+
+def base_enemy_stats(level, difficulty) -> tuple:
+    """
+    Pre-multiplier (hp, attack, defense, coin_reward). Plain arithmetic so it
+    works on ints and on NumPy arrays (see batch_generation).
+    """
+    return (
+        30 + (level * 15) + (difficulty * 5),
+        5  + (level * 3)  + (difficulty * 2),
+        2  + (level * 2)  + difficulty,
+        (level * 10) + (difficulty * 5),
+    )
+
+
+def generate_enemies_for_room(cfg: Mapping, room_number: int, rng=random) -> list:
     d         = cfg['difficulty']
-    count     = random.randint(*cfg['enemy_count'])
+    count     = rng.randint(*cfg['enemy_count'])
     level_min = cfg['enemy_level'][0]
     level_max = cfg['enemy_level'][1]
     type_pool = get_enemy_type_pool(d)
 
     enemies = []
     for i in range(count):
-        level       = random.randint(level_min, level_max)
-        enemy_type  = random.choice(type_pool)
+        level       = rng.randint(level_min, level_max)
+        enemy_type  = rng.choice(type_pool)
         is_boss     = (enemy_type == 'boss')
         multipliers = ENEMY_TYPE_STATS[enemy_type]
 
-        base_hp  = int((30 + (level * 15) + (d * 5)) * multipliers['hp'])
-        base_atk = int((5  + (level * 3)  + (d * 2)) * multipliers['atk'])
-        base_def = int((2  + (level * 2)  + d)        * multipliers['def'])
-        coin_reward = int(((level * 10) + (d * 5)) * multipliers['coin'])
+        hp, atk, dfn, coin = base_enemy_stats(level, d)
+        base_hp     = int(hp   * multipliers['hp'])
+        base_atk    = int(atk  * multipliers['atk'])
+        base_def    = int(dfn  * multipliers['def'])
+        coin_reward = int(coin * multipliers['coin'])
 
         enemies.append({
             'id':          f'r{room_number}_e{i}',
@@ -106,27 +165,23 @@ def generate_enemies_for_room(cfg: dict, room_number: int) -> list:
             'max_health':  base_hp,
             'attack':      base_atk,
             'defense':     base_def,
-            'speed':       random.randint(3, 10),
+            'speed':       rng.randint(*ENEMY_SPEED_RANGE),
             'coin_reward': coin_reward,
         })
 
     return enemies
 
 
-def generate_room(rooms_cleared: int, room_type: str = None) -> dict:
-    difficulty = get_difficulty_level(rooms_cleared)
-    cfg        = get_difficulty_config(difficulty)
-
-    if not room_type:
-        if rooms_cleared == 0:
-            room_type = 'entrance'
-        elif random.random() < cfg['boss_chance']:
-            room_type = 'boss_room'
-        else:
-            room_type = random.choice(['corridor', 'chamber'])
+def pick_room_type(rooms_cleared: int, cfg: Mapping, rng=random) -> str:
+    if rooms_cleared == 0:
+        return 'entrance'
+    if rng.random() < cfg['boss_chance']:
+        return 'boss_room'
+    return rng.choice(['corridor', 'chamber'])
 
-    enemy_list = generate_enemies_for_room(cfg, rooms_cleared)
 
+def assemble_room(rooms_cleared: int, room_type: str, cfg: Mapping, enemy_list: list, rng=random) -> dict:
+    """The room around an already generated enemy list (promoting a boss for boss rooms)."""
     if room_type == 'boss_room' and not any(e['is_boss'] for e in enemy_list):
         multipliers                  = ENEMY_TYPE_STATS['boss']
         enemy_list[0]['type']        = 'boss'
@@ -137,17 +192,17 @@ def generate_room(rooms_cleared: int, room_type: str = None) -> dict:
         enemy_list[0]['defense']     = int(enemy_list[0]['defense'] * multipliers['def'])
         enemy_list[0]['coin_reward'] = int(enemy_list[0]['coin_reward'] * multipliers['coin'])
 
-    layout      = generate_room_layout(size=cfg['room_size'])
+    layout      = generate_room_layout(size=cfg['room_size'], rng=rng)
     total_coins = sum(e['coin_reward'] for e in enemy_list)
 
     return {
         'room_number':           rooms_cleared,
         'type':                  room_type,
-        'difficulty':            difficulty,
+        'difficulty':            cfg['difficulty'],
         'next_increase_in':      ROOMS_PER_DIFFICULTY - (rooms_cleared % ROOMS_PER_DIFFICULTY),
         'width':                 cfg['room_size'],
         'height':                cfg['room_size'],
-        'is_locked':             random.random() < cfg['locked_chance'] and rooms_cleared > 0,
+        'is_locked':             rng.random() < cfg['locked_chance'] and rooms_cleared > 0,
         'is_cleared':            False,
         'layout':                layout,
         'enemies':               enemy_list,
@@ -158,6 +213,124 @@ def generate_room(rooms_cleared: int, room_type: str = None) -> dict:
     }
 
 
+def generate_room(rooms_cleared: int, room_type: str = None, rng=random) -> dict:
+    """
+    A fresh room. Every random draw comes from `rng`: the shared module
+    generator by default, or a room_rng() to make the room reproducible.
+    For many rooms at once see batch_generation.generate_rooms().
+    """
+    cfg        = get_difficulty_config(get_difficulty_level(rooms_cleared))
+    room_type  = room_type or pick_room_type(rooms_cleared, cfg, rng)
+    enemy_list = generate_enemies_for_room(cfg, rooms_cleared, rng)
+    return assemble_room(rooms_cleared, room_type, cfg, enemy_list, rng)
+
+
+def _pool_rooms(wanted: list) -> list:
+    """
+    Rooms for ROOM_POOL: for each (difficulty, room_type, count) in `wanted`
+    a list of `count` rooms, generated at the tier's first non-entrance room
+    number. Big refills (startup, several tiers drained at once) go through
+    one NumPy batch.
+    """
+    numbers = [max(1, (d - 1) * ROOMS_PER_DIFFICULTY) for d, _, count in wanted for _ in range(count)]
+    types   = [room_type for _, room_type, count in wanted for _ in range(count)]
+    # Imported here: batch_generation imports this module, and NumPy isn't
+    # needed until the pool first refills
+    from .batch_generation import BATCH_MIN_ROOMS, generate_rooms
+    if len(numbers) >= BATCH_MIN_ROOMS:
+        rooms = generate_rooms(numbers, types)
+    else:
+        rooms = [generate_room(n, room_type) for n, room_type in zip(numbers, types)]
+
+    out, start = [], 0
+    for _, _, count in wanted:
+        out.append(rooms[start:start + count])
+        start += count
+    return out
+
+
+ROOM_POOL = RoomPool(_pool_rooms, max_difficulty=DIFFICULTY_TIER_CAP)
+REGISTRY.add_collector(ROOM_POOL.gauges)
+
+
+def take_room(rooms_cleared: int, room_type: str = None) -> dict:
+    """
+    Same as generate_room(), but served from ROOM_POOL when it has a room
+    for the tier: only the room number, enemy ids and lock (entrances never
+    are) depend on the exact position, and those are patched in.
+    """
+    if rooms_cleared == 0 and not room_type:
+        room_type = 'entrance'
+    room = ROOM_POOL.take(get_difficulty_level(rooms_cleared), room_type)
+    if room is None:
+        return generate_room(rooms_cleared, room_type)
+
+    room['room_number']      = rooms_cleared
+    room['next_increase_in'] = ROOMS_PER_DIFFICULTY - (rooms_cleared % ROOMS_PER_DIFFICULTY)
+    if rooms_cleared == 0:
+        room['is_locked'] = False
+    for i, enemy in enumerate(room['enemies']):
+        enemy['id'] = f'r{rooms_cleared}_e{i}'
+    return room
+
+
+# ── Seeded rooms ─────────────────────────────────────────────────────────
+# Bump whenever a change to generation makes a seed produce different rooms,
+# so seeded ETags stop matching what clients and caches hold.
+GENERATOR_VERSION    = 1
+MAX_SEED             = 2 ** 53 - 1   # exact as a JS number
+SEEDED_CACHE_CONTROL = 'public, max-age=86400'
+
+
+def new_seed() -> int:
+    return secrets.randbelow(MAX_SEED + 1)
+
+
+def room_rng(seed: int, room_number: int) -> random.Random:
+    """
+    A private PRNG for one room of a seed. String seeds are hashed with
+    SHA-512, so the same (seed, room_number) gives the same room in every
+    process.
+    """
+    return random.Random(f'{GENERATOR_VERSION}:{seed}:{room_number}')
+
+
+def seeded_room(seed: int, rooms_cleared: int, room_type: str = None) -> dict:
+    return generate_room(rooms_cleared, room_type, rng=room_rng(seed, rooms_cleared))
+
+
+def room_for(seed, rooms_cleared: int, room_type: str = None) -> dict:
+    """seeded_room() when there is a seed, else take_room()."""
+    if seed is None:
+        return take_room(rooms_cleared, room_type)
+    return seeded_room(seed, rooms_cleared, room_type)
+
+
+def seeded_etag(params, encoding, keys):
+    """
+    ETag for a GET whose rooms come from `seed` alone, else None. Derived
+    from the query, so a conditional request is answered without generating.
+    """
+    if params.get('seed') is None or params.get('run_id') is not None:
+        return None
+    query  = '&'.join(f'{key}={params.get(key)}' for key in ('seed',) + tuple(keys))
+    digest = hashlib.blake2b(f'{query}&tiles={encoding}'.encode(), digest_size=12).hexdigest()
+    return f'"{GENERATOR_VERSION}-{digest}"'
+
+
+def seeded_headers(response, etag):
+    """
+    Caching headers for a room GET (200 or 304). The tile encoding comes
+    from Accept, so caches must key on it as well as the URL; the ETag
+    already covers it.
+    """
+    patch_vary_headers(response, ('Accept',))
+    if etag is not None and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag']          = etag
+        response['Cache-Control'] = SEEDED_CACHE_CONTROL
+    return response
+
+
 def clear_room(room: dict) -> dict:
     cleared_layout = {**room.get('layout', {}), 'exits_open': True}
     return {
@@ -171,184 +344,703 @@ def clear_room(room: dict) -> dict:
     }
 
 
+def _pointer_token(key) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def room_patch(before: dict, after: dict, path: str = '') -> list:
+    """
+    RFC 6902 JSON Patch turning `before` into `after`. Nested dicts are
+    diffed key by key; lists and scalars are replaced whole. Values shared
+    by both (clear_room() keeps the layout's tiles) are skipped by identity,
+    so the tile grid is never compared or sent.
+    """
+    ops = []
+    for key, value in after.items():
+        pointer = f'{path}/{_pointer_token(key)}'
+        if key not in before:
+            ops.append({'op': 'add', 'path': pointer, 'value': value})
+            continue
+        old = before[key]
+        if old is value:
+            continue
+        if isinstance(old, dict) and isinstance(value, dict):
+            ops.extend(room_patch(old, value, pointer))
+        elif old != value:
+            ops.append({'op': 'replace', 'path': pointer, 'value': value})
+    ops.extend(
+        {'op': 'remove', 'path': f'{path}/{_pointer_token(key)}'}
+        for key in before if key not in after
+    )
+    return ops
+
+
+def encode_room_tiles(room: dict, encoding: str) -> dict:
+    """
+    Return `room` with `layout.tiles` swapped for a compact encoded form.
+    Rooms whose tiles are already encoded, missing or not a valid grid (a
+    client-posted room) pass through as-is.
+    """
+    if not room or encoding == TILE_ENCODING_JSON:
+        return room
+    layout = room.get('layout') or {}
+    tiles  = layout.get('tiles')
+    if not isinstance(tiles, (list, tuple)) or not tiles:
+        return room
+
+    template = cached_tiles(len(tiles), layout.get('variant'))
+    # Generated rooms share the template grid; anything else gets checked
+    if tiles is not template and not is_tile_grid(tiles):
+        return room
+    encoded  = encode_tiles(tiles, encoding, template_tiles=template)
+    return {**room, 'layout': {**layout, 'tiles': encoded}}
+
+
+def mark_enemies_dead(room: dict, enemy_ids) -> dict:
+    """
+    Copy of `room` with the given enemy ids flagged dead. Returns None if
+    `enemy_ids` isn't a list; a missing/empty list returns `room` unchanged.
+    """
+    if not enemy_ids:
+        return room
+    if not isinstance(enemy_ids, list):
+        return None
+
+    killed  = {str(enemy_id) for enemy_id in enemy_ids}
+    enemies = [
+        {**e, 'is_dead': True} if e['id'] in killed else e
+        for e in room.get('enemies', [])
+    ]
+    return {
+        **room,
+        'enemies':       enemies,
+        'enemies_alive': sum(1 for e in enemies if not e.get('is_dead', False)),
+    }
+
+
+def run_room(run: dict, killed=None) -> dict:
+    """
+    The run's current room with the kills reconciled from combat events
+    marked dead. `killed`, the client's own list, is only checked for shape:
+    a claim alone must not clear a room, since every room cleared adds to
+    the ranked score. `current_room` itself stays the room as served, so
+    delta patches diff against what the client was sent. None if `killed`
+    isn't a list.
+    """
+    if killed and not isinstance(killed, list):
+        return None
+    return mark_enemies_dead(run['current_room'], run.get('killed'))
+
+
+class Outcome(NamedTuple):
+    """
+    What a request flow decided: the response body and status, plus the DB
+    writes it implies. The flows below are shared by the DRF views and the
+    async views in async_views.py; each wrapper applies `effects` its own
+    way (sync ORM here, async ORM there), so a flow never touches the DB.
+
+    Effects are tuples: ('persist_rooms', run_id, rooms),
+    ('mark_room_cleared', run_id, room_number) and ('record_score', score).
+    """
+    payload: dict
+    status:  int
+    effects: tuple = ()
+
+
+def _error(message: str, code: int = status.HTTP_400_BAD_REQUEST) -> Outcome:
+    return Outcome({'error': message}, code)
+
+
+def _unknown_run():
+    return _error('Unknown or expired run_id.', status.HTTP_404_NOT_FOUND)
+
+
+def _bad_killed_list():
+    return _error('killed must be a list of enemy ids.')
+
+
+def _bad_tile_encoding():
+    return _error(f'tiles must be one of: {", ".join(TILE_ENCODINGS)}.')
+
+
+def _bad_rooms_cleared():
+    return _error('rooms_cleared must be a non-negative integer.')
+
+
+def _bad_seed():
+    return _error(f'seed must be an integer between 0 and {MAX_SEED}.')
+
+
+def _parse_seed(value):
+    """The request's seed, None when absent; ValueError if it isn't valid."""
+    if value is None:
+        return None
+    try:
+        seed = int(value)
+    except TypeError:
+        raise ValueError(value) from None
+    if isinstance(value, (bool, float)) or not 0 <= seed <= MAX_SEED:
+        raise ValueError(value)
+    return seed
+
+
+def _parse_rooms_cleared(value):
+    """Non-negative int from a query param, or None."""
+    try:
+        value = int(value)
+    except (ValueError, TypeError):
+        return None
+    return value if value >= 0 else None
+
+
+def apply_effects(outcome: Outcome, get_user=None) -> Outcome:
+    """
+    Run an outcome's DB writes synchronously (see Outcome). `get_user`
+    returns the user (or None) and is only called when a score is recorded.
+    """
+    for name, *args in outcome.effects:
+        if name == 'record_score':
+            # Scores are only kept for signed-in players
+            user = get_user() if get_user is not None else None
+            if user is not None and user.is_authenticated:
+                ranked = leaderboard.record_score(user, *args)
+                if ranked is not None:
+                    outcome.payload['rank'], outcome.payload['high_score'] = ranked
+        elif persistence_enabled():
+            getattr(persistence, name)(*args)
+    return outcome
+
+
 # =============================================================================
-#  VIEWS  (no-auth mode — profile DB calls removed until auth is wired up)
+#  REQUEST FLOWS  (shared by the DRF views below and async_views.py)
 # =============================================================================
 
-class GenerateRoomView(APIView):
-    permission_classes = [AllowAny]
+def generate_room_flow(params, encoding) -> Outcome:
+    if encoding is None:
+        return _bad_tile_encoding()
+
+    rooms_cleared = _parse_rooms_cleared(params.get('rooms_cleared', '0'))
+    if rooms_cleared is None:
+        return _bad_rooms_cleared()
+    try:
+        seed = _parse_seed(params.get('seed'))
+    except ValueError:
+        return _bad_seed()
+
+    room = room_for(seed, rooms_cleared=rooms_cleared, room_type=params.get('room_type', None))
+    return Outcome(encode_room_tiles(room, encoding), status.HTTP_200_OK)
+
+
+def generate_rooms_flow(params, encoding) -> Outcome:
+    if encoding is None:
+        return _bad_tile_encoding()
+
+    try:
+        start = int(params.get('from', '0'))
+        count = int(params.get('count', '1'))
+        if start < 0 or not 1 <= count <= MAX_PREFETCH_ROOMS:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error(
+            'from must be a non-negative integer and count '
+            f'an integer between 1 and {MAX_PREFETCH_ROOMS}.'
+        )
 
-    def get(self, request):
-        rooms_cleared = request.query_params.get('rooms_cleared', '0')
-        room_type     = request.query_params.get('room_type', None)
-
-        try:
-            rooms_cleared = int(rooms_cleared)
-            if rooms_cleared < 0:
-                raise ValueError
-        except ValueError:
-            return Response(
-                {'error': 'rooms_cleared must be a non-negative integer.'},
-                status=status.HTTP_400_BAD_REQUEST
+    try:
+        seed = _parse_seed(params.get('seed'))
+    except ValueError:
+        return _bad_seed()
+
+    run_id = params.get('run_id')
+    run    = None
+    if run_id is not None:
+        run_id = str(run_id)
+        run    = get_run_store().get(run_id)
+        if run is None:
+            return _unknown_run()
+        seed = run.get('seed')
+
+    rooms   = [room_for(seed, rooms_cleared=n) for n in range(start, start + count)]
+    effects = ()
+
+    # Remember prefetched rooms so next-room hands out the same ones
+    if run is not None:
+        upcoming = dict(run.get('upcoming') or {})
+        upcoming.update((str(room['room_number']), room) for room in rooms)
+        get_run_store().put(run_id, {**run, 'upcoming': upcoming})
+        effects = (('persist_rooms', run_id, rooms),)
+
+    rooms = [encode_room_tiles(room, encoding) for room in rooms]
+    return Outcome({'from': start, 'count': count, 'rooms': rooms}, status.HTTP_200_OK, effects)
+
+
+def kill_enemy_flow(data) -> Outcome:
+    enemy_id    = data.get('enemy_id')
+    coin_reward = data.get('coin_reward')
+
+    if enemy_id is None or coin_reward is None:
+        return _error('enemy_id and coin_reward are required.')
+
+    try:
+        coin_reward = int(coin_reward)
+        if coin_reward < 0:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error('coin_reward must be a non-negative integer.')
+
+    # No DB profile in no-auth mode — just echo back what was sent
+    return Outcome({
+        'enemy_id':     enemy_id,
+        'coins_earned': coin_reward,
+        'total_coins':  coin_reward,  # frontend keeps the running total
+    }, status.HTTP_200_OK)
+
+
+COMBAT_EVENT_TYPES = ('damage', 'kill')
+
+
+def _parse_combat_events(events):
+    """
+    [(type, enemy_id, amount), ...] from a combat-events body, or None if
+    any event is malformed. `t` (ms into the room) must never decrease.
+    """
+    if not isinstance(events, list) or not 1 <= len(events) <= MAX_COMBAT_EVENTS:
+        return None
+    parsed, last_t = [], 0
+    for event in events:
+        if not isinstance(event, dict):
+            return None
+        kind     = event.get('type')
+        enemy_id = event.get('enemy_id')
+        amount   = event.get('amount', 0)
+        t        = event.get('t', last_t)
+        if kind not in COMBAT_EVENT_TYPES or not isinstance(enemy_id, str):
+            return None
+        # type() rather than isinstance(): JSON true/false must not pass as numbers
+        if type(t) not in (int, float) or t < last_t:
+            return None
+        if kind == 'damage' and (type(amount) is not int or amount <= 0):
+            return None
+        parsed.append((kind, enemy_id, amount))
+        last_t = t
+    return parsed
+
+
+def combat_events_flow(data) -> Outcome:
+    run_id = data.get('run_id')
+    if run_id is None:
+        return _error('run_id is required.')
+    run = get_run_store().get(str(run_id))
+    if run is None:
+        return _unknown_run()
+
+    events = _parse_combat_events(data.get('events'))
+    if events is None:
+        return _error(
+            f'events must be a list of 1 to {MAX_COMBAT_EVENTS} objects with a type '
+            f'({", ".join(COMBAT_EVENT_TYPES)}), an enemy_id, a positive integer amount '
+            'for damage and a non-decreasing t.'
+        )
+
+    # One pass over the batch, checked against the room the server generated
+    room     = run_room(run)
+    enemies  = {e['id']: e for e in room.get('enemies', [])}
+    damage   = dict(run.get('damage') or {})
+    killed   = []
+    rejected = []
+    coins    = 0
+    for index, (kind, enemy_id, amount) in enumerate(events):
+        enemy = enemies.get(enemy_id)
+        if enemy is None:
+            reason = 'unknown enemy'
+        elif enemy.get('is_dead') or enemy_id in killed:
+            reason = 'enemy already dead'
+        elif kind == 'damage':
+            damage[enemy_id] = damage.get(enemy_id, 0) + amount
+            continue
+        elif damage.get(enemy_id, 0) < enemy['health']:
+            reason = 'not enough damage dealt'
+        else:
+            killed.append(enemy_id)
+            coins += enemy['coin_reward']   # the server's figure, not the client's
+            continue
+        rejected.append({'index': index, 'reason': reason})
+
+    room        = mark_enemies_dead(room, killed)
+    alive       = sum(1 for e in room.get('enemies', []) if not e.get('is_dead', False))
+    total_coins = run.get('coins', 0) + coins
+    get_run_store().put(str(run_id), {
+        **run, 'killed': [*run.get('killed', ()), *killed], 'damage': damage, 'coins': total_coins,
+    })
+
+    return Outcome({
+        'accepted':      len(events) - len(rejected),
+        'rejected':      rejected,
+        'coins_earned':  coins,
+        'total_coins':   total_coins,
+        'enemies_alive': alive,
+        'room_cleared':  alive == 0,
+    }, status.HTTP_200_OK)
+
+
+def start_run_flow(encoding, data=None) -> Outcome:
+    """Every run has a seed; passing one back in replays that run's rooms."""
+    if encoding is None:
+        return _bad_tile_encoding()
+    try:
+        seed = _parse_seed((data or {}).get('seed'))
+    except ValueError:
+        return _bad_seed()
+    if seed is None:
+        seed = new_seed()
+
+    room   = seeded_room(seed, rooms_cleared=0, room_type='entrance')
+    run_id = get_run_store().create({'seed': seed, 'rooms_cleared': 0, 'current_room': room, 'upcoming': {}})
+
+    return Outcome(
+        {'run_id': run_id, 'seed': seed, 'room': encode_room_tiles(room, encoding)},
+        status.HTTP_201_CREATED,
+        (('persist_rooms', run_id, [room]),),
+    )
+
+
+def next_room_flow(data, encoding) -> Outcome:
+    player_health     = data.get('player_health')
+    player_max_health = data.get('player_max_health', 100)
+    rooms_cleared     = data.get('rooms_cleared')
+    coins_earned      = data.get('coins_earned', 0)
+    current_room      = data.get('current_room', None)
+    room_type         = data.get('room_type', None)
+    run_id            = data.get('run_id', None)
+    include_rooms     = data.get('include_rooms', True)
+    delta             = data.get('delta', False)
+
+    if encoding is None:
+        return _bad_tile_encoding()
+
+    try:
+        seed = _parse_seed(data.get('seed'))
+    except ValueError:
+        return _bad_seed()
+
+    run = None
+    if run_id is not None:
+        run = get_run_store().get(str(run_id))
+        if run is None:
+            return _unknown_run()
+        current_room = run_room(run, data.get('killed'))
+        if current_room is None:
+            return _bad_killed_list()
+        rooms_cleared = run['rooms_cleared']
+        seed          = run.get('seed')
+        # Only coins reconciled from combat events count; the client's claim is ignored
+        coins_earned = run.get('coins', 0)
+    served_room = run['current_room'] if run is not None else current_room
+
+    if player_health is None or rooms_cleared is None:
+        return _error('player_health and rooms_cleared are required.')
+
+    try:
+        player_health     = int(player_health)
+        player_max_health = int(player_max_health)
+        rooms_cleared     = int(rooms_cleared)
+        coins_earned      = int(coins_earned)
+        if rooms_cleared < 0:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error('All numeric fields must be valid integers.')
+
+    new_rooms_cleared = rooms_cleared + 1
+
+    # ── PLAYER IS DEAD ────────────────────────────────────────────────
+    if player_health <= 0:
+        if run is not None:
+            get_run_store().delete(str(run_id))
+        difficulty_reached = get_difficulty_level(rooms_cleared)
+        score              = leaderboard.run_score(rooms_cleared, coins_earned)
+        # Only a run's own figures are ranked; without one the score is
+        # whatever the client claims, so it is reported but never recorded
+        effects = ()
+        if run is not None:
+            effects = (('record_score', score),)
+        return Outcome({
+            'game_over':          True,
+            'rooms_cleared':      rooms_cleared,
+            'difficulty_reached': difficulty_reached,
+            'total_coins':        coins_earned,
+            'score':              score,
+            'message': (
+                f'You died on difficulty {difficulty_reached} '
+                f'after clearing {rooms_cleared} rooms '
+                f'with {coins_earned} coins.'
+            ),
+        }, status.HTTP_200_OK, effects)
+
+    # ── PLAYER IS ALIVE ───────────────────────────────────────────────
+    # A run only moves on from a room the server has seen cleared
+    if run is not None:
+        alive = sum(1 for e in current_room.get('enemies', []) if not e.get('is_dead', False))
+        if alive:
+            return Outcome(
+                {'error': 'Cannot advance — enemies are still alive.', 'enemies_alive': alive},
+                status.HTTP_400_BAD_REQUEST,
             )
 
-        return Response(
-            generate_room(rooms_cleared=rooms_cleared, room_type=room_type),
-            status=status.HTTP_200_OK
+    cleared_room = clear_room(current_room) if current_room else None
+    difficulty   = get_difficulty_level(new_rooms_cleared)
+    effects      = ()
+
+    if run is not None:
+        upcoming  = dict(run.get('upcoming') or {})
+        next_room = upcoming.pop(str(new_rooms_cleared), None)
+        generated = next_room is None or room_type
+        if generated:
+            next_room = room_for(seed, rooms_cleared=new_rooms_cleared, room_type=room_type)
+        upcoming = {n: r for n, r in upcoming.items() if int(n) > new_rooms_cleared}
+        next_run = {
+            'seed':          seed,
+            'rooms_cleared': new_rooms_cleared,
+            'current_room':  next_room,
+            'upcoming':      upcoming,
+            'coins':         coins_earned,
+        }
+        get_run_store().put(str(run_id), next_run)
+        effects = (('mark_room_cleared', str(run_id), rooms_cleared),)
+        # Prefetched rooms were stored when they were generated
+        if generated:
+            effects += (('persist_rooms', str(run_id), [next_room]),)
+    else:
+        next_room = room_for(seed, rooms_cleared=new_rooms_cleared, room_type=room_type)
+
+    payload = {
+        'game_over':         False,
+        'rooms_cleared':     new_rooms_cleared,
+        'difficulty':        difficulty,
+        'next_increase_in':  ROOMS_PER_DIFFICULTY - (new_rooms_cleared % ROOMS_PER_DIFFICULTY),
+        'player_health':     player_health,
+        'player_max_health': player_max_health,
+        'total_coins':       coins_earned,
+        'cleared_room':      encode_room_tiles(cleared_room, encoding) if include_rooms else None,
+        'next_room':         encode_room_tiles(next_room, encoding) if include_rooms else None,
+    }
+    if delta and include_rooms:
+        # The client already has the room it just cleared; send the change only
+        del payload['cleared_room']
+        payload['cleared_room_patch'] = room_patch(served_room, cleared_room) if cleared_room else None
+    return Outcome(payload, status.HTTP_200_OK, effects)
+
+
+def leave_room_flow(data, encoding) -> Outcome:
+    room   = data.get('room')
+    run_id = data.get('run_id', None)
+    delta  = data.get('delta', False)
+
+    if encoding is None:
+        return _bad_tile_encoding()
+
+    run = None
+    if run_id is not None:
+        run = get_run_store().get(str(run_id))
+        if run is None:
+            return _unknown_run()
+        room = run_room(run, data.get('killed'))
+        if room is None:
+            return _bad_killed_list()
+
+    if not room or not isinstance(room, dict):
+        return _error('room must be a valid room object.')
+    served_room = run['current_room'] if run is not None else room
+
+    enemies     = room.get('enemies', [])
+    still_alive = [e for e in enemies if not e.get('is_dead', False)]
+
+    if still_alive:
+        return Outcome(
+            {
+                'error':         'Cannot leave — enemies are still alive.',
+                'enemies_alive': len(still_alive),
+            },
+            status.HTTP_400_BAD_REQUEST
         )
 
+    cleared = clear_room(room)
+    effects = ()
+    if run is not None:
+        # The client applies the patch, so the cleared room is what it now has
+        get_run_store().put(str(run_id), {**run, 'current_room': cleared, 'killed': []})
+        effects = (('mark_room_cleared', str(run_id), cleared['room_number']),)
+
+    if delta:
+        return Outcome({'cleared_room_patch': room_patch(served_room, cleared)}, status.HTTP_200_OK, effects)
+    return Outcome({'cleared_room': encode_room_tiles(cleared, encoding)}, status.HTTP_200_OK, effects)
+
+
+def generate_enemy_flow(params) -> Outcome:
+    rooms_cleared = _parse_rooms_cleared(params.get('rooms_cleared', '0'))
+    if rooms_cleared is None:
+        return _bad_rooms_cleared()
+
+    difficulty = get_difficulty_level(rooms_cleared)
+    cfg        = get_difficulty_config(difficulty)
+    enemies    = generate_enemies_for_room(cfg, room_number=rooms_cleared)
+    enemy      = random.choice(enemies) if enemies else {}
+
+    return Outcome({'difficulty': difficulty, 'enemy': enemy}, status.HTTP_200_OK)
+
+
+def leaderboard_flow(params, user=None) -> Outcome:
+    """Needs the leaderboard loaded (LEADERBOARD.ensure_loaded()) first."""
+    try:
+        limit = int(params.get('limit', LEADERBOARD_DEFAULT))
+        if limit < 1:
+            raise ValueError
+    except (ValueError, TypeError):
+        return _error('limit must be a positive integer.')
+
+    me = None
+    if user is not None and user.is_authenticated:
+        ranked = leaderboard.LEADERBOARD.rank(user.pk)
+        if ranked is not None:
+            me = {'rank': ranked[0], 'username': user.get_username(), 'score': ranked[1]}
+
+    return Outcome({
+        'top':     leaderboard.LEADERBOARD.top(min(limit, LEADERBOARD_MAX)),
+        'me':      me,
+        'players': len(leaderboard.LEADERBOARD),
+    }, status.HTTP_200_OK)
+
+
+def _respond(outcome: Outcome, request=None) -> Response:
+    # request.user runs JWT authentication, so only read it for a score
+    apply_effects(outcome, (lambda: request.user) if request is not None else None)
+    return Response(outcome.payload, status=outcome.status)
+
+
+# =============================================================================
+#  VIEWS  (no-auth mode — profile DB calls removed until auth is wired up)
+# =============================================================================
+
+class GenerateAPIView(APIView):
+    """
+    Base for game/generate/*: JSON only, so no content negotiation, and
+    served by LeanRouteMiddleware without the usual middleware stack.
+    """
+    permission_classes        = [AllowAny]
+    renderer_classes          = [FastJSONRenderer]
+    content_negotiation_class = JSONOnlyNegotiation
+
+    def perform_authentication(self, request):
+        # Lazy: the JWT is only decoded if the view reads request.user
+        pass
+
+
+def _respond_seeded(request, flow, etag_keys) -> HttpResponseBase:
+    """
+    GET of generated rooms. With a `seed` the response is a pure function
+    of the query: it gets an ETag and Cache-Control, and a request whose
+    If-None-Match carries that ETag is answered 304 without generating.
+    """
+    encoding = negotiate_tile_encoding(request)
+    etag     = seeded_etag(request.query_params, encoding, etag_keys)
+    if etag is not None and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return seeded_headers(HttpResponseNotModified(), etag)
+    return seeded_headers(_respond(flow(request.query_params, encoding), request), etag)
+
+
+class GenerateRoomView(GenerateAPIView):
+    """
+    GET /game/generate/room/?rooms_cleared=N
+    With `seed` the room is reproducible and served with an ETag.
+    """
+    def get(self, request):
+        return _respond_seeded(request, generate_room_flow, ('rooms_cleared', 'room_type'))
 
-class KillEnemyView(APIView):
+
+class GenerateRoomsView(GenerateAPIView):
+    """
+    GET /game/generate/rooms/?from=N&count=K
+    Generates rooms N .. N+K-1 in one response so the client can keep a
+    prefetch buffer instead of waiting on a round trip per transition.
+    With `run_id` the rooms are also kept on the run session (and come
+    from its seed); with just `seed` they are reproducible and get an ETag.
+    """
+    def get(self, request):
+        return _respond_seeded(request, generate_rooms_flow, ('from', 'count'))
+
+
+class KillEnemyView(GenerateAPIView):
     """
     POST /game/generate/kill-enemy/
     No-auth mode: coins are tracked on the frontend only.
     Returns the coin_reward echoed back so the frontend can reconcile.
     """
-    permission_classes = [AllowAny]
-
     def post(self, request):
-        enemy_id    = request.data.get('enemy_id')
-        coin_reward = request.data.get('coin_reward')
+        return _respond(kill_enemy_flow(request.data))
 
-        if enemy_id is None or coin_reward is None:
-            return Response(
-                {'error': 'enemy_id and coin_reward are required.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
-        try:
-            coin_reward = int(coin_reward)
-            if coin_reward < 0:
-                raise ValueError
-        except (ValueError, TypeError):
-            return Response(
-                {'error': 'coin_reward must be a non-negative integer.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+class CombatEventsView(GenerateAPIView):
+    """
+    POST /game/generate/combat-events/
+    A run's combat for the current room in one request: `events` is a list
+    of {type: damage|kill, enemy_id, amount (damage only), t (ms)}. Kills
+    pay the server's coin_reward once each, and only after enough damage;
+    the run's reconciled coin total is returned and used by next-room.
+    """
+    def post(self, request):
+        return _respond(combat_events_flow(request.data))
+
 
-        # No DB profile in no-auth mode — just echo back what was sent
-        return Response({
-            'enemy_id':     enemy_id,
-            'coins_earned': coin_reward,
-            'total_coins':  coin_reward,  # frontend keeps the running total
-        }, status=status.HTTP_200_OK)
+class StartRunView(GenerateAPIView):
+    """
+    POST /game/generate/run/
+    Opens a server-side run session and returns its id and seed with the
+    entrance room. Later next-room / leave-room calls can send just `run_id`
+    and the ids of enemies killed instead of the whole room. Posting an
+    earlier run's `seed` replays its rooms.
+    """
+    def post(self, request):
+        return _respond(start_run_flow(negotiate_tile_encoding(request), request.data), request)
 
 
-class RunNextRoomView(APIView):
+class RunNextRoomView(GenerateAPIView):
     """
     POST /game/generate/next-room/
     No-auth mode: state is not persisted to DB; room generation still works.
+    With `run_id` the current room and rooms_cleared come from the run
+    session, and the run only advances once combat-events has seen every
+    enemy in the room killed.
+    `include_rooms: false` skips sending cleared_room / next_room back;
+    `delta: true` sends `cleared_room_patch` (JSON Patch against the room as
+    served) in place of cleared_room.
     """
-    permission_classes = [AllowAny]
-
     def post(self, request):
-        player_health     = request.data.get('player_health')
-        player_max_health = request.data.get('player_max_health', 100)
-        rooms_cleared     = request.data.get('rooms_cleared')
-        coins_earned      = request.data.get('coins_earned', 0)
-        current_room      = request.data.get('current_room', None)
-        room_type         = request.data.get('room_type', None)
-
-        if player_health is None or rooms_cleared is None:
-            return Response(
-                {'error': 'player_health and rooms_cleared are required.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        try:
-            player_health     = int(player_health)
-            player_max_health = int(player_max_health)
-            rooms_cleared     = int(rooms_cleared)
-            coins_earned      = int(coins_earned)
-            if rooms_cleared < 0:
-                raise ValueError
-        except (ValueError, TypeError):
-            return Response(
-                {'error': 'All numeric fields must be valid integers.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return _respond(next_room_flow(request.data, negotiate_tile_encoding(request)), request)
 
-        new_rooms_cleared = rooms_cleared + 1
-
-        # ── PLAYER IS DEAD ────────────────────────────────────────────────
-        if player_health <= 0:
-            difficulty_reached = get_difficulty_level(rooms_cleared)
-            return Response({
-                'game_over':          True,
-                'rooms_cleared':      rooms_cleared,
-                'difficulty_reached': difficulty_reached,
-                'total_coins':        coins_earned,
-                'message': (
-                    f'You died on difficulty {difficulty_reached} '
-                    f'after clearing {rooms_cleared} rooms '
-                    f'with {coins_earned} coins.'
-                ),
-            }, status=status.HTTP_200_OK)
-
-        # ── PLAYER IS ALIVE ───────────────────────────────────────────────
-        cleared_room = clear_room(current_room) if current_room else None
-        next_room    = generate_room(rooms_cleared=new_rooms_cleared, room_type=room_type)
-        difficulty   = get_difficulty_level(new_rooms_cleared)
-
-        return Response({
-            'game_over':         False,
-            'rooms_cleared':     new_rooms_cleared,
-            'difficulty':        difficulty,
-            'next_increase_in':  ROOMS_PER_DIFFICULTY - (new_rooms_cleared % ROOMS_PER_DIFFICULTY),
-            'player_health':     player_health,
-            'player_max_health': player_max_health,
-            'total_coins':       coins_earned,
-            'cleared_room':      cleared_room,
-            'next_room':         next_room,
-        }, status=status.HTTP_200_OK)
-
-
-class LeaveRoomView(APIView):
-    permission_classes = [AllowAny]
 
+class LeaveRoomView(GenerateAPIView):
+    """
+    POST /game/generate/leave-room/
+    Takes either the full `room`, or `run_id`: the session's current room,
+    which can be left once combat-events has seen every enemy killed.
+    `delta: true` answers with `cleared_room_patch` instead of the room.
+    """
     def post(self, request):
-        room = request.data.get('room')
-
-        if not room or not isinstance(room, dict):
-            return Response(
-                {'error': 'room must be a valid room object.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return _respond(leave_room_flow(request.data, negotiate_tile_encoding(request)), request)
 
-        enemies     = room.get('enemies', [])
-        still_alive = [e for e in enemies if not e.get('is_dead', False)]
 
-        if still_alive:
-            return Response(
-                {
-                    'error':         'Cannot leave — enemies are still alive.',
-                    'enemies_alive': len(still_alive),
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        return Response({'cleared_room': clear_room(room)}, status=status.HTTP_200_OK)
+class GenerateEnemyView(GenerateAPIView):
+    def get(self, request):
+        return _respond(generate_enemy_flow(request.query_params))
 
 
-class GenerateEnemyView(APIView):
+class LeaderboardView(APIView):
+    """
+    GET /game/leaderboard/?limit=10
+    Top players by high score plus, for a signed-in player, their own rank.
+    Served from the in-memory index in game_logic.leaderboard.
+    """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        rooms_cleared = request.query_params.get('rooms_cleared', '0')
-
-        try:
-            rooms_cleared = int(rooms_cleared)
-            if rooms_cleared < 0:
-                raise ValueError
-        except ValueError:
-            return Response(
-                {'error': 'rooms_cleared must be a non-negative integer.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        difficulty = get_difficulty_level(rooms_cleared)
-        cfg        = get_difficulty_config(difficulty)
-        enemies    = generate_enemies_for_room(cfg, room_number=rooms_cleared)
-        enemy      = random.choice(enemies) if enemies else {}
-
-        return Response({'difficulty': difficulty, 'enemy': enemy}, status=status.HTTP_200_OK)
+        leaderboard.LEADERBOARD.ensure_loaded()
+        return _respond(leaderboard_flow(request.query_params, request.user))
@@ -0,0 +1,220 @@
+"""
+WebSocket game sessions, served by src/asgi.py at WS_PATH.
+
+One connection carries every game_logic operation. A run then costs one
+handshake instead of repeating headers, CORS and connection setup for each
+action. Frames are compact JSON arrays:
+
+    client → server   [id, op, payload]
+    server → client   [id, status, body]          reply to frame `id`
+                      [0, 'upcoming', body]        push
+
+`op` is a key of OPS or 'board'. Payloads and bodies are the HTTP views'
+request and response bodies, since both go through the request flows in
+views.py. Query params on the socket URL: `tiles` picks the session's tile
+encoding and `token` carries an access token, because browsers can't set
+headers on a WebSocket. After `run` the session remembers the run id, so
+later frames may leave it out.
+
+When a room is cleared (by `leave`, or by a `combat` batch that kills the
+last enemy) the server generates the next room into the run and pushes it
+as 'upcoming'. The following `next` is then answered from that room.
+
+Pushes go through GroupLayer, an in-memory channel layer with one group per
+run. That's enough for one worker process or local testing. Several workers
+would need a shared layer behind the same add / discard / send interface.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from . import leaderboard, views
+from .async_views import _aapply_effects, _auser_for_token
+from .renderers import FastJSONRenderer
+from .run_store import get_run_store
+from .tile_encoding import TILE_ENCODING_JSON, TILE_ENCODINGS
+
+logger = logging.getLogger(__name__)
+
+WS_PATH = '/game/ws/'
+PUSH_ID = 0
+
+# Application close codes (4000-4999); the first two close before accepting
+CLOSE_BAD_REQUEST  = 4400
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND    = 4404
+
+OPS = {
+    'room':   lambda session, payload: views.generate_room_flow(payload, session.encoding),
+    'rooms':  lambda session, payload: views.generate_rooms_flow(payload, session.encoding),
+    'run':    lambda session, payload: views.start_run_flow(session.encoding, payload),
+    'next':   lambda session, payload: views.next_room_flow(payload, session.encoding),
+    'kill':   lambda session, payload: views.kill_enemy_flow(payload),
+    'leave':  lambda session, payload: views.leave_room_flow(payload, session.encoding),
+    'enemy':  lambda session, payload: views.generate_enemy_flow(payload),
+    'combat': lambda session, payload: views.combat_events_flow(payload),
+}
+
+# Ops that act on a run; the session's run id is filled in when missing
+RUN_OPS = ('rooms', 'next', 'leave', 'combat')
+
+_RENDERER = FastJSONRenderer()
+_UNSET    = object()
+
+
+class GroupLayer:
+    """In-memory channel layer: named groups of per-connection queues."""
+
+    def __init__(self):
+        self._groups = {}
+
+    def add(self, group: str, queue: asyncio.Queue):
+        self._groups.setdefault(group, set()).add(queue)
+
+    def discard(self, group: str, queue: asyncio.Queue):
+        members = self._groups.get(group)
+        if members is not None:
+            members.discard(queue)
+            if not members:
+                del self._groups[group]
+
+    def send(self, group: str, message):
+        for queue in self._groups.get(group, ()):
+            queue.put_nowait(message)
+
+
+LAYER = GroupLayer()
+
+
+def _frame(message) -> dict:
+    return {'type': 'websocket.send', 'text': _RENDERER.render(message).decode()}
+
+
+class GameSession:
+    """State for one connection: encoding, user, current run and outbound queue."""
+
+    def __init__(self, scope, send):
+        params        = parse_qs(scope.get('query_string', b'').decode())
+        self.encoding = params.get('tiles', [TILE_ENCODING_JSON])[0]
+        self.token    = params.get('token', [None])[0]
+        self.run_id   = None
+        self.inbox    = asyncio.Queue()   # group pushes
+        self._send    = send
+        self._lock    = asyncio.Lock()    # replies and pushes come from two tasks
+        self._user    = _UNSET
+
+    async def auser(self):
+        if self._user is _UNSET:
+            self._user = await _auser_for_token(self.token) if self.token else None
+        return self._user
+
+    async def send(self, message):
+        async with self._lock:
+            await self._send(_frame(message))
+
+    async def pump(self):
+        """Forward group pushes to the socket until cancelled."""
+        while True:
+            await self.send(await self.inbox.get())
+
+    def join(self, run_id: str):
+        if run_id != self.run_id:
+            self.leave()
+            self.run_id = run_id
+            LAYER.add(run_id, self.inbox)
+
+    def leave(self):
+        if self.run_id is not None:
+            LAYER.discard(self.run_id, self.inbox)
+
+    async def handle(self, text):
+        try:
+            frame = json.loads(text)
+        except (ValueError, TypeError):
+            frame = None
+        # Echo a usable id even for a bad frame, so the client's request settles
+        frame_id = frame[0] if isinstance(frame, list) and frame else None
+        if type(frame_id) is not int or frame_id <= PUSH_ID:
+            frame_id = None
+        if frame_id is None or len(frame) != 3 or not isinstance(frame[1], str) or not isinstance(frame[2], dict):
+            await self.send([frame_id, 400, {'detail': 'Frames are [id, op, payload] with an id above 0.'}])
+            return
+        _, op, payload = frame
+
+        if op != 'board' and op not in OPS:
+            await self.send([frame_id, 400, {'detail': f'Unknown op {op!r}.'}])
+            return
+        if op in RUN_OPS and self.run_id is not None and 'run_id' not in payload:
+            payload = {**payload, 'run_id': self.run_id}
+        try:
+            outcome = await self.dispatch(op, payload)
+        except Exception:
+            # One bad request mustn't take the session down with it
+            logger.exception('WebSocket op %r failed', op)
+            await self.send([frame_id, 500, {'detail': 'Internal error.'}])
+            return
+
+        await self.send([frame_id, outcome.status, outcome.payload])
+        if outcome.status >= 300:
+            return
+
+        run_id = outcome.payload['run_id'] if op == 'run' else payload.get('run_id')
+        if run_id is not None:
+            self.join(str(run_id))
+        if op == 'leave' and run_id is not None or op == 'combat' and outcome.payload['room_cleared']:
+            await self.push_next_room(str(run_id))
+
+    async def dispatch(self, op: str, payload: dict) -> views.Outcome:
+        if op == 'board':
+            await leaderboard.aensure_loaded()
+            return views.leaderboard_flow(payload, await self.auser())
+        return await _aapply_effects(OPS[op](self, payload), self.auser)
+
+    async def push_next_room(self, run_id: str):
+        """Put the run's next room in `upcoming` (if it isn't already) and push it."""
+        run = get_run_store().get(run_id)
+        if run is None:
+            return
+        number = run['rooms_cleared'] + 1
+        room   = (run.get('upcoming') or {}).get(str(number))
+        if room is not None:
+            rooms = [views.encode_room_tiles(room, self.encoding)]
+        else:
+            params  = {'from': number, 'count': 1, 'run_id': run_id}
+            outcome = await _aapply_effects(views.generate_rooms_flow(params, self.encoding), self.auser)
+            rooms   = outcome.payload['rooms']
+        LAYER.send(run_id, [PUSH_ID, 'upcoming', {'from': number, 'count': 1, 'rooms': rooms}])
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI app for 'websocket' scopes; see src/asgi.py."""
+    await receive()   # websocket.connect
+    if scope['path'] != WS_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    session = GameSession(scope, send)
+    if session.encoding not in TILE_ENCODINGS:
+        await send({'type': 'websocket.close', 'code': CLOSE_BAD_REQUEST})
+        return
+    try:
+        await session.auser()
+    except (InvalidToken, TokenError):
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+    pump = asyncio.create_task(session.pump())
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] == 'websocket.receive':
+                await session.handle(event.get('text') or event.get('bytes'))
+    finally:
+        pump.cancel()
+        session.leave()
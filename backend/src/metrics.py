@@ -0,0 +1,210 @@
+"""
+Request and RPC instrumentation, exported at /metrics in Prometheus text
+format.
+
+Counters and histograms are sharded per thread: each thread only ever
+writes its own dicts, so recording takes no lock, and a scrape sums the
+shards. Gauges come from collector callbacks read at scrape time.
+MetricsMiddleware times every request and labels it with the resolved view
+name; DB queries are counted through a connection execute
+wrapper (count and time) into a per-request context variable, which follows the request
+into sync_to_async threads.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+# Seconds. Game views sit in the low milliseconds, payment views can take
+# seconds when they wait on the RPC node.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Registry:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets      = tuple(buckets)
+        self._meta        = {}   # name → (type, help)
+        self._local       = threading.local()
+        self._shards      = []
+        self._shards_lock = threading.Lock()   # only taken once per thread
+        self._collectors  = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def add_collector(self, collect):
+        """`collect()` yields (name, labels, value) at scrape time; for gauges."""
+        self._collectors.append(collect)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = ({}, {})   # counters, histograms
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, name: str, labels: tuple = (), value=1):
+        counters = self._shard()[0]
+        key      = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        histograms = self._shard()[1]
+        key        = (name, labels)
+        entry      = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def collect(self):
+        """Merged (counters, histograms) across all thread shards."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        counters, histograms = {}, {}
+        for shard_counters, shard_histograms in shards:
+            # dict() copies in one C call, so a writing thread can't resize it mid-copy
+            for key, value in dict(shard_counters).items():
+                counters[key] = counters.get(key, 0) + value
+            for key, (counts, total) in dict(shard_histograms).items():
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        return counters, histograms
+
+    def render(self) -> str:
+        counters, histograms = self.collect()
+        by_name = {}
+        for (name, labels), value in counters.items():
+            by_name.setdefault(name, []).append(f'{name}{_labels(labels)} {_number(value)}')
+        for (name, labels), (counts, total) in histograms.items():
+            lines, cumulative = by_name.setdefault(name, []), 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        for collect in self._collectors:
+            for name, labels, value in collect():
+                by_name.setdefault(name, []).append(f'{name}{_labels(labels)} {_number(value)}')
+
+        out = []
+        for name in sorted(by_name):
+            kind, help_text = self._meta.get(name, ('untyped', ''))
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            out.extend(sorted(by_name[name]))
+        return '\n'.join(out) + '\n'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+REGISTRY.describe('http_request_duration_seconds', 'histogram', 'Request latency by view and method.')
+REGISTRY.describe('http_responses_total', 'counter', 'Responses by view and status code.')
+REGISTRY.describe('http_request_db_queries_total', 'counter', 'Database queries issued while handling requests, by view.')
+REGISTRY.describe('http_request_db_seconds_total', 'counter', 'Time spent in database queries while handling requests, by view.')
+REGISTRY.describe('solana_rpc_request_duration_seconds', 'histogram', 'Solana RPC call latency by method.')
+REGISTRY.describe('solana_rpc_errors_total', 'counter', 'Failed Solana RPC calls (each retry counts), by method.')
+
+
+# ── DB query counting ────────────────────────────────────────────────────
+
+_QUERY_COUNT = ContextVar('metrics_query_count', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _QUERY_COUNT.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter[0] += 1
+        counter[1] += time.perf_counter() - start
+
+
+def _install_query_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+connection_created.connect(_install_query_counter)
+# Connections opened before this module was imported
+for _connection in connections.all(initialized_only=True):
+    _install_query_counter(_connection)
+
+
+# ── Middleware and endpoint ──────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """Outermost middleware: latency, status, query count and time per view."""
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _record(self, request, response, start, counter):
+        elapsed = time.perf_counter() - start
+        match   = getattr(request, 'resolver_match', None)
+        # Unmatched paths share one label so random URLs can't blow up cardinality
+        view    = match.view_name if match is not None else '<unmatched>'
+        REGISTRY.observe('http_request_duration_seconds', (('view', view), ('method', request.method)), elapsed)
+        REGISTRY.inc('http_responses_total', (('view', view), ('status', response.status_code)))
+        if counter[0]:
+            REGISTRY.inc('http_request_db_queries_total', (('view', view),), counter[0])
+            REGISTRY.inc('http_request_db_seconds_total', (('view', view),), counter[1])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter, start = [0, 0.0], time.perf_counter()
+        token = _QUERY_COUNT.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _QUERY_COUNT.reset(token)
+        self._record(request, response, start, counter)
+        return response
+
+    async def __acall__(self, request):
+        counter, start = [0, 0.0], time.perf_counter()
+        token = _QUERY_COUNT.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _QUERY_COUNT.reset(token)
+        self._record(request, response, start, counter)
+        return response
+
+
+def metrics_view(request):
+    """GET /metrics — everything in REGISTRY, Prometheus text format."""
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
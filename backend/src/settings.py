@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,6 +58,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed, falling back to stdlib json (game_logic.renderers)
+    'DEFAULT_RENDERER_CLASSES': (
+        'game_logic.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'game_logic.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 from datetime import timedelta
 
@@ -65,9 +76,63 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'AUTH_HEADER_TYPES':      ('Bearer',),
 }
+# Server-side run sessions (game_logic.run_store). Set SQLITE_PATH, e.g.
+# BASE_DIR / 'runs.sqlite3', to keep runs across worker restarts.
+GAME_RUN_STORE = {
+    'MAX_RUNS':    10_000,
+    'TTL_SECONDS': 60 * 60,
+    'SQLITE_PATH': None,
+}
+# Pre-generated rooms per (difficulty, room_type) (game_logic.room_pool)
+GAME_ROOM_POOL = {
+    'ENABLED':   True,
+    'AUTOSTART': True,
+    'SIZE':      8,
+    'LOW_WATER': 2,
+    'WARM':      3,
+}
+# Opt-in: store each run's rooms and enemies in the Room / Enemy tables
+GAME_PERSISTENCE = {
+    'ENABLED': False,
+}
+# Solana RPC layer (users.rpc.SolanaRpc). URL None → $SOLANA_RPC_URL or devnet.
+SOLANA_RPC = {
+    'URL':             None,
+    'TIMEOUT':         10,
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE':   10,
+    'RETRIES':         2,
+    'BACKOFF':         0.25,
+    'BLOCKHASH_TTL':   20,
+}
+
+# Background payment verification (users.views.recieve_payment)
+PAYMENT_VERIFICATION = {
+    'WORKERS':      4,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY':  2,   # seconds between get_transaction polls
+    # A PENDING verification untouched this long (seconds) lost its worker
+    # and is queued again when the signature is resubmitted
+    'STALE_AFTER':  120,
+    # In-memory replay filter size (signatures); see users.replay
+    'SEEN_CACHE_SIZE': 100_000,
+}
+# Batched refund payouts (users.payouts)
+PAYOUTS = {
+    'AUTOSTART':            True,
+    'MAX_TRANSFERS_PER_TX': 18,
+    'MAX_DELAY':            2.0,   # seconds a batch waits to fill
+    'CONFIRM_POLL':         2.0,
+    'CONFIRM_TIMEOUT':      120,
+    'SENDING_TIMEOUT':      60,    # a SENDING batch this old was abandoned by a crash
+}
 MIDDLEWARE = [
+    # Outermost, so it times the whole stack; served at /metrics
+    'src.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',   
     'django.middleware.security.SecurityMiddleware',
+    # Calls LEAN_ROUTE_PREFIXES views directly, skipping the middleware below
+    'game_logic.middleware.LeanRouteMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,7 +141,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'src.urls'
+# Cheap AllowAny game endpoints that need no sessions, CSRF or auth middleware
+LEAN_ROUTE_PREFIXES = ('/game/generate/',)
+
+# src/asgi.py switches to src.urls_async, which routes to the async views
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'src.urls')
 
 TEMPLATES = [
     {
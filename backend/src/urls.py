@@ -17,10 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from src.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('user/',  include('users.urls')),
     path('game/',  include('game_logic.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
   
 ]
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""
+URL configuration for the ASGI entry point (src/asgi.py).
+
+Same routes as src/urls.py, but the game and payment endpoints resolve to
+their async-native views. The admin stays synchronous.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+from src.metrics import metrics_view
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('user/',  include('users.async_urls')),
+    path('game/',  include('game_logic.async_urls')),
+    path('metrics', metrics_view, name='metrics'),
+]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaction
+from .models import PaymentVerification, Payout, Transaction
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -10,4 +10,17 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ('transaction_type', 'timestamp')
     
     #Search Bar
-    search_fields = ('user_address', 'signature')
\ No newline at end of file
+    search_fields = ('user_address', 'signature')
+
+@admin.register(PaymentVerification)
+class PaymentVerificationAdmin(admin.ModelAdmin):
+    list_display = ('status', 'signature', 'reference', 'created_at', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('signature', 'reference')
+
+
+@admin.register(Payout)
+class PayoutAdmin(admin.ModelAdmin):
+    list_display = ('status', 'user_address', 'amount_lamports', 'signature', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user_address', 'signature')
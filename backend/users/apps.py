@@ -1,6 +1,27 @@
+import logging
+
 from django.apps import AppConfig
+from django.core.signals import request_started
+
+logger = logging.getLogger(__name__)
+
+
+def _resume_payouts(**kwargs):
+    request_started.disconnect(dispatch_uid='users.resume_payouts')
+    from .views import PAYOUT_FLUSHER
+    try:
+        PAYOUT_FLUSHER.resume()
+    except Exception:
+        logger.exception('Could not resume pending payouts')
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Payouts queued or in flight before a restart are picked up on the
+        # process's first request instead of waiting for the next refund.
+        # Not from ready() itself: that also runs for migrate and the test
+        # runner, before the tables (or the test database) exist.
+        request_started.connect(_resume_payouts, dispatch_uid='users.resume_payouts')
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import async_views
+
+# Same routes as urls.py, served by the async views under ASGI
+urlpatterns = [
+    path('recieve_payment/', async_views.recieve_payment, name='recieve_payment'),
+    path('return_payment/', async_views.return_payment, name='return_payment'),
+    path('payout_status/<uuid:payout_id>/', async_views.payout_status, name='payout_status'),
+    path('payment_status/<uuid:verification_id>/', async_views.payment_status, name='payment_status'),
+    path('transactions/', async_views.transaction_history, name='transaction_history'),
+]
@@ -0,0 +1,167 @@
+"""
+Async-native payment endpoints, served by src/asgi.py (see src/urls_async.py).
+
+Same URLs and responses as views.py, sharing its parsing and response
+helpers. Database access uses the async ORM and Solana calls go through
+AsyncSolanaRpc. Payment verification runs as a task on the event loop,
+not on the verification thread pool, so a slow RPC node costs a suspended
+coroutine rather than a blocked thread.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import views
+from .models import PaymentVerification, Payout, Transaction
+from .payouts import aenqueue_payout
+
+logger = logging.getLogger(__name__)
+
+# Created on first use, inside the server's event loop. solana-py and
+# solders are imported lazily, as in views.py.
+ASYNC_CLIENT = None
+
+# Running verification tasks; the loop only keeps weak references
+VERIFY_TASKS = set()
+
+
+def get_async_client():
+    global ASYNC_CLIENT
+    if ASYNC_CLIENT is None:
+        from .rpc import AsyncSolanaRpc
+        views.load_env()
+        ASYNC_CLIENT = AsyncSolanaRpc.from_settings()
+    return ASYNC_CLIENT
+
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    VERIFY_TASKS.add(task)
+    task.add_done_callback(VERIFY_TASKS.discard)
+    return task
+
+
+async def _averify_transaction(sig):
+    """views._verify_transaction() on the async client."""
+    conf        = getattr(settings, 'PAYMENT_VERIFICATION', {})
+    max_retries = conf.get('MAX_ATTEMPTS', 5)
+    retry_delay = conf.get('RETRY_DELAY', 2)
+
+    for attempt in range(max_retries):
+        res = await get_async_client().get_transaction(
+            sig,
+            encoding="base64",
+            commitment="confirmed",
+            max_supported_transaction_version=0
+        )
+        if res.value is not None:
+            break
+        await asyncio.sleep(retry_delay)
+    else:
+        raise views.PaymentVerificationError("Transaction not found. It may still be propagating.")
+
+    return views._check_payment(res)
+
+
+async def arun_payment_verification(verification_id):
+    """Background task: verify one pending payment and record the outcome."""
+    from solders.signature import Signature
+
+    try:
+        verification = await PaymentVerification.objects.aget(verification_id=verification_id)
+        try:
+            # Cheap indexed check so replays of old signatures skip the RPC polling
+            if await Transaction.objects.filter(
+                signature=verification.signature, transaction_type='RECEIVED'
+            ).aexists():
+                raise IntegrityError
+            amount_received, payer = await _averify_transaction(Signature.from_string(verification.signature))
+
+            # Anti-replay: unique_received_signature rejects a second insert
+            await Transaction.objects.acreate(
+                signature=verification.signature,
+                user_address=verification.reference or payer,
+                amount_lamports=amount_received,
+                transaction_type='RECEIVED'
+            )
+        except Exception as e:
+            views._settle_verification(verification, e)
+        else:
+            views._settle_verification(verification)
+        await verification.asave(update_fields=['status', 'error', 'updated_at'])
+    except Exception:
+        logger.exception("Payment verification %s failed", verification_id)
+
+
+@csrf_exempt
+@require_POST
+async def recieve_payment(req):
+    """Async views.recieve_payment: 202 with a verification id, verified in a task."""
+    parsed = views._parse_payment_request(req)
+    if isinstance(parsed, JsonResponse):
+        return parsed
+    sig, reference = parsed
+
+    if not views.SEEN_SIGNATURES.warmed:
+        await sync_to_async(views.SEEN_SIGNATURES.ensure_warm)()
+
+    # Anti-replay, fast path: a known signature costs one set lookup
+    if str(sig) in views.SEEN_SIGNATURES:
+        return JsonResponse({"error": views.ALREADY_USED}, status=400)
+
+    # A single INSERT is atomic; the unique signature column makes it the claim
+    try:
+        verification = await PaymentVerification.objects.acreate(signature=str(sig), reference=reference)
+    except IntegrityError:
+        verification = await PaymentVerification.objects.aget(signature=str(sig))
+        early        = views._existing_verification_response(verification, reference)
+        if early is not None:
+            return early
+        await verification.asave(update_fields=['status', 'error', 'reference', 'updated_at'])
+
+    _spawn(arun_payment_verification(verification.verification_id))
+    return JsonResponse(views._verification_payload(verification), status=202)
+
+
+@require_GET
+async def payment_status(req, verification_id):
+    verification = await views._verification_lookup(verification_id).afirst()
+    return views._verification_status_response(verification)
+
+
+@csrf_exempt
+@require_POST
+async def return_payment(request):
+    parsed = views._parse_refund_request(request)
+    if isinstance(parsed, JsonResponse):
+        return parsed
+    user_address, lamports, refund_sol = parsed
+
+    try:
+        payout = await aenqueue_payout(user_address, lamports)
+        views.PAYOUT_FLUSHER.notify()
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+    return views._queued_response(payout, refund_sol)
+
+
+@require_GET
+async def payout_status(req, payout_id):
+    return views._payout_response(await Payout.objects.filter(payout_id=payout_id).afirst())
+
+
+@require_GET
+async def transaction_history(req):
+    query = views._history_query(req)
+    if isinstance(query, JsonResponse):
+        return query
+    wallet, rows, limit = query
+
+    return views._history_response(wallet, [row async for row in rows], limit)
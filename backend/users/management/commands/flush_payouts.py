@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users import views
+from users.payouts import check_confirmations, flush_payouts
+
+
+class Command(BaseCommand):
+    help = (
+        'Send all queued refunds in batched transactions and update confirmation status. '
+        'For deployments that run the flusher from cron instead of PAYOUTS["AUTOSTART"].'
+    )
+
+    def handle(self, *args, **options):
+        sent    = flush_payouts(views.get_client(), views.get_treasury_keypair())
+        settled = check_confirmations(views.get_client())
+        self.stdout.write(f'Sent {sent} payout(s); {settled} settled.')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:23
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_payment_verification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payout_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('user_address', models.CharField(max_length=100)),
+                ('amount_lamports', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('CONFIRMED', 'Confirmed'), ('FAILED', 'Failed')], db_index=True, default='QUEUED', max_length=10)),
+                ('batch_id', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('signature', models.CharField(blank=True, max_length=100, null=True)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='signature',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_type', 'RECEIVED')), fields=('signature',), name='unique_received_signature'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('signature', 'user_address'), name='unique_signature_per_address'),
+        ),
+    ]
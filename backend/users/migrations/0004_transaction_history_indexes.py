@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_payout_queue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user_address', '-timestamp', '-id'], name='tx_wallet_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user_address', 'transaction_type', '-timestamp', '-id'], name='tx_wallet_type_history_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 class Transaction(models.Model):
@@ -6,8 +8,9 @@ class Transaction(models.Model):
         ('RETURNED', 'Returned Payment'),
     ]
 
-    # Unique Solana transaction signature
-    signature = models.CharField(max_length=100, unique=True)
+    # Solana transaction signature. Unique for received payments; a batched
+    # payout shares one signature across several RETURNED rows (see Meta).
+    signature = models.CharField(max_length=100)
     
     # The wallet address of the user
     user_address = models.CharField(max_length=100)
@@ -21,6 +24,86 @@ class Transaction(models.Model):
     # Automatically saves the exact date and time the record was created
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['signature'],
+                condition=models.Q(transaction_type='RECEIVED'),
+                name='unique_received_signature',
+            ),
+            models.UniqueConstraint(
+                fields=['signature', 'user_address'],
+                name='unique_signature_per_address',
+            ),
+        ]
+        # Wallet history is read newest first with a (timestamp, id) cursor
+        indexes = [
+            models.Index(fields=['user_address', '-timestamp', '-id'], name='tx_wallet_history_idx'),
+            models.Index(
+                fields=['user_address', 'transaction_type', '-timestamp', '-id'], name='tx_wallet_type_history_idx'
+            ),
+        ]
+
     def __str__(self):
         # This makes the database rows readable in the admin dashboard
-        return f"{self.transaction_type} | {self.user_address[:6]}... | {self.signature[:8]}..."
\ No newline at end of file
+        return f"{self.transaction_type} | {self.user_address[:6]}... | {self.signature[:8]}..."
+
+
+class PaymentVerification(models.Model):
+    STATUSES = [
+        ('PENDING',  'Pending'),
+        ('VERIFIED', 'Verified'),
+        ('FAILED',   'Failed'),
+    ]
+
+    # Public id the client polls with
+    verification_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    # Signature being verified; one verification per signature
+    signature = models.CharField(max_length=100, unique=True)
+
+    # Client-supplied reference, stored as the user address once verified
+    reference = models.CharField(max_length=100, blank=True, null=True)
+
+    status = models.CharField(max_length=10, choices=STATUSES, default='PENDING')
+
+    # Reason shown to the client when status is FAILED
+    error = models.CharField(max_length=255, blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.status} | {self.signature[:8]}..."
+
+
+
+class Payout(models.Model):
+    STATUSES = [
+        ('QUEUED',    'Queued'),
+        ('SENDING',   'Sending'),
+        ('SENT',      'Sent'),
+        ('CONFIRMED', 'Confirmed'),
+        ('FAILED',    'Failed'),
+    ]
+
+    # Public id the client polls with
+    payout_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    user_address = models.CharField(max_length=100)
+    amount_lamports = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='QUEUED', db_index=True)
+
+    # Set when a flusher claims the payout; every payout in one transaction shares it
+    batch_id = models.UUIDField(blank=True, null=True, db_index=True)
+
+    # Signature of the batched transaction that carried this refund
+    signature = models.CharField(max_length=100, blank=True, null=True)
+
+    error = models.CharField(max_length=255, blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.status} | {self.user_address[:6]}... | {self.amount_lamports}"
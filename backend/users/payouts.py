@@ -0,0 +1,243 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection as db_connection, transaction as db_transaction
+from django.utils import timezone
+
+from .models import Payout, Transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'AUTOSTART':            True,  # start the flusher thread on first enqueue
+    'MAX_TRANSFERS_PER_TX': 18,    # keeps the transaction under the 1232-byte packet limit
+    'MAX_DELAY':            2.0,   # seconds to let a batch fill after a refund arrives
+    'CONFIRM_POLL':         2.0,   # seconds between confirmation checks
+    'CONFIRM_TIMEOUT':      120,   # seconds before an unconfirmed send is marked FAILED
+    'SENDING_TIMEOUT':      60,    # seconds before a SENDING batch counts as abandoned by a crash
+}
+
+# Payouts a restarted process still has work to do for
+UNSETTLED = ('QUEUED', 'SENDING', 'SENT')
+
+def _conf():
+    return {**DEFAULTS, **getattr(settings, 'PAYOUTS', {})}
+
+
+def enqueue_payout(user_address: str, lamports: int) -> Payout:
+    return Payout.objects.create(user_address=user_address, amount_lamports=lamports)
+
+
+async def aenqueue_payout(user_address: str, lamports: int) -> Payout:
+    return await Payout.objects.acreate(user_address=user_address, amount_lamports=lamports)
+
+
+def _claim_batch(limit: int):
+    """
+    Atomically move up to `limit` QUEUED payouts to SENDING under a fresh
+    batch id. The conditional UPDATE means two flushers (threads or worker
+    processes) can never claim the same payout.
+    """
+    ids = list(
+        Payout.objects.filter(status='QUEUED').order_by('id').values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return None, []
+
+    batch_id = uuid.uuid4()
+    Payout.objects.filter(id__in=ids, status='QUEUED').update(
+        status='SENDING', batch_id=batch_id, updated_at=timezone.now()
+    )
+    return batch_id, list(Payout.objects.filter(batch_id=batch_id).order_by('id'))
+
+
+def _totals(payouts) -> dict:
+    """{address: lamports}, merging repeat recipients."""
+    totals = {}
+    for address, lamports in payouts:
+        totals[address] = totals.get(address, 0) + lamports
+    return totals
+
+
+def sign_batch(rpc, keypair, payouts):
+    """
+    Build and sign one transaction with a transfer instruction per recipient
+    (repeat recipients are merged). Its signature is known from here on,
+    before anything is sent.
+    """
+    # solders is only needed once there is something to send; see views.py
+    from solders.message import MessageV0
+    from solders.pubkey import Pubkey
+    from solders.system_program import TransferParams, transfer
+    from solders.transaction import VersionedTransaction
+
+    totals       = _totals((payout.user_address, payout.amount_lamports) for payout in payouts)
+    instructions = [
+        transfer(TransferParams(
+            from_pubkey=keypair.pubkey(),
+            to_pubkey=Pubkey.from_string(address),
+            lamports=lamports
+        ))
+        for address, lamports in totals.items()
+    ]
+
+    message = MessageV0.try_compile(
+        payer=keypair.pubkey(),
+        instructions=instructions,
+        address_lookup_table_accounts=[],
+        recent_blockhash=rpc.get_latest_blockhash().value.blockhash
+    )
+    return VersionedTransaction(message, [keypair])
+
+
+def recover_stale_sending() -> int:
+    """
+    Settle batches a crashed flusher left in SENDING. One that never got as
+    far as signing was never sent and is queued again; one that did is
+    treated as SENT, so check_confirmations finds out whether it landed.
+    Returns how many payouts were recovered.
+    """
+    now   = timezone.now()
+    stale = Payout.objects.filter(
+        status='SENDING', updated_at__lt=now - timedelta(seconds=_conf()['SENDING_TIMEOUT'])
+    )
+    requeued = stale.filter(signature__isnull=True).update(status='QUEUED', batch_id=None, updated_at=now)
+    resumed  = stale.filter(signature__isnull=False).update(status='SENT', updated_at=now)
+    if requeued or resumed:
+        logger.warning('Recovered stale SENDING payouts: %d requeued, %d awaiting confirmation', requeued, resumed)
+    return requeued + resumed
+
+
+def flush_payouts(rpc, keypair) -> int:
+    """Send every QUEUED payout in batches. Returns the number of payouts sent."""
+    recover_stale_sending()
+    limit = _conf()['MAX_TRANSFERS_PER_TX']
+    sent  = 0
+
+    while True:
+        batch_id, payouts = _claim_batch(limit)
+        if not payouts:
+            return sent
+
+        try:
+            tx = sign_batch(rpc, keypair, payouts)
+        except Exception:
+            # Nothing was sent: back in the queue, retried on the next flush
+            logger.exception('Payout batch %s could not be signed; requeued', batch_id)
+            Payout.objects.filter(batch_id=batch_id).update(status='QUEUED', batch_id=None, updated_at=timezone.now())
+            return sent
+
+        # Recorded before sending, so a crash mid-send can still be confirmed
+        signature = str(tx.signatures[0])
+        Payout.objects.filter(batch_id=batch_id).update(signature=signature, updated_at=timezone.now())
+        try:
+            rpc.send_transaction(tx)
+        except Exception:
+            # The send may have landed even though we saw an error, so it
+            # isn't requeued; check_confirmations settles it either way
+            logger.exception('Payout batch %s failed to send; awaiting confirmation', batch_id)
+
+        Payout.objects.filter(batch_id=batch_id).update(status='SENT', updated_at=timezone.now())
+        sent += len(payouts)
+
+
+def _confirm(signature: str, now) -> int:
+    """
+    Mark a signature's SENT payouts CONFIRMED and write their RETURNED ledger
+    rows. Only now: a send that later fails never shows up in history.
+    """
+    with db_transaction.atomic():
+        payouts = list(
+            Payout.objects.filter(signature=signature, status='SENT').values_list('id', 'user_address', 'amount_lamports')
+        )
+        settled = Payout.objects.filter(id__in=[p[0] for p in payouts], status='SENT').update(
+            status='CONFIRMED', updated_at=now
+        )
+        # Another flusher may have confirmed the same signature; its rows win
+        Transaction.objects.bulk_create([
+            Transaction(
+                signature=signature,
+                user_address=address,
+                amount_lamports=lamports,
+                transaction_type='RETURNED'
+            )
+            for address, lamports in _totals(p[1:] for p in payouts).items()
+        ], ignore_conflicts=True)
+    return settled
+
+
+def check_confirmations(rpc) -> int:
+    """Mark SENT payouts CONFIRMED / FAILED from their signature status. Returns how many settled."""
+    signatures = list(
+        Payout.objects.filter(status='SENT').values_list('signature', flat=True).distinct()[:256]
+    )
+    if not signatures:
+        return 0
+
+    from solders.signature import Signature
+    from solders.transaction_status import TransactionConfirmationStatus
+
+    confirmed = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+    res       = rpc.get_signature_statuses([Signature.from_string(s) for s in signatures])
+    settled   = 0
+    now       = timezone.now()
+    for signature, st in zip(signatures, res.value):
+        pending = Payout.objects.filter(signature=signature, status='SENT')
+        if st is None:
+            stale = now - timedelta(seconds=_conf()['CONFIRM_TIMEOUT'])
+            settled += pending.filter(updated_at__lt=stale).update(
+                status='FAILED', error='Not confirmed before the blockhash expired.', updated_at=now
+            )
+        elif st.err is not None:
+            settled += pending.update(status='FAILED', error=f'Failed on-chain: {st.err}'[:255], updated_at=now)
+        elif st.confirmation_status in confirmed:
+            settled += _confirm(signature, now)
+    return settled
+
+
+class PayoutFlusher:
+    """
+    Background thread that batches queued refunds. A refund arriving wakes
+    it; it waits MAX_DELAY for more to join, sends everything queued, then
+    keeps polling confirmations every CONFIRM_POLL seconds.
+    """
+
+    def __init__(self, get_rpc, get_keypair):
+        self._get_rpc     = get_rpc
+        self._get_keypair = get_keypair
+        self._wake        = threading.Event()
+        self._lock        = threading.Lock()
+        self._thread      = None
+
+    def resume(self):
+        """Start the thread if payouts from before a restart are still unsettled."""
+        if _conf()['AUTOSTART'] and Payout.objects.filter(status__in=UNSETTLED).exists():
+            self.notify()
+
+    def notify(self):
+        if not _conf()['AUTOSTART']:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='payout-flusher', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            conf = _conf()
+            if self._wake.wait(timeout=conf['CONFIRM_POLL']):
+                time.sleep(conf['MAX_DELAY'])
+                self._wake.clear()
+            try:
+                flush_payouts(self._get_rpc(), self._get_keypair())
+                check_confirmations(self._get_rpc())
+            except Exception:
+                logger.exception('Payout flush failed')
+            finally:
+                # Not request-scoped, so nothing else closes this thread's connection
+                db_connection.close()
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+
+class SeenSignatures:
+    """
+    Bounded in-process LRU of payment signatures known to be used.
+
+    A hit means the signature is definitely spent, so a replay can be
+    rejected without touching the database or the RPC node. A miss proves
+    nothing (the entry may have been evicted, or recorded by another
+    process); the unique constraint on Transaction stays authoritative.
+
+    `warm` is called once, on first use, and should return recently used
+    signatures, newest first.
+    """
+
+    def __init__(self, max_size=100_000, warm=None):
+        self.max_size = max_size
+        self._warm    = warm
+        self._lock    = threading.Lock()
+        self._seen    = OrderedDict()
+
+    def ensure_warm(self):
+        """Run the warm-up if it hasn't been yet (sync ORM via `warm`)."""
+        if self._warm is None:
+            return
+        with self._lock:
+            if self._warm is None:
+                return
+            # Oldest first so the newest end up most recently used
+            for signature in reversed(list(self._warm(self.max_size))):
+                self._add(signature)
+            self._warm = None
+
+    def _add(self, signature):
+        self._seen[signature] = None
+        self._seen.move_to_end(signature)
+        if len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+
+    @property
+    def warmed(self) -> bool:
+        return self._warm is None
+
+    def __contains__(self, signature):
+        self.ensure_warm()
+        with self._lock:
+            if signature in self._seen:
+                self._seen.move_to_end(signature)
+                return True
+            return False
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, signature):
+        self.ensure_warm()
+        with self._lock:
+            self._add(signature)
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from solana.exceptions import SolanaRpcException
+from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
+
+from src.metrics import REGISTRY
+
+DEVNET_URL = "https://api.devnet.solana.com"
+
+DEFAULTS = {
+    'URL':             None,   # falls back to $SOLANA_RPC_URL, then devnet
+    'TIMEOUT':         10,     # seconds per HTTP request
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE':   10,
+    'RETRIES':         2,      # extra attempts after the first failure
+    'BACKOFF':         0.25,   # seconds, doubled each retry
+    'BLOCKHASH_TTL':   20,     # seconds; a blockhash stays valid for ~60s
+}
+
+
+def _settings_args():
+    """Constructor arguments from settings.SOLANA_RPC, in positional order."""
+    conf = {**DEFAULTS, **getattr(settings, 'SOLANA_RPC', {})}
+    return (
+        conf['URL'] or os.getenv("SOLANA_RPC_URL") or DEVNET_URL,
+        conf['TIMEOUT'],
+        conf['MAX_CONNECTIONS'],
+        conf['MAX_KEEPALIVE'],
+        conf['RETRIES'],
+        conf['BACKOFF'],
+        conf['BLOCKHASH_TTL'],
+    )
+
+
+class RpcMetrics:
+    """
+    Per-method call counts, error counts and latency totals. Every call is
+    also fed to the process-wide latency histogram served at /metrics.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._methods = {}
+
+    def record(self, method: str, seconds: float, error: bool = False):
+        REGISTRY.observe('solana_rpc_request_duration_seconds', (('method', method),), seconds)
+        if error:
+            REGISTRY.inc('solana_rpc_errors_total', (('method', method),))
+        with self._lock:
+            m = self._methods.get(method)
+            if m is None:
+                m = self._methods[method] = {'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+            m['calls']         += 1
+            m['errors']        += error
+            m['total_seconds'] += seconds
+            m['max_seconds']    = max(m['max_seconds'], seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                method: {**m, 'avg_seconds': m['total_seconds'] / m['calls']}
+                for method, m in self._methods.items()
+            }
+
+
+class SolanaRpc:
+    """
+    Managed RPC layer over solana-py's Client: one pooled keep-alive HTTP
+    session shared by all threads, retries with exponential backoff,
+    per-method latency/error metrics and a short-TTL blockhash cache.
+
+    Exposes the subset of Client methods the views use, with the same
+    signatures and return values, so it can stand in for a bare Client.
+    """
+
+    def __init__(self, endpoint: str, timeout=10, max_connections=20, max_keepalive=10,
+                 retries=2, backoff=0.25, blockhash_ttl=20, clock=time.monotonic):
+        self.endpoint      = endpoint
+        self.retries       = retries
+        self.backoff       = backoff
+        self.blockhash_ttl = blockhash_ttl
+        self.metrics       = RpcMetrics()
+        self._clock        = clock
+
+        self.client = Client(endpoint, timeout=timeout)
+        # Replace the provider's default session with one that has explicit pool limits
+        self.client._provider.session.close()
+        self.client._provider.session = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+        )
+
+        self._blockhash_lock    = threading.Lock()
+        self._blockhash_resp    = None
+        self._blockhash_expires = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(*_settings_args())
+
+    def _call(self, method: str, *args, **kwargs):
+        fn = getattr(self.client, method)
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                res = fn(*args, **kwargs)
+            except (SolanaRpcException, httpx.HTTPError):
+                self.metrics.record(method, time.perf_counter() - start, error=True)
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+            else:
+                self.metrics.record(method, time.perf_counter() - start)
+                return res
+
+    def get_transaction(self, *args, **kwargs):
+        return self._call('get_transaction', *args, **kwargs)
+
+    def send_transaction(self, *args, **kwargs):
+        # Resending the same signed transaction is deduplicated by signature
+        return self._call('send_transaction', *args, **kwargs)
+
+    def get_signature_statuses(self, *args, **kwargs):
+        return self._call('get_signature_statuses', *args, **kwargs)
+
+    def get_latest_blockhash(self):
+        """Cached for `blockhash_ttl` seconds; concurrent misses share one fetch."""
+        with self._blockhash_lock:
+            if self._blockhash_resp is None or self._clock() >= self._blockhash_expires:
+                self._blockhash_resp    = self._call('get_latest_blockhash')
+                self._blockhash_expires = self._clock() + self.blockhash_ttl
+            return self._blockhash_resp
+
+    def invalidate_blockhash(self):
+        with self._blockhash_lock:
+            self._blockhash_resp = None
+
+
+class AsyncSolanaRpc:
+    """
+    SolanaRpc for async code: solana-py's AsyncClient on a pooled
+    httpx.AsyncClient, with the same retries, metrics and blockhash cache.
+    Methods are coroutines. Bound to the event loop it is first used on,
+    so create one per loop (the ASGI server runs a single loop).
+    """
+
+    def __init__(self, endpoint: str, timeout=10, max_connections=20, max_keepalive=10,
+                 retries=2, backoff=0.25, blockhash_ttl=20, clock=time.monotonic):
+        self.endpoint      = endpoint
+        self.retries       = retries
+        self.backoff       = backoff
+        self.blockhash_ttl = blockhash_ttl
+        self.metrics       = RpcMetrics()
+        self._clock        = clock
+
+        self.client = AsyncClient(endpoint, timeout=timeout)
+        # Nothing has used the default session yet, so it can just be swapped
+        self.client._provider.session = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+        )
+
+        self._blockhash_lock    = asyncio.Lock()
+        self._blockhash_resp    = None
+        self._blockhash_expires = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(*_settings_args())
+
+    async def _call(self, method: str, *args, **kwargs):
+        fn = getattr(self.client, method)
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                res = await fn(*args, **kwargs)
+            except (SolanaRpcException, httpx.HTTPError):
+                self.metrics.record(method, time.perf_counter() - start, error=True)
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+            else:
+                self.metrics.record(method, time.perf_counter() - start)
+                return res
+
+    async def get_transaction(self, *args, **kwargs):
+        return await self._call('get_transaction', *args, **kwargs)
+
+    async def send_transaction(self, *args, **kwargs):
+        return await self._call('send_transaction', *args, **kwargs)
+
+    async def get_signature_statuses(self, *args, **kwargs):
+        return await self._call('get_signature_statuses', *args, **kwargs)
+
+    async def get_latest_blockhash(self):
+        """Cached for `blockhash_ttl` seconds; concurrent misses share one fetch."""
+        async with self._blockhash_lock:
+            if self._blockhash_resp is None or self._clock() >= self._blockhash_expires:
+                self._blockhash_resp    = await self._call('get_latest_blockhash')
+                self._blockhash_expires = self._clock() + self.blockhash_ttl
+            return self._blockhash_resp
+
+    def invalidate_blockhash(self):
+        self._blockhash_resp = None
+
+    async def close(self):
+        await self.client.close()
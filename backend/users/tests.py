@@ -1,3 +1,564 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.system_program import TransferParams, transfer
+from solders.transaction import VersionedTransaction
+
+from . import async_views, views
+from .models import PaymentVerification, Payout, Transaction
+from .payouts import PayoutFlusher, check_confirmations, flush_payouts
+from .replay import SeenSignatures
+from .rpc import AsyncSolanaRpc, SolanaRpc
+from src.metrics import REGISTRY
+
+
+class StubRpcServer:
+    """
+    Minimal local stand-in for a Solana JSON-RPC node. Transactions added
+    with add_payment() are returned by getTransaction; getLatestBlockhash
+    and sendTransaction succeed (sent transactions are kept in `sent`);
+    getSignatureStatuses reports everything confirmed unless `statuses` maps
+    the signature to something else; `fail_next` answers that many requests
+    with HTTP 503.
+    """
+
+    def __init__(self):
+        self.transactions = {}
+        self.calls        = []
+        self.fail_next    = 0
+        self.sent         = []
+        self.statuses     = {}
+        stub              = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.calls.append(body['method'])
+                if stub.fail_next:
+                    stub.fail_next -= 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                result = None
+                if body['method'] == 'getTransaction':
+                    result = stub.transactions.get(body['params'][0])
+                elif body['method'] == 'getLatestBlockhash':
+                    result = {
+                        'context': {'slot': 1},
+                        'value':   {'blockhash': str(Hash.new_unique()), 'lastValidBlockHeight': 100},
+                    }
+                elif body['method'] == 'sendTransaction':
+                    tx     = VersionedTransaction.from_bytes(base64.b64decode(body['params'][0]))
+                    result = str(tx.signatures[0])
+                    stub.sent.append(tx)
+                elif body['method'] == 'getSignatureStatuses':
+                    result = {
+                        'context': {'slot': 1},
+                        'value':   [
+                            stub.statuses.get(signature, {
+                                'slot': 1, 'confirmations': None, 'err': None,
+                                'status': {'Ok': None}, 'confirmationStatus': 'confirmed',
+                            })
+                            for signature in body['params'][0]
+                        ],
+                    }
+                payload = json.dumps({'jsonrpc': '2.0', 'id': body['id'], 'result': result}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url    = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_payment(self, treasury, lamports):
+        """Register a confirmed payer → treasury transfer; returns its signature."""
+        payer   = Keypair()
+        message = MessageV0.try_compile(
+            payer=payer.pubkey(),
+            instructions=[transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=treasury, lamports=lamports))],
+            address_lookup_table_accounts=[],
+            recent_blockhash=Hash.default(),
+        )
+        tx        = VersionedTransaction(message, [payer])
+        signature = str(tx.signatures[0])
+        self.transactions[signature] = {
+            'slot':        1,
+            'blockTime':   None,
+            'version':     0,
+            'transaction': [base64.b64encode(bytes(tx)).decode(), 'base64'],
+            'meta': {
+                'err':               None,
+                'status':            {'Ok': None},
+                'fee':               5000,
+                'preBalances':       [10 * lamports, 0, 1],
+                'postBalances':      [9 * lamports - 5000, lamports, 1],
+                'innerInstructions': [],
+                'logMessages':       [],
+                'preTokenBalances':  [],
+                'postTokenBalances': [],
+                'rewards':           [],
+                'loadedAddresses':   {'writable': [], 'readonly': []},
+            },
+        }
+        return signature
+
+
+@override_settings(PAYMENT_VERIFICATION={'WORKERS': 2, 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 0})
+class PaymentVerificationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.treasury = Keypair().pubkey()
+        self.rpc      = StubRpcServer().__enter__()
+        patches = [
+            mock.patch.object(views, 'CLIENT', SolanaRpc(self.rpc.url, retries=0)),
+            mock.patch.object(views, 'TREASURY_ADDRESS', str(self.treasury)),
+            mock.patch.object(views, 'SEEN_SIGNATURES', SeenSignatures(100, warm=views._recent_received_signatures)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.rpc.__exit__)
+
+    def _submit(self, signature):
+        return self.client.post(
+            '/user/recieve_payment/',
+            {'signature': signature, 'reference': 'player-1'},
+            content_type='application/json',
+        )
+
+    def _wait_for(self, verification_id, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            data = self.client.get(f'/user/payment_status/{verification_id}/').json()
+            if not data['pending']:
+                return data
+            time.sleep(0.02)
+        self.fail('verification did not finish')
+
+    def test_returns_pending_then_verifies(self):
+        signature = self.rpc.add_payment(self.treasury, views.LAMPORTS)
+        res       = self._submit(signature)
+        self.assertEqual(res.status_code, 202)
+        self.assertTrue(res.json()['pending'])
+
+        data = self._wait_for(res.json()['verification_id'])
+        self.assertTrue(data['success'])
+        self.assertTrue(Transaction.objects.filter(signature=signature, user_address='player-1').exists())
+
+        # The replay is rejected from memory: no queries, no RPC
+        calls = len(self.rpc.calls)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._submit(signature).status_code, 400)
+        self.assertEqual(len(self.rpc.calls), calls)
+
+    def test_seen_signatures_warmed_from_transactions(self):
+        signature = self.rpc.add_payment(self.treasury, views.LAMPORTS)
+        Transaction.objects.create(
+            signature=signature, user_address='player-1', amount_lamports=views.LAMPORTS, transaction_type='RECEIVED'
+        )
+        self.assertEqual(self._submit(signature).status_code, 400)
+        self.assertFalse(PaymentVerification.objects.exists())
+        self.assertEqual(self.rpc.calls, [])
+
+    def test_replay_missed_by_filter_skips_rpc(self):
+        signature = self.rpc.add_payment(self.treasury, views.LAMPORTS)
+        Transaction.objects.create(
+            signature=signature, user_address='player-1', amount_lamports=views.LAMPORTS, transaction_type='RECEIVED'
+        )
+        with mock.patch.object(views, 'SEEN_SIGNATURES', SeenSignatures(100)):
+            data = self._wait_for(self._submit(signature).json()['verification_id'])
+            self.assertEqual(data['error'], views.ALREADY_USED)
+            self.assertEqual(self.rpc.calls, [])
+            self.assertIn(signature, views.SEEN_SIGNATURES)
+            self.assertEqual(self._submit(signature).status_code, 400)
+
+    def test_seen_signatures_evicts_least_recent(self):
+        seen = SeenSignatures(2, warm=lambda limit: ['c', 'b', 'a'][:limit])
+        self.assertIn('b', seen)
+        seen.add('d')
+        self.assertNotIn('c', seen)
+        self.assertEqual(len(seen), 2)
+
+    def test_missing_transaction_fails(self):
+        signature = self.rpc.add_payment(self.treasury, views.LAMPORTS)
+        del self.rpc.transactions[signature]
+
+        data = self._wait_for(self._submit(signature).json()['verification_id'])
+        self.assertEqual(data['status'], 'FAILED')
+        self.assertIn('not found', data['error'])
+        self.assertEqual(self.rpc.calls.count('getTransaction'), 2)
+
+    def test_underpayment_fails(self):
+        signature = self.rpc.add_payment(self.treasury, views.LAMPORTS // 2)
+        data      = self._wait_for(self._submit(signature).json()['verification_id'])
+        self.assertIn('Insufficient payment', data['error'])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_stale_pending_is_requeued(self):
+        signature    = self.rpc.add_payment(self.treasury, views.LAMPORTS)
+        verification = PaymentVerification.objects.create(signature=signature, reference='player-1')
+
+        # Fresh: the worker is presumably still on it
+        self.assertEqual(self._submit(signature).status_code, 202)
+        self.assertEqual(self.rpc.calls, [])
+
+        # Past STALE_AFTER: its worker is gone, so the resubmit queues it again
+        PaymentVerification.objects.filter(pk=verification.pk).update(
+            updated_at=verification.updated_at - timedelta(seconds=121)
+        )
+        res = self._submit(signature)
+        self.assertEqual(res.json()['verification_id'], str(verification.verification_id))
+        self.assertTrue(self._wait_for(verification.verification_id)['success'])
+
+    def test_crashed_verification_is_logged(self):
+        executor = ThreadPoolExecutor(1)   # one worker: the no-op below runs after the crash is logged
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(views, 'VERIFY_EXECUTOR', executor), \
+                mock.patch.object(views, 'run_payment_verification', side_effect=RuntimeError('boom')), \
+                self.assertLogs('users.views', 'ERROR') as logs:
+            self._submit(self.rpc.add_payment(self.treasury, views.LAMPORTS))
+            executor.submit(lambda: None).result()
+        self.assertIn('boom', logs.output[0])
+
+    def test_unknown_verification_id(self):
+        res = self.client.get('/user/payment_status/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(PaymentVerification.objects.exists())
+
+
+class SolanaRpcTests(TransactionTestCase):
+
+    def setUp(self):
+        self.rpc = StubRpcServer().__enter__()
+        self.addCleanup(self.rpc.__exit__)
+        self.client_rpc = SolanaRpc(self.rpc.url, retries=2, backoff=0)
+        patcher = mock.patch.object(views, 'CLIENT', self.client_rpc)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_blockhash_is_cached(self):
+        first = self.client_rpc.get_latest_blockhash()
+        self.assertIs(self.client_rpc.get_latest_blockhash(), first)
+        self.assertEqual(self.rpc.calls.count('getLatestBlockhash'), 1)
+
+    def test_blockhash_refetched_after_ttl(self):
+        now = [0.0]
+        rpc = SolanaRpc(self.rpc.url, blockhash_ttl=20, clock=lambda: now[0])
+        first = rpc.get_latest_blockhash()
+        self.assertIs(rpc.get_latest_blockhash(), first)
+        now[0] = 21
+        self.assertIsNot(rpc.get_latest_blockhash(), first)
+
+    def test_retries_with_metrics(self):
+        self.rpc.fail_next = 2
+        self.client_rpc.get_latest_blockhash()
+        stats = self.client_rpc.metrics.snapshot()['get_latest_blockhash']
+        self.assertEqual(stats['calls'], 3)
+        self.assertEqual(stats['errors'], 2)
+
+    def test_rpc_latency_is_exported(self):
+        self.rpc.fail_next = 1
+        self.client_rpc.get_latest_blockhash()
+        text = REGISTRY.render()
+        self.assertIn('solana_rpc_request_duration_seconds_count{method="get_latest_blockhash"}', text)
+        self.assertIn('solana_rpc_errors_total{method="get_latest_blockhash"}', text)
+
+    def test_gives_up_after_retries(self):
+        self.rpc.fail_next = 3
+        with self.assertRaises(Exception):
+            self.client_rpc.get_transaction(Keypair().sign_message(b'x'))
+
+
+@override_settings(PAYOUTS={'AUTOSTART': False, 'MAX_TRANSFERS_PER_TX': 3})
+class PayoutQueueTests(TransactionTestCase):
+
+    def setUp(self):
+        self.rpc = StubRpcServer().__enter__()
+        self.addCleanup(self.rpc.__exit__)
+        self.client_rpc = SolanaRpc(self.rpc.url, retries=0)
+        # A throwaway treasury, so the suite needs no SOLANA_PRIVATE_KEY
+        self.keypair = Keypair()
+        patches = [
+            mock.patch.object(views, 'CLIENT', self.client_rpc),
+            mock.patch.object(views, 'TREASURY_KEYPAIR', self.keypair),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _refund(self, address, amount=10):
+        return self.client.post(
+            '/user/return_payment/', {'user_address': address, 'amount': amount}, content_type='application/json'
+        )
+
+    def test_refunds_are_batched(self):
+        addresses = [str(Keypair().pubkey()) for _ in range(4)]
+        for address in [addresses[0], *addresses]:
+            self.assertEqual(self._refund(address).status_code, 202)
+
+        sent = flush_payouts(self.client_rpc, self.keypair)
+        self.assertEqual(sent, 5)
+        # 3 per transaction, and the repeat recipient is merged into one transfer
+        self.assertEqual(len(self.rpc.sent), 2)
+        self.assertEqual(sum(len(tx.message.instructions) for tx in self.rpc.sent), 4)
+        self.assertEqual(self.rpc.calls.count('getLatestBlockhash'), 1)
+        # The ledger only shows refunds once they're confirmed
+        self.assertFalse(Transaction.objects.exists())
+
+        self.assertEqual(check_confirmations(self.client_rpc), 5)
+        self.assertEqual(Payout.objects.filter(status='CONFIRMED').count(), 5)
+        self.assertEqual(Transaction.objects.filter(transaction_type='RETURNED').count(), 4)
+        self.assertEqual(
+            Transaction.objects.get(user_address=addresses[0]).amount_lamports,
+            2 * Payout.objects.first().amount_lamports,
+        )
+
+    def test_failed_on_chain_writes_no_ledger(self):
+        self._refund(str(Keypair().pubkey()))
+        flush_payouts(self.client_rpc, self.keypair)
+        payout = Payout.objects.get()
+        self.rpc.statuses[payout.signature] = {
+            'slot': 1, 'confirmations': None, 'err': {'InstructionError': [0, {'Custom': 1}]},
+            'status': {'Err': {'InstructionError': [0, {'Custom': 1}]}}, 'confirmationStatus': 'confirmed',
+        }
+        self.assertEqual(check_confirmations(self.client_rpc), 1)
+        self.assertEqual(Payout.objects.get().status, 'FAILED')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_stale_sending_is_recovered(self):
+        self._refund(str(Keypair().pubkey()))
+        self._refund(str(Keypair().pubkey()))
+        crashed, signed = Payout.objects.order_by('id')
+        stale = timezone.now() - timedelta(seconds=61)
+        # A crash before signing, and one after the signature was recorded
+        Payout.objects.filter(pk=crashed.pk).update(status='SENDING', batch_id=uuid.uuid4(), updated_at=stale)
+        Payout.objects.filter(pk=signed.pk).update(
+            status='SENDING', batch_id=uuid.uuid4(), signature=str(Keypair().sign_message(b'x')), updated_at=stale
+        )
+
+        with self.assertLogs('users.payouts', 'WARNING'):
+            self.assertEqual(flush_payouts(self.client_rpc, self.keypair), 1)
+        self.assertEqual(len(self.rpc.sent), 1)
+        self.assertEqual(check_confirmations(self.client_rpc), 2)
+        self.assertFalse(Payout.objects.exclude(status='CONFIRMED').exists())
+
+    def test_flusher_resumes_unsettled_payouts(self):
+        flusher = PayoutFlusher(lambda: self.client_rpc, lambda: self.keypair)
+        with override_settings(PAYOUTS={'AUTOSTART': True}), mock.patch.object(flusher, 'notify') as notify:
+            flusher.resume()
+            notify.assert_not_called()
+            Payout.objects.create(user_address=str(Keypair().pubkey()), amount_lamports=10)
+            flusher.resume()
+            notify.assert_called_once()
+
+    def test_status_endpoint(self):
+        payout_id = self._refund(str(Keypair().pubkey())).json()['payout_id']
+        self.assertEqual(self.client.get(f'/user/payout_status/{payout_id}/').json()['status'], 'QUEUED')
+
+        flush_payouts(self.client_rpc, self.keypair)
+        data = self.client.get(f'/user/payout_status/{payout_id}/').json()
+        self.assertEqual(data['status'], 'SENT')
+        self.assertIsNotNone(data['explorer_url'])
+
+    def test_sign_failure_requeues_batch(self):
+        self._refund(str(Keypair().pubkey()))
+        self.rpc.fail_next = 1   # the blockhash fetch fails, so nothing is sent
+        with self.assertLogs('users.payouts', level='ERROR'):
+            self.assertEqual(flush_payouts(self.client_rpc, self.keypair), 0)
+        payout = Payout.objects.get()
+        self.assertEqual((payout.status, payout.signature), ('QUEUED', None))
+
+        self.assertEqual(flush_payouts(self.client_rpc, self.keypair), 1)
+        self.assertEqual(Payout.objects.get().status, 'SENT')
+
+    def test_send_failure_awaits_confirmation(self):
+        self._refund(str(Keypair().pubkey()))
+        with mock.patch.object(self.client_rpc, 'send_transaction', side_effect=OSError('timed out')), \
+                self.assertLogs('users.payouts', level='ERROR'):
+            flush_payouts(self.client_rpc, self.keypair)
+        payout = Payout.objects.get()
+        self.assertEqual(payout.status, 'SENT')
+        self.assertIsNotNone(payout.signature)
+
+        # It landed after all: confirmed, and the refund is in the ledger
+        self.assertEqual(check_confirmations(self.client_rpc), 1)
+        self.assertEqual(Payout.objects.get().status, 'CONFIRMED')
+        self.assertTrue(Transaction.objects.filter(signature=payout.signature, transaction_type='RETURNED').exists())
+
+    def test_invalid_address(self):
+        self.assertEqual(self._refund('not-a-key').status_code, 400)
+
+
+class TransactionHistoryTests(TransactionTestCase):
+
+    def setUp(self):
+        self.wallet = str(Keypair().pubkey())
+        for i in range(5):
+            Transaction.objects.create(
+                signature=f'sig-{i}', user_address=self.wallet, amount_lamports=i,
+                transaction_type='RECEIVED' if i % 2 else 'RETURNED',
+            )
+        Transaction.objects.create(
+            signature='other', user_address='someone-else', amount_lamports=1, transaction_type='RECEIVED'
+        )
+
+    def _page(self, **params):
+        return self.client.get('/user/transactions/', {'wallet': self.wallet, **params})
+
+    def test_keyset_pages_cover_history_newest_first(self):
+        seen, cursor = [], None
+        while True:
+            data = self._page(limit=2, **({'cursor': cursor} if cursor else {})).json()
+            self.assertLessEqual(len(data['transactions']), 2)
+            seen += [row['signature'] for row in data['transactions']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'sig-{i}' for i in reversed(range(5))])
+
+    def test_type_filter(self):
+        rows = self._page(type='RECEIVED').json()['transactions']
+        self.assertEqual([r['signature'] for r in rows], ['sig-3', 'sig-1'])
+        self.assertEqual(set(rows[0]), set(views.HISTORY_FIELDS))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/user/transactions/').status_code, 400)
+        self.assertEqual(self._page(cursor='not-a-cursor').status_code, 400)
+        self.assertEqual(self._page(type='STOLEN').status_code, 400)
+
+    def test_history_query_uses_index(self):
+        plan = Transaction.objects.filter(user_address=self.wallet).order_by('-timestamp', '-id').explain()
+        self.assertIn('tx_wallet_history_idx', plan)
+
+    def test_cursor_page_seeks_on_timestamp(self):
+        first  = self._page(limit=2).json()
+        cursor = first['next_cursor']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._page(limit=2, cursor=cursor).status_code, 200)
+        with connection.cursor() as c:
+            c.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(str(row) for row in c.fetchall())
+        self.assertIn('tx_wallet_history_idx (user_address=? AND timestamp<?)', plan)
+
+
+@override_settings(
+    ROOT_URLCONF='src.urls_async',
+    PAYMENT_VERIFICATION={'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 0},
+    PAYOUTS={'AUTOSTART': False},
+)
+class AsyncPaymentViewTests(TransactionTestCase):
+
+    def setUp(self):
+        self.treasury = Keypair().pubkey()
+        self.rpc      = StubRpcServer().__enter__()
+        self.addCleanup(self.rpc.__exit__)
+        patches = [
+            mock.patch.object(views, 'TREASURY_ADDRESS', str(self.treasury)),
+            mock.patch.object(views, 'SEEN_SIGNATURES', SeenSignatures(100, warm=views._recent_received_signatures)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    async def _submit(self, signature):
+        return await self.async_client.post(
+            '/user/recieve_payment/',
+            {'signature': signature, 'reference': 'player-1'},
+            content_type='application/json',
+        )
+
+    async def test_verifies_in_a_task_on_the_async_client(self):
+        client = AsyncSolanaRpc(self.rpc.url, retries=0)
+        with mock.patch.object(async_views, 'ASYNC_CLIENT', client):
+            signature = self.rpc.add_payment(self.treasury, views.LAMPORTS)
+            res       = await self._submit(signature)
+            self.assertEqual(res.status_code, 202)
+
+            await asyncio.gather(*async_views.VERIFY_TASKS)
+            data = (await self.async_client.get(f"/user/payment_status/{res.json()['verification_id']}/")).json()
+            self.assertTrue(data['success'])
+            self.assertEqual(client.metrics.snapshot()['get_transaction']['calls'], 1)
+
+            self.assertEqual((await self._submit(signature)).status_code, 400)
+            await client.close()
+
+        self.assertTrue(await Transaction.objects.filter(signature=signature).aexists())
+
+    async def test_refund_status_and_history(self):
+        address = str(Keypair().pubkey())
+        res     = await self.async_client.post(
+            '/user/return_payment/', {'user_address': address, 'amount': 10}, content_type='application/json'
+        )
+        self.assertEqual(res.status_code, 202)
+        payout = (await self.async_client.get(f"/user/payout_status/{res.json()['payout_id']}/")).json()
+        self.assertEqual(payout['status'], 'QUEUED')
+
+        await Transaction.objects.acreate(
+            signature='sig', user_address=address, amount_lamports=1, transaction_type='RETURNED'
+        )
+        history = (await self.async_client.get('/user/transactions/', {'wallet': address})).json()
+        self.assertEqual([row['signature'] for row in history['transactions']], ['sig'])
+
+
+class LazyInitTests(SimpleTestCase):
+
+    def test_startup_imports_no_solana_and_needs_no_key(self):
+        script = (
+            'import sys, django; django.setup(); import src.urls, src.urls_async; '
+            'print(sorted({m.split(".")[0] for m in sys.modules} & {"solana", "solders", "dotenv"}))'
+        )
+        env = {k: v for k, v in os.environ.items() if k != 'SOLANA_PRIVATE_KEY'}
+        env['DJANGO_SETTINGS_MODULE'] = 'src.settings'
+        out = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(out.stdout.strip(), '[]')
+
+    def test_client_is_created_once(self):
+        with mock.patch.object(views, 'CLIENT', None):
+            client = views.get_client()
+            self.assertIsInstance(client, SolanaRpc)
+            self.assertIs(views.get_client(), client)
+
+    def test_missing_private_key_fails_on_use(self):
+        env = {k: v for k, v in os.environ.items() if k != 'SOLANA_PRIVATE_KEY'}
+        with mock.patch.object(views, 'TREASURY_KEYPAIR', None), mock.patch.dict(os.environ, env, clear=True):
+            with self.assertRaises(ImproperlyConfigured):
+                views.get_treasury_keypair()
@@ -4,5 +4,8 @@ from . import views
 urlpatterns = [
     path('recieve_payment/', views.recieve_payment, name='recieve_payment'),
      path('return_payment/', views.return_payment, name='return_payment'),
+     path('payout_status/<uuid:payout_id>/', views.payout_status, name='payout_status'),
+     path('payment_status/<uuid:verification_id>/', views.payment_status, name='payment_status'),
+     path('transactions/', views.transaction_history, name='transaction_history'),
 
 ]
\ No newline at end of file
@@ -1,109 +1,359 @@
+import base64
 import json
+import logging
 import os
-from dotenv import load_dotenv, find_dotenv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import cache
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connection as db_connection, transaction as db_transaction
+from django.db.models import Q
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from solana.rpc.api import Client
-from solders.signature import Signature
-from solders.transaction import VersionedTransaction
-from solders.keypair import Keypair
-from solders.pubkey import Pubkey
-from solders.system_program import TransferParams, transfer
-from solders.message import MessageV0
-from .models import Transaction
+from .models import PaymentVerification, Payout, Transaction
+from .payouts import PayoutFlusher, enqueue_payout
+from .replay import SeenSignatures
 
-load_dotenv(find_dotenv())
+logger = logging.getLogger(__name__)
 
-TREASURY_ADDRESS = os.getenv("TREASURY_ADDRESS") or ""
-LAMPORTS         = 100000000  # 0.1 SOL
-CLIENT           = Client("https://api.devnet.solana.com")
+LAMPORTS = 100000000  # 0.1 SOL
 
-KEY_DATA          = json.loads(os.getenv("SOLANA_PRIVATE_KEY") or "[]")
-TREASURY_KEYPAIR  = Keypair.from_bytes(bytes(KEY_DATA))
+# Built on first use by the getters below, not at import: importing this
+# module (every manage.py command, worker boot and test run) then costs no
+# solana-py / solders import, no .env read and no key parsing, and doesn't
+# fail when SOLANA_PRIVATE_KEY is unset. solders types are imported where
+# they're used for the same reason.
+TREASURY_ADDRESS = None
+CLIENT           = None  # pooled, retrying SolanaRpc, see settings.SOLANA_RPC
+TREASURY_KEYPAIR = None
+_INIT_LOCK       = threading.Lock()
 
 
-@csrf_exempt
-def recieve_payment(req):
-    if req.method != "POST":
-        return JsonResponse({"error": "Only POST requests allowed"}, status=405)
+@cache
+def load_env():
+    """Read .env into os.environ, once."""
+    from dotenv import find_dotenv, load_dotenv
+    load_dotenv(find_dotenv())
 
-    try:
-        data      = json.loads(req.body)
-        signature = data.get('signature')
-        reference = data.get('reference')  # now a string like "ABC123-1234567890"
-    except json.JSONDecodeError:
-        return JsonResponse({"error": "Invalid JSON data."}, status=400)
 
-    if not signature:
-        return JsonResponse({"error": "signature is required."}, status=400)
+def get_treasury_address() -> str:
+    global TREASURY_ADDRESS
+    if TREASURY_ADDRESS is None:
+        load_env()
+        TREASURY_ADDRESS = os.getenv("TREASURY_ADDRESS") or ""
+    return TREASURY_ADDRESS
 
-    # Parse signature
-    try:
-        sig = Signature.from_string(signature)
-    except ValueError:
-        return JsonResponse({"error": "Invalid signature format."}, status=400)
 
-    import time
+def get_client():
+    global CLIENT
+    if CLIENT is None:
+        with _INIT_LOCK:
+            if CLIENT is None:
+                from .rpc import SolanaRpc
+                load_env()
+                CLIENT = SolanaRpc.from_settings()
+    return CLIENT
 
-    max_retries = 5
-    for attempt in range(max_retries):
-        res = CLIENT.get_transaction(
-        sig,
-        encoding="base64",
-        commitment="confirmed",  # <-- ADD THIS LINE
-        max_supported_transaction_version=0
+
+def get_treasury_keypair():
+    global TREASURY_KEYPAIR
+    if TREASURY_KEYPAIR is None:
+        with _INIT_LOCK:
+            if TREASURY_KEYPAIR is None:
+                from solders.keypair import Keypair
+                load_env()
+                key_data = json.loads(os.getenv("SOLANA_PRIVATE_KEY") or "[]")
+                if not key_data:
+                    raise ImproperlyConfigured("SOLANA_PRIVATE_KEY is not set.")
+                TREASURY_KEYPAIR = Keypair.from_bytes(bytes(key_data))
+    return TREASURY_KEYPAIR
+
+
+# Refunds are queued and sent in batches by this background flusher
+PAYOUT_FLUSHER = PayoutFlusher(get_client, get_treasury_keypair)
+
+
+def _recent_received_signatures(limit):
+    return (
+        Transaction.objects
+        .filter(transaction_type='RECEIVED')
+        .order_by('-id')
+        .values_list('signature', flat=True)[:limit]
     )
+
+
+# Signatures already paid with; checked before any DB or RPC work.
+# Warmed from the Transaction table on first use.
+SEEN_SIGNATURES = SeenSignatures(
+    getattr(settings, 'PAYMENT_VERIFICATION', {}).get('SEEN_CACHE_SIZE', 100_000),
+    warm=_recent_received_signatures,
+)
+
+# Payment verification runs here, off the request thread
+VERIFY_EXECUTOR       = None
+_VERIFY_EXECUTOR_LOCK = threading.Lock()
+
+
+ALREADY_USED = "Transaction already used."
+
+
+class PaymentVerificationError(Exception):
+    pass
+
+
+def _verify_transaction(sig):
+    """
+    Fetch a transaction and check it paid the treasury at least LAMPORTS.
+    Polls while the transaction propagates. Returns (amount_received, payer).
+    """
+    conf        = getattr(settings, 'PAYMENT_VERIFICATION', {})
+    max_retries = conf.get('MAX_ATTEMPTS', 5)
+    retry_delay = conf.get('RETRY_DELAY', 2)
+
+    for attempt in range(max_retries):
+        res = get_client().get_transaction(
+            sig,
+            encoding="base64",
+            commitment="confirmed",
+            max_supported_transaction_version=0
+        )
         if res.value is not None:
-            break  
-        time.sleep(2)
+            break
+        time.sleep(retry_delay)
     else:
-        return JsonResponse({"error": "Transaction not found. It may still be propagating."}, status=404)
+        raise PaymentVerificationError("Transaction not found. It may still be propagating.")
+
+    return _check_payment(res)
+
+
+def _check_payment(res):
+    """Check a get_transaction response paid the treasury; (amount_received, payer)."""
+    from solders.transaction import VersionedTransaction
 
     meta = res.value.transaction.meta
     if meta is None:
-        return JsonResponse({"error": "Transaction metadata missing."}, status=400)
+        raise PaymentVerificationError("Transaction metadata missing.")
     if meta.err is not None:
-        return JsonResponse({"error": f"Transaction failed on-chain: {meta.err}"}, status=400)
+        raise PaymentVerificationError(f"Transaction failed on-chain: {meta.err}")
 
     # Verify treasury received the correct amount
     transaction_data = res.value.transaction.transaction
     if not isinstance(transaction_data, VersionedTransaction):
-        return JsonResponse({"error": "Unexpected transaction format."}, status=400)
+        raise PaymentVerificationError("Unexpected transaction format.")
 
     account_keys = [str(pubkey) for pubkey in transaction_data.message.account_keys]
 
-    if TREASURY_ADDRESS not in account_keys:
-        return JsonResponse({"error": "Treasury address not found in transaction."}, status=400)
+    treasury_address = get_treasury_address()
+    if treasury_address not in account_keys:
+        raise PaymentVerificationError("Treasury address not found in transaction.")
 
-    treasury_index   = account_keys.index(TREASURY_ADDRESS)
+    treasury_index   = account_keys.index(treasury_address)
     pre_balance      = meta.pre_balances[treasury_index]
     post_balance     = meta.post_balances[treasury_index]
     amount_received  = post_balance - pre_balance
 
     if amount_received < LAMPORTS:
-        return JsonResponse({
-            "error": f"Insufficient payment. Received {amount_received} lamports, expected {LAMPORTS}."
-        }, status=400)
-
-    # Anti-replay: check signature hasn't been used before
-    if Transaction.objects.filter(signature=str(sig)).exists():
-        return JsonResponse({"error": "Transaction already used."}, status=400)
-
-    Transaction.objects.create(
-        signature=str(sig),
-        user_address=reference or account_keys[0],
-        amount_lamports=amount_received,
-        transaction_type='RECEIVED'
+        raise PaymentVerificationError(
+            f"Insufficient payment. Received {amount_received} lamports, expected {LAMPORTS}."
+        )
+
+    return amount_received, account_keys[0]
+
+
+def _settle_verification(verification, error=None):
+    """Set a verification's final status from what its check raised (None: paid)."""
+    if error is None:
+        verification.status = 'VERIFIED'
+        verification.error  = ''
+    elif isinstance(error, PaymentVerificationError):
+        verification.status = 'FAILED'
+        verification.error  = str(error)
+    elif isinstance(error, IntegrityError):
+        verification.status = 'FAILED'
+        verification.error  = ALREADY_USED
+    else:
+        verification.status = 'FAILED'
+        verification.error  = f"Verification error: {error}"[:255]
+    if error is None or isinstance(error, IntegrityError):
+        SEEN_SIGNATURES.add(verification.signature)
+
+
+def run_payment_verification(verification_id):
+    """Background job: verify one pending payment and record the outcome."""
+    from solders.signature import Signature
+
+    try:
+        verification = PaymentVerification.objects.get(verification_id=verification_id)
+        try:
+            # Cheap indexed check so replays of old signatures skip the RPC polling
+            if Transaction.objects.filter(signature=verification.signature, transaction_type='RECEIVED').exists():
+                raise IntegrityError
+            amount_received, payer = _verify_transaction(Signature.from_string(verification.signature))
+
+            # Anti-replay: unique_received_signature rejects a second insert
+            with db_transaction.atomic():
+                Transaction.objects.create(
+                    signature=verification.signature,
+                    user_address=verification.reference or payer,
+                    amount_lamports=amount_received,
+                    transaction_type='RECEIVED'
+                )
+        except Exception as e:
+            _settle_verification(verification, e)
+        else:
+            _settle_verification(verification)
+        verification.save(update_fields=['status', 'error', 'updated_at'])
+    finally:
+        # Worker threads aren't request-scoped, so nothing else closes this
+        db_connection.close()
+
+
+def _get_verify_executor():
+    global VERIFY_EXECUTOR
+    if VERIFY_EXECUTOR is None:
+        with _VERIFY_EXECUTOR_LOCK:
+            if VERIFY_EXECUTOR is None:
+                workers         = getattr(settings, 'PAYMENT_VERIFICATION', {}).get('WORKERS', 4)
+                VERIFY_EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payment-verify')
+    return VERIFY_EXECUTOR
+
+
+def _log_verification_error(future):
+    # run_payment_verification records failures itself; this catches what escapes it
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Payment verification crashed', exc_info=future.exception())
+
+
+def submit_verification(verification_id):
+    _get_verify_executor().submit(run_payment_verification, verification_id).add_done_callback(
+        _log_verification_error
     )
 
-    return JsonResponse({"success": True, "message": "Payment verified!"})
+
+def _verification_payload(verification):
+    return {
+        "verification_id": str(verification.verification_id),
+        "status":          verification.status,
+        "success":         verification.status == 'VERIFIED',
+        "pending":         verification.status == 'PENDING',
+        "error":           verification.error or None,
+    }
+
+
+def _parse_payment_request(req):
+    """(signature, reference) from a recieve_payment body, or an error response."""
+    from solders.signature import Signature
+
+    try:
+        data      = json.loads(req.body)
+        signature = data.get('signature')
+        reference = data.get('reference')  # now a string like "ABC123-1234567890"
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data."}, status=400)
+
+    if not signature:
+        return JsonResponse({"error": "signature is required."}, status=400)
+
+    # Parse signature
+    try:
+        return Signature.from_string(signature), reference
+    except ValueError:
+        return JsonResponse({"error": "Invalid signature format."}, status=400)
+
+
+def _existing_verification_response(verification, reference):
+    """
+    Response for a signature that already had a verification row, or None
+    when it should be verified again (caller saves it and queues the job):
+    a FAILED one is reset to PENDING, and a PENDING one that has sat past
+    STALE_AFTER lost its worker (restart, crash, failed final save).
+    """
+    if verification.status == 'VERIFIED' or verification.error == ALREADY_USED:
+        SEEN_SIGNATURES.add(verification.signature)
+        return JsonResponse({"error": ALREADY_USED}, status=400)
+
+    if verification.status == 'PENDING':
+        stale_after = getattr(settings, 'PAYMENT_VERIFICATION', {}).get('STALE_AFTER', 120)
+        if verification.updated_at > timezone.now() - timedelta(seconds=stale_after):
+            return JsonResponse(_verification_payload(verification), status=202)
+
+    # Retry, e.g. after a "not found yet" failure
+    verification.status    = 'PENDING'
+    verification.error     = ''
+    verification.reference = reference or verification.reference
+    return None
 
 
 @csrf_exempt
-def return_payment(request):
-    if request.method != "POST":
+def recieve_payment(req):
+    """
+    Queue verification of a payment signature and return immediately with
+    a verification id (HTTP 202). Poll payment_status for the outcome.
+    """
+    if req.method != "POST":
         return JsonResponse({"error": "Only POST requests allowed"}, status=405)
 
+    parsed = _parse_payment_request(req)
+    if isinstance(parsed, JsonResponse):
+        return parsed
+    sig, reference = parsed
+
+    # Anti-replay, fast path: a known signature costs one set lookup
+    if str(sig) in SEEN_SIGNATURES:
+        return JsonResponse({"error": ALREADY_USED}, status=400)
+
+    # The unique signature column makes this insert the claim; a concurrent
+    # duplicate gets IntegrityError and reads the existing row instead.
+    try:
+        with db_transaction.atomic():
+            verification = PaymentVerification.objects.create(signature=str(sig), reference=reference)
+        created = True
+    except IntegrityError:
+        verification, created = PaymentVerification.objects.get(signature=str(sig)), False
+
+    if not created:
+        early = _existing_verification_response(verification, reference)
+        if early is not None:
+            return early
+        verification.save(update_fields=['status', 'error', 'reference', 'updated_at'])
+
+    if verification.status == 'PENDING':
+        submit_verification(verification.verification_id)
+
+    return JsonResponse(_verification_payload(verification), status=202)
+
+
+def payment_status(req, verification_id):
+    """GET /user/payment_status/<verification_id>/ — cheap poll, one indexed lookup."""
+    if req.method != "GET":
+        return JsonResponse({"error": "Only GET requests allowed"}, status=405)
+
+    return _verification_status_response(_verification_lookup(verification_id).first())
+
+
+def _verification_lookup(verification_id):
+    return (
+        PaymentVerification.objects
+        .filter(verification_id=verification_id)
+        .only('verification_id', 'status', 'error')
+    )
+
+
+def _verification_status_response(verification):
+    if verification is None:
+        return JsonResponse({"error": "Unknown verification id."}, status=404)
+
+    return JsonResponse(_verification_payload(verification))
+
+
+def _parse_refund_request(request):
+    """(user_address, lamports, refund_sol) from a return_payment body, or an error response."""
+    from solders.pubkey import Pubkey
+
     try:
         data         = json.loads(request.body)
         user_address = data.get('user_address')
@@ -114,37 +364,149 @@ def return_payment(request):
         refund_sol    = min(0.01 + (int(coins_earned) * 0.0001), 0.09)
         lamports      = int(refund_sol * 1_000_000_000)
 
-        transfer_ix = transfer(TransferParams(
-            from_pubkey=TREASURY_KEYPAIR.pubkey(),
-            to_pubkey=Pubkey.from_string(user_address),
-            lamports=lamports
-        ))
+        Pubkey.from_string(user_address)
+    except (json.JSONDecodeError, ValueError, TypeError):
+        return JsonResponse({"error": "A valid user_address and integer amount are required."}, status=400)
+    return user_address, lamports, refund_sol
 
-        recent_blockhash = CLIENT.get_latest_blockhash().value.blockhash
 
-        message = MessageV0.try_compile(
-            payer=TREASURY_KEYPAIR.pubkey(),
-            instructions=[transfer_ix],
-            address_lookup_table_accounts=[],
-            recent_blockhash=recent_blockhash
-        )
+def _queued_response(payout, refund_sol):
+    return JsonResponse({
+        "success":    True,
+        "queued":     True,
+        "payout_id":  str(payout.payout_id),
+        "refund_sol": refund_sol,
+    }, status=202)
 
-        transaction = VersionedTransaction(message, [TREASURY_KEYPAIR])
-        res         = CLIENT.send_transaction(transaction)
 
-        Transaction.objects.create(
-            signature=str(res.value),
-            user_address=user_address,
-            amount_lamports=lamports,
-            transaction_type='RETURNED'
-        )
+@csrf_exempt
+def return_payment(request):
+    """
+    Queue a refund and return 202 immediately. The payout flusher packs
+    queued refunds into multi-transfer transactions; poll payout_status.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST requests allowed"}, status=405)
 
-        return JsonResponse({
-            "success":      True,
-            "signature":    str(res.value),
-            "refund_sol":   refund_sol,
-            "explorer_url": f"https://explorer.solana.com/tx/{res.value}?cluster=devnet"
-        })
+    parsed = _parse_refund_request(request)
+    if isinstance(parsed, JsonResponse):
+        return parsed
+    user_address, lamports, refund_sol = parsed
 
+    try:
+        payout = enqueue_payout(user_address, lamports)
+        PAYOUT_FLUSHER.notify()
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+    return _queued_response(payout, refund_sol)
+
+
+def payout_status(req, payout_id):
+    """GET /user/payout_status/<payout_id>/"""
+    if req.method != "GET":
+        return JsonResponse({"error": "Only GET requests allowed"}, status=405)
+
+    return _payout_response(Payout.objects.filter(payout_id=payout_id).first())
+
+
+def _payout_response(payout):
+    if payout is None:
+        return JsonResponse({"error": "Unknown payout id."}, status=404)
+
+    return JsonResponse({
+        "payout_id":    str(payout.payout_id),
+        "status":       payout.status,
+        "signature":    payout.signature,
+        "explorer_url": (
+            f"https://explorer.solana.com/tx/{payout.signature}?cluster=devnet" if payout.signature else None
+        ),
+        "error":        payout.error or None,
+    })
+
+
+# Wallet history page sizes
+HISTORY_PAGE_SIZE     = 50
+HISTORY_MAX_PAGE_SIZE = 200
+HISTORY_FIELDS        = ('id', 'signature', 'amount_lamports', 'transaction_type', 'timestamp')
+
+
+def _encode_cursor(row):
+    raw = f"{row['timestamp'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """(timestamp, id) of the last row of the previous page; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def transaction_history(req):
+    """
+    GET /user/transactions/?wallet=<address>[&type=RECEIVED|RETURNED][&limit=N][&cursor=...]
+
+    Newest first. Pages with a keyset cursor on (timestamp, id) rather than
+    OFFSET, so every page is one range scan of tx_wallet_history_idx no
+    matter how deep the client pages.
+    """
+    if req.method != "GET":
+        return JsonResponse({"error": "Only GET requests allowed"}, status=405)
+
+    query = _history_query(req)
+    if isinstance(query, JsonResponse):
+        return query
+    wallet, rows, limit = query
+
+    return _history_response(wallet, list(rows), limit)
+
+
+def _history_query(req):
+    """(wallet, rows queryset, limit) for a transaction_history request, or an error response."""
+    wallet = req.GET.get('wallet')
+    if not wallet:
+        return JsonResponse({"error": "wallet is required."}, status=400)
+
+    tx_type = req.GET.get('type')
+    if tx_type is not None and tx_type not in dict(Transaction.TRANSACTION_TYPES):
+        return JsonResponse({"error": "type must be RECEIVED or RETURNED."}, status=400)
+
+    try:
+        limit = int(req.GET.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
+    rows = Transaction.objects.filter(user_address=wallet)
+    if tx_type is not None:
+        rows = rows.filter(transaction_type=tx_type)
+
+    cursor = req.GET.get('cursor')
+    if cursor:
+        try:
+            timestamp, row_id = _decode_cursor(cursor)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        # The plain timestamp__lte gives the index a range bound to seek to; the
+        # OR alone only matches on user_address and scans every newer row
+        rows = rows.filter(
+            Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=row_id), timestamp__lte=timestamp
+        )
+
+    # One extra row tells us whether there is a next page
+    return wallet, rows.order_by('-timestamp', '-id').values(*HISTORY_FIELDS)[:limit + 1], limit
+
+
+def _history_response(wallet, page, limit):
+    more = len(page) > limit
+    page = page[:limit]
+
+    return JsonResponse({
+        "wallet":       wallet,
+        "transactions": page,
+        "next_cursor":  _encode_cursor(page[-1]) if more else None,
+    })
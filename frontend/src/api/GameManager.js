@@ -11,6 +11,7 @@
 // ============================================================================
 
 import { GameApi } from './gameApi';
+import { GameSocket } from './gameSocket';
 
 export class GameManager {
     /**
@@ -18,9 +19,14 @@ export class GameManager {
      * @param {object}  [opts]
      * @param {number}  [opts.startHealth=100]
      * @param {number}  [opts.maxHealth=100]
+     * @param {number}  [opts.prefetchSize=3]  rooms to keep buffered ahead (0 disables)
+     * @param {boolean} [opts.socket=false]    talk to the server over one WebSocket;
+     *                                         rooms it pushes go into the prefetch buffer
      */
-    constructor(accessToken, { startHealth = 100, maxHealth = 100 } = {}) {
-        this.api = new GameApi(accessToken);
+    constructor(accessToken, { startHealth = 100, maxHealth = 100, prefetchSize = 3, socket = false } = {}) {
+        this.api = socket
+            ? new GameSocket(accessToken, { onPush: (kind, body) => this._onPush(kind, body) })
+            : new GameApi(accessToken);
 
         // ── Player state ────────────────────────────────────────────────────
         this.health         = startHealth;
@@ -33,6 +39,16 @@ export class GameManager {
         this.currentRoom    = null;
         this.roomsAlive     = {};   // enemyId → Enemy (live lookup)
 
+        // ── Server-side run session: send ids instead of whole rooms ───────
+        this.runId          = null;
+        this.seed           = null; // replays the run's rooms: loadFirstRoom(seed)
+        this._killedIds     = [];   // enemies killed in the current room
+
+        // ── Combat events for the current room, sent as one batch ──────────
+        this._combatEvents  = [];
+        this._combatFlush   = null;   // in-flight combatEvents() request
+        this._roomStartedAt = 0;
+
         // ── Phaser event emitter (set by scene) ─────────────────────────────
         /** @type {Phaser.Events.EventEmitter|null} */
         this.events         = null;
@@ -44,6 +60,11 @@ export class GameManager {
 
         // ── Pending coins to report when exiting (enemies killed this room) ─
         this._roomCoins     = 0;
+
+        // ── Prefetch buffer: room_number → Room, filled in the background ──
+        this.prefetchSize   = prefetchSize;
+        this._prefetched    = new Map();
+        this._prefetching   = null;
     }
 
     // ────────────────────────────────────────────────────────────────────────
@@ -63,15 +84,19 @@ export class GameManager {
 
     /**
      * Load the very first room (entrance).
-     * Call this once when the game starts.
+     * Call this once when the game starts; pass an earlier run's `seed`
+     * to replay its rooms.
      * @returns {Promise<import('./gameApi').Room>}
      */
-    async loadFirstRoom() {
+    async loadFirstRoom(seed = null) {
         this.isLoadingRoom = true;
         this._emit('room:loading');
         try {
-            const room      = await this.api.generateRoom(0, 'entrance');
+            const { run_id, seed: runSeed, room } = await this.api.startRun(seed);
+            this.runId      = run_id;
+            this.seed       = runSeed;
             this._applyRoom(room);
+            this._topUpPrefetch();
             return room;
         } finally {
             this.isLoadingRoom = false;
@@ -93,6 +118,19 @@ export class GameManager {
         this.isExiting = true;
         this._emit('room:exiting');
 
+        // The server's coin total must include this room's kills
+        await this._flushCombatEvents();
+
+        // Prefetched room available: transition locally, no round trip
+        const buffered = this.health > 0 && this._prefetched.get(this.roomsCleared + 1);
+        if (buffered) {
+            try {
+                return this._advanceToRoom(buffered);
+            } finally {
+                this.isExiting = false;
+            }
+        }
+
         try {
             const res = await this.api.nextRoom({
                 playerHealth:    this.health,
@@ -100,6 +138,8 @@ export class GameManager {
                 roomsCleared:    this.roomsCleared,
                 coinsEarned:     this._roomCoins,
                 currentRoom:     this.currentRoom,
+                runId:           this.runId,
+                killed:          this._killedIds,
             });
 
             if (res.game_over) {
@@ -116,6 +156,7 @@ export class GameManager {
 
             this._applyRoom(res.next_room);
             this._emit('room:loaded', res.next_room, res);
+            this._topUpPrefetch();
             return res;
 
         } finally {
@@ -137,27 +178,70 @@ export class GameManager {
 
         // Optimistic local update
         enemy.is_dead = true;
+        this._killedIds.push(enemy.id);
         if (this.roomsAlive[enemy.id]) delete this.roomsAlive[enemy.id];
         this._roomCoins += enemy.coin_reward;
         this.coins      += enemy.coin_reward;   // local optimistic
 
         this._emit('enemy:killed', enemy);
 
-        // Sync with backend (fire-and-forget, errors logged not thrown)
-        this.api.killEnemy(enemy.id, enemy.coin_reward)
-            .then(res => {
-                this.coins = res.total_coins;   // reconcile with server value
-                this._emit('player:coins', this.coins);
-            })
-            .catch(err => console.error('[GameManager] killEnemy API error:', err));
+        if (this.runId) {
+            // Batched: reported with the rest of the room's combat
+            this._recordCombatEvent({ type: 'kill', enemy_id: enemy.id });
+        } else {
+            // No run session to check against: per-kill echo (fire-and-forget)
+            this.api.killEnemy(enemy.id, enemy.coin_reward)
+                .then(res => {
+                    this.coins = res.total_coins;   // reconcile with server value
+                    this._emit('player:coins', this.coins);
+                })
+                .catch(err => console.error('[GameManager] killEnemy API error:', err));
+        }
 
         // Check if room is now cleared
         if (this._allEnemiesDead()) {
             if (this.currentRoom) this.currentRoom.is_cleared = true;
             this._emit('room:cleared', this.currentRoom);
+            this._flushCombatEvents();
         }
     }
 
+    /**
+     * Record damage dealt to an enemy; the server needs it to accept the kill.
+     * @param {import('./gameApi').Enemy} enemy
+     * @param {number} amount
+     */
+    recordDamage(enemy, amount) {
+        if (!enemy || enemy.is_dead || !this.runId) return;
+        this._recordCombatEvent({ type: 'damage', enemy_id: enemy.id, amount: Math.round(amount) });
+    }
+
+    _recordCombatEvent(event) {
+        const t = Math.max(0, Math.round(performance.now() - this._roomStartedAt));
+        this._combatEvents.push({ ...event, t });
+    }
+
+    /**
+     * Send the room's recorded combat events in one request and take the
+     * server's reconciled coin total. Resolves once every event sent so far
+     * has been answered; failures are logged, not thrown.
+     */
+    async _flushCombatEvents() {
+        if (this._combatFlush) await this._combatFlush;
+        if (!this.runId || this._combatEvents.length === 0) return;
+
+        const events = this._combatEvents;
+        this._combatEvents = [];
+        this._combatFlush  = this.api.combatEvents(this.runId, events)
+            .then(res => {
+                this.coins = res.total_coins;
+                this._emit('player:coins', this.coins);
+            })
+            .catch(err => console.error('[GameManager] combatEvents API error:', err))
+            .finally(() => { this._combatFlush = null; });
+        await this._combatFlush;
+    }
+
     /**
      * Apply damage to the player.
      * @param {number} amount
@@ -210,10 +294,89 @@ export class GameManager {
     //  Internal helpers
     // ────────────────────────────────────────────────────────────────────────
 
+    /**
+     * Move into a room taken from the prefetch buffer.
+     * Mirrors the shape of a next-room response so listeners don't care.
+     */
+    _advanceToRoom(room) {
+        // Keep the run session in step; it already holds this prefetched room.
+        // Top-up waits for it so the two session writes don't race.
+        let sync = null;
+        if (this.runId) {
+            sync = this.api.nextRoom({
+                playerHealth:    this.health,
+                playerMaxHealth: this.maxHealth,
+                roomsCleared:    this.roomsCleared,
+                coinsEarned:     this._roomCoins,
+                runId:           this.runId,
+                killed:          this._killedIds,
+                includeRooms:    false,
+            }).catch(err => console.error('[GameManager] run sync error:', err));
+        }
+
+        this.roomsCleared = room.room_number;
+        this._roomCoins   = 0;
+        this._prefetched.delete(room.room_number);
+
+        const res = {
+            game_over:         false,
+            rooms_cleared:     this.roomsCleared,
+            difficulty:        room.difficulty,
+            next_increase_in:  room.next_increase_in,
+            player_health:     this.health,
+            player_max_health: this.maxHealth,
+            total_coins:       this.coins,
+            cleared_room:      null,
+            next_room:         room,
+        };
+
+        this._applyRoom(room);
+        this._emit('room:loaded', room, res);
+        if (sync) sync.finally(() => this._topUpPrefetch());
+        else this._topUpPrefetch();
+        return res;
+    }
+
+    /**
+     * Keep `prefetchSize` rooms buffered past the current one.
+     * Runs in the background; failures just leave the buffer short and
+     * exitRoom() falls back to the next-room endpoint.
+     */
+    _topUpPrefetch() {
+        if (this.prefetchSize <= 0 || this._prefetching) return;
+
+        for (const n of this._prefetched.keys()) {
+            if (n <= this.roomsCleared) this._prefetched.delete(n);
+        }
+
+        let from = this.roomsCleared + 1;
+        while (this._prefetched.has(from)) from++;
+        const count = this.roomsCleared + this.prefetchSize + 1 - from;
+        if (count <= 0) return;
+
+        this._prefetching = this.api.generateRooms(from, count, this.runId)
+            .then(res => {
+                for (const room of res.rooms) this._prefetched.set(room.room_number, room);
+            })
+            .catch(err => console.error('[GameManager] prefetch error:', err))
+            .finally(() => { this._prefetching = null; });
+    }
+
+    /** Server push over the game socket: buffer the rooms it generated ahead. */
+    _onPush(kind, body) {
+        if (kind !== 'upcoming') return;
+        for (const room of body.rooms) {
+            if (room.room_number > this.roomsCleared) this._prefetched.set(room.room_number, room);
+        }
+    }
+
     /** Apply a new room from the API and rebuild the enemy lookup map. */
     _applyRoom(room) {
-        this.currentRoom = room;
-        this.roomsAlive  = {};
+        this.currentRoom    = room;
+        this.roomsAlive     = {};
+        this._killedIds     = [];
+        this._combatEvents  = [];
+        this._roomStartedAt = performance.now();
 
         for (const enemy of room.enemies ?? []) {
             if (!enemy.is_dead) {
@@ -4,9 +4,68 @@
 
 const BASE_URL = import.meta.env.VITE_API_URL ?? 'http://localhost:8000';
 
+// Tile encodings understood by the backend (?tiles=json|rle|b64)
+export const TILE_ENCODINGS = ['json', 'rle', 'b64'];
+
+/**
+ * Rebuild a nested tile array from the backend's compact encoding.
+ * Plain nested arrays (tiles=json) are returned untouched.
+ */
+export function decodeTiles(tiles) {
+    if (Array.isArray(tiles) || !tiles) return tiles;
+
+    const { encoding, width, height, data } = tiles;
+    const flat = new Array(width * height);
+
+    if (encoding === 'rle') {
+        let i = 0;
+        for (let p = 0; p < data.length; p += 2) {
+            flat.fill(data[p], i, i + data[p + 1]);
+            i += data[p + 1];
+        }
+    } else if (encoding === 'b64') {
+        const bin = atob(data);
+        for (let i = 0; i < bin.length; i++) flat[i] = bin.charCodeAt(i);
+    } else {
+        throw new Error(`Unknown tile encoding: ${encoding}`);
+    }
+
+    const rows = [];
+    for (let r = 0; r < height; r++) rows.push(flat.slice(r * width, (r + 1) * width));
+    return rows;
+}
+
+/** Decode `layout.tiles` in place on a room object (null-safe). */
+export function decodeRoom(room) {
+    if (room?.layout) room.layout.tiles = decodeTiles(room.layout.tiles);
+    return room;
+}
+
+/**
+ * Apply a `cleared_room_patch` (RFC 6902 JSON Patch; only add / replace /
+ * remove on objects are produced) to a room in place.
+ */
+export function applyRoomPatch(room, ops) {
+    for (const op of ops ?? []) {
+        const tokens = op.path.split('/').slice(1)
+            .map((t) => t.replace(/~1/g, '/').replace(/~0/g, '~'));
+        const last   = tokens.pop();
+        const target = tokens.reduce((node, t) => node[t], room);
+        if (op.op === 'remove') delete target[last];
+        else target[last] = op.value;
+    }
+    return room;
+}
+
 export class GameApi {
-    constructor(accessToken) {
-        this.accessToken = accessToken;
+    /**
+     * @param {string} accessToken
+     * @param {object} [opts]
+     * @param {string} [opts.tileEncoding='rle']  one of TILE_ENCODINGS
+     */
+    constructor(accessToken, { tileEncoding = 'rle' } = {}) {
+        this.accessToken  = accessToken;
+        this.tileEncoding = tileEncoding;
     }
 
     async _request(method, path, body = null, params = null) {
@@ -41,21 +100,77 @@ export class GameApi {
     }
 
     async generateRoom(roomsCleared = 0, roomType = null) {
-        return this._request('GET', '/game/generate/room/', null, {
+        const room = await this._request('GET', '/game/generate/room/', null, {
             rooms_cleared: roomsCleared,
             room_type:     roomType,
+            tiles:         this.tileEncoding,
         });
+        return decodeRoom(room);
     }
 
-    async nextRoom({ playerHealth, playerMaxHealth = 100, roomsCleared, coinsEarned = 0, currentRoom = null, roomType = null }) {
-        return this._request('POST', '/game/generate/next-room/', {
+    /**
+     * Open a server-side run session. Its rooms all derive from `seed`;
+     * passing an earlier run's seed replays the same rooms.
+     * @returns {Promise<{run_id: string, seed: number, room: object}>}
+     */
+    async startRun(seed = null) {
+        const res = await this._request('POST', '/game/generate/run/', seed === null ? {} : { seed }, {
+            tiles: this.tileEncoding,
+        });
+        decodeRoom(res.room);
+        return res;
+    }
+
+    /**
+     * Fetch rooms `from` .. `from + count - 1` in one round trip.
+     * Passing `runId` also stores them on the run session.
+     * @returns {Promise<{from: number, count: number, rooms: object[]}>}
+     */
+    async generateRooms(from, count, runId = null) {
+        const res = await this._request('GET', '/game/generate/rooms/', null, {
+            from,
+            count,
+            run_id: runId,
+            tiles:  this.tileEncoding,
+        });
+        res.rooms.forEach(decodeRoom);
+        return res;
+    }
+
+    /**
+     * With `runId` the server reads the current room from the run session,
+     * so only `killed` enemy ids need to be sent instead of `currentRoom`.
+     * Passing `deltaFrom` (the room as the server last sent it) asks for a
+     * patch instead; `cleared_room` is then that room, patched in place.
+     */
+    async nextRoom({
+        playerHealth, playerMaxHealth = 100, roomsCleared, coinsEarned = 0,
+        currentRoom = null, roomType = null, runId = null, killed = null, includeRooms = true,
+        deltaFrom = null,
+    }) {
+        const body = {
             player_health:      playerHealth,
             player_max_health:  playerMaxHealth,
             rooms_cleared:      roomsCleared,
             coins_earned:       coinsEarned,
-            current_room:       currentRoom,
             room_type:          roomType,
+        };
+        if (runId) {
+            body.run_id = runId;
+            body.killed = killed ?? [];
+        } else {
+            body.current_room = currentRoom;
+        }
+        if (!includeRooms) body.include_rooms = false;
+        if (deltaFrom) body.delta = true;
+
+        const res = await this._request('POST', '/game/generate/next-room/', body, {
+            tiles: this.tileEncoding,
         });
+        if (res.cleared_room_patch) res.cleared_room = applyRoomPatch(deltaFrom, res.cleared_room_patch);
+        else decodeRoom(res.cleared_room);
+        decodeRoom(res.next_room);
+        return res;
     }
 
     async killEnemy(enemyId, coinReward) {
@@ -65,8 +180,31 @@ export class GameApi {
         });
     }
 
-    async leaveRoom(room) {
-        return this._request('POST', '/game/generate/leave-room/', { room });
+    /**
+     * Report a run's combat for the current room in one request.
+     * `events`: [{ type: 'damage'|'kill', enemy_id, amount?, t }], `t` in ms.
+     * @returns {Promise<{accepted: number, rejected: object[], coins_earned: number,
+     *                    total_coins: number, enemies_alive: number, room_cleared: boolean}>}
+     */
+    async combatEvents(runId, events) {
+        return this._request('POST', '/game/generate/combat-events/', { run_id: runId, events });
+    }
+
+    /**
+     * `roomOrRun` is a full room, or `{ runId, killed }` for a run session.
+     * `deltaFrom` works as in nextRoom().
+     */
+    async leaveRoom(roomOrRun, { deltaFrom = null } = {}) {
+        const body = roomOrRun?.runId
+            ? { run_id: roomOrRun.runId, killed: roomOrRun.killed ?? [] }
+            : { room: roomOrRun };
+        if (deltaFrom) body.delta = true;
+        const res = await this._request('POST', '/game/generate/leave-room/', body, {
+            tiles: this.tileEncoding,
+        });
+        if (res.cleared_room_patch) res.cleared_room = applyRoomPatch(deltaFrom, res.cleared_room_patch);
+        else decodeRoom(res.cleared_room);
+        return res;
     }
 
     async generateEnemy(roomsCleared = 0) {
@@ -74,6 +212,11 @@ export class GameApi {
             rooms_cleared: roomsCleared,
         });
     }
+
+    /** Top `limit` high scores, plus `me` (rank and score) when signed in. */
+    async leaderboard(limit = 10) {
+        return this._request('GET', '/game/leaderboard/', null, { limit });
+    }
 }
 
 export class GameApiError extends Error {
@@ -0,0 +1,154 @@
+// ============================================================================
+//  gameSocket.js  —  GameApi over one WebSocket (ws://…/game/ws/)
+//
+//  Same methods and return values as GameApi, so GameManager can use either.
+//  Frames are [id, op, payload] out and [id, status, body] back; the server
+//  also pushes [0, 'upcoming', { from, count, rooms }] after a room is
+//  cleared, delivered to `onPush`.
+// ============================================================================
+
+import { GameApiError, applyRoomPatch, decodeRoom } from './gameApi';
+
+const WS_URL  = (import.meta.env.VITE_API_URL ?? 'http://localhost:8000').replace(/^http/, 'ws') + '/game/ws/';
+const PUSH_ID = 0;
+
+export class GameSocket {
+    /**
+     * @param {string} accessToken
+     * @param {object} [opts]
+     * @param {string} [opts.tileEncoding='rle']  one of TILE_ENCODINGS
+     * @param {(kind: string, body: object) => void} [opts.onPush]
+     */
+    constructor(accessToken, { tileEncoding = 'rle', onPush = null } = {}) {
+        this.accessToken  = accessToken;
+        this.tileEncoding = tileEncoding;
+        this.onPush       = onPush;
+        this._nextId      = 1;
+        this._pending     = new Map();   // frame id → { resolve, reject }
+        this._socket      = null;
+        this._open        = null;
+    }
+
+    _connect() {
+        if (this._open) return this._open;
+
+        const url = new URL(WS_URL);
+        url.searchParams.set('tiles', this.tileEncoding);
+        if (this.accessToken) url.searchParams.set('token', this.accessToken);
+
+        const socket = this._socket = new WebSocket(url.toString());
+        socket.onmessage = (e) => this._receive(JSON.parse(e.data));
+        socket.onclose   = (e) => {
+            // Fail whatever is in flight; the next call reconnects
+            for (const { reject } of this._pending.values()) {
+                reject(new GameApiError(e.code, 'Game socket closed'));
+            }
+            this._pending.clear();
+            this._socket = this._open = null;
+        };
+        this._open = new Promise((resolve, reject) => {
+            socket.onopen  = () => resolve(socket);
+            socket.onerror = () => reject(new GameApiError(0, 'Game socket failed to connect'));
+        });
+        return this._open;
+    }
+
+    _receive([id, status, body]) {
+        if (id === PUSH_ID) {
+            if (status === 'upcoming') body.rooms.forEach(decodeRoom);
+            this.onPush?.(status, body);
+            return;
+        }
+        const call = this._pending.get(id);
+        if (!call) return;
+        this._pending.delete(id);
+        if (status >= 200 && status < 300) call.resolve(body);
+        else call.reject(new GameApiError(status, body?.error ?? body?.detail ?? `HTTP ${status}`));
+    }
+
+    async _call(op, payload = {}) {
+        const socket = await this._connect();
+        const id     = this._nextId++;
+        return new Promise((resolve, reject) => {
+            this._pending.set(id, { resolve, reject });
+            socket.send(JSON.stringify([id, op, payload]));
+        });
+    }
+
+    close() {
+        this._socket?.close();
+    }
+
+    async generateRoom(roomsCleared = 0, roomType = null) {
+        return decodeRoom(await this._call('room', { rooms_cleared: roomsCleared, room_type: roomType }));
+    }
+
+    async startRun(seed = null) {
+        const res = await this._call('run', seed === null ? {} : { seed });
+        decodeRoom(res.room);
+        return res;
+    }
+
+    async generateRooms(from, count, runId = null) {
+        const payload = { from, count };
+        if (runId) payload.run_id = runId;
+        const res = await this._call('rooms', payload);
+        res.rooms.forEach(decodeRoom);
+        return res;
+    }
+
+    async nextRoom({
+        playerHealth, playerMaxHealth = 100, roomsCleared, coinsEarned = 0,
+        currentRoom = null, roomType = null, runId = null, killed = null, includeRooms = true,
+        deltaFrom = null,
+    }) {
+        const body = {
+            player_health:      playerHealth,
+            player_max_health:  playerMaxHealth,
+            rooms_cleared:      roomsCleared,
+            coins_earned:       coinsEarned,
+            room_type:          roomType,
+        };
+        if (runId) {
+            body.run_id = runId;
+            body.killed = killed ?? [];
+        } else {
+            body.current_room = currentRoom;
+        }
+        if (!includeRooms) body.include_rooms = false;
+        if (deltaFrom) body.delta = true;
+
+        const res = await this._call('next', body);
+        if (res.cleared_room_patch) res.cleared_room = applyRoomPatch(deltaFrom, res.cleared_room_patch);
+        else decodeRoom(res.cleared_room);
+        decodeRoom(res.next_room);
+        return res;
+    }
+
+    async killEnemy(enemyId, coinReward) {
+        return this._call('kill', { enemy_id: enemyId, coin_reward: coinReward });
+    }
+
+    async combatEvents(runId, events) {
+        return this._call('combat', { run_id: runId, events });
+    }
+
+    async leaveRoom(roomOrRun, { deltaFrom = null } = {}) {
+        const body = roomOrRun?.runId
+            ? { run_id: roomOrRun.runId, killed: roomOrRun.killed ?? [] }
+            : { room: roomOrRun };
+        if (deltaFrom) body.delta = true;
+        const res = await this._call('leave', body);
+        if (res.cleared_room_patch) res.cleared_room = applyRoomPatch(deltaFrom, res.cleared_room_patch);
+        else decodeRoom(res.cleared_room);
+        return res;
+    }
+
+    async generateEnemy(roomsCleared = 0) {
+        return this._call('enemy', { rooms_cleared: roomsCleared });
+    }
+
+    async leaderboard(limit = 10) {
+        return this._call('board', { limit });
+    }
+}
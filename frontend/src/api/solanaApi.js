@@ -99,17 +99,38 @@ export async function sendPayment(playerAddress) {
 
 // ── Backend calls ─────────────────────────────────────────────────────────────
 
-export async function verifyPayment(signature, reference) {
+/**
+ * Submit a payment signature and wait for the backend to verify it.
+ * The backend answers 202 with a verification id straight away and checks
+ * the chain in the background; we poll the status endpoint until done.
+ */
+export async function verifyPayment(signature, reference, { pollMs = 1000, timeoutMs = 60000 } = {}) {
     const res  = await fetch(`${BASE_URL}/user/recieve_payment/`, {
         method:  'POST',
         headers: { 'Content-Type': 'application/json' },
         body:    JSON.stringify({ signature, reference }),
     });
-    const data = await res.json();
+    let data = await res.json();
     if (!res.ok) throw new Error(data.error ?? `Server error ${res.status}`);
+
+    const deadline = Date.now() + timeoutMs;
+    while (data.pending) {
+        if (Date.now() > deadline) throw new Error('Payment verification timed out.');
+        await new Promise(r => setTimeout(r, pollMs));
+
+        const poll = await fetch(`${BASE_URL}/user/payment_status/${data.verification_id}/`);
+        data       = await poll.json();
+        if (!poll.ok) throw new Error(data.error ?? `Server error ${poll.status}`);
+    }
+
+    if (!data.success) throw new Error(data.error ?? 'Payment verification failed.');
     return data;
 }
 
+/**
+ * Queue a refund. The backend answers 202 with a payout_id; the transfer is
+ * sent in a batch shortly after — use payoutStatus() to follow it.
+ */
 export async function requestRefund(userAddress, coinsEarned = 0) {
     const res  = await fetch(`${BASE_URL}/user/return_payment/`, {
         method:  'POST',
@@ -119,4 +140,25 @@ export async function requestRefund(userAddress, coinsEarned = 0) {
     const data = await res.json();
     if (!res.ok) throw new Error(data.error ?? `Refund error ${res.status}`);
     return data;
-}
\ No newline at end of file
+}
+
+export async function payoutStatus(payoutId) {
+    const res  = await fetch(`${BASE_URL}/user/payout_status/${payoutId}/`);
+    const data = await res.json();
+    if (!res.ok) throw new Error(data.error ?? `Payout status error ${res.status}`);
+    return data;
+}
+
+/**
+ * One page of a wallet's transaction history, newest first. Pass the
+ * returned next_cursor back to get the following page (null when done).
+ */
+export async function transactionHistory(wallet, { cursor = null, type = null, limit = 50 } = {}) {
+    const params = new URLSearchParams({ wallet, limit: String(limit) });
+    if (cursor) params.set('cursor', cursor);
+    if (type)   params.set('type', type);
+    const res  = await fetch(`${BASE_URL}/user/transactions/?${params}`);
+    const data = await res.json();
+    if (!res.ok) throw new Error(data.error ?? `History error ${res.status}`);
+    return data;
+}
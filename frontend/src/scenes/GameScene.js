@@ -30,6 +30,11 @@ const SLASH_DAMAGE = 15;
 const ENEMY_MOVE_SPEED = { grunt: 0.6, brute: 0.4, boss: 0.8 };
 const ENEMY_MOVE_INTERVAL = { grunt: 2000, brute: 3000, boss: 1500 };
 
+// Within this many tiles of the player, enemies drift straight at them;
+// further away they follow the room's flow fields (layout.flow_fields).
+const ENEMY_CHASE_TILES = 3;
+const FLOW_STEPS = { N: [0, -1], E: [1, 0], S: [0, 1], W: [-1, 0] };
+
 export class GameScene extends Phaser.Scene {
     constructor() {
         super('GameScene');
@@ -314,6 +319,10 @@ export class GameScene extends Phaser.Scene {
         this._setExitsVisible(layout.exits_open);
         this.currentExitPoints = layout.exit_points;
 
+        // ── Pathfinding: server-precomputed step tables ──────────────────
+        this.flowFields = layout.flow_fields ?? null;
+        this.spawnPoint = layout.spawn_point;
+
         // ── HUD ──────────────────────────────────────────────────────────
         this._updateHUD();
         this._showLoadingOverlay(false);
@@ -435,6 +444,40 @@ export class GameScene extends Phaser.Scene {
         return { x, y };
     }
 
+    /**
+     * The flow field toward whichever target (spawn or exits) the player is
+     * nearer, so distant enemies converge on the player's side of the room.
+     */
+    _playerFlowField() {
+        if (!this.flowFields) return null;
+        const col  = Math.floor(this.player.x / TILE_SIZE);
+        const row  = Math.floor(this.player.y / TILE_SIZE);
+        const dist = (p) => Math.abs(p.x - col) + Math.abs(p.y - row);
+        const toExit = Math.min(...(this.currentExitPoints ?? []).map(dist));
+        return toExit < dist(this.spawnPoint) ? this.flowFields.exits : this.flowFields.spawn;
+    }
+
+    /** Where an enemy moves next: a table lookup, no per-frame pathfinding. */
+    _nextEnemyStep(e, flow) {
+        const { x, y } = e.sprite;
+        const near = Phaser.Math.Distance.Between(x, y, this.player.x, this.player.y)
+            < ENEMY_CHASE_TILES * TILE_SIZE;
+
+        const step = !near && FLOW_STEPS[flow?.[Math.floor(y / TILE_SIZE)]?.[Math.floor(x / TILE_SIZE)]];
+        if (step) {
+            return {
+                x: (Math.floor(x / TILE_SIZE) + step[0]) * TILE_SIZE + TILE_SIZE / 2,
+                y: (Math.floor(y / TILE_SIZE) + step[1]) * TILE_SIZE + TILE_SIZE / 2,
+            };
+        }
+
+        // Close by (or no field): drift straight at the player
+        const angle = Phaser.Math.Angle.Between(x, y, this.player.x, this.player.y);
+        const nx    = x + Math.cos(angle) * TILE_SIZE * 0.8;
+        const ny    = y + Math.sin(angle) * TILE_SIZE * 0.8;
+        return this.isWall(nx, ny) ? null : { x: nx, y: ny };
+    }
+
     _getFloorTiles() {
         const tiles = [];
         if (!this.matrix) return tiles;
@@ -589,24 +632,19 @@ export class GameScene extends Phaser.Scene {
         this.player.setAngle(this.lastAngle);
 
         // ── Enemy AI ─────────────────────────────────────────────────────
+        const flow = this._playerFlowField();
         for (const e of this.enemies) {
             if (!e.sprite || e.isDead) continue;
 
-            // Lazy movement: drift toward player periodically
+            // Lazy movement: step toward the player periodically
             const interval = ENEMY_MOVE_INTERVAL[e.data.type] ?? 2000;
             if (time > e.lastMove + interval) {
                 e.lastMove = time;
-                const angleToPlayer = Phaser.Math.Angle.Between(
-                    e.sprite.x, e.sprite.y, this.player.x, this.player.y
-                );
-                const spd = ENEMY_MOVE_SPEED[e.data.type] ?? 0.6;
-                const nx  = e.sprite.x + Math.cos(angleToPlayer) * TILE_SIZE * 0.8;
-                const ny  = e.sprite.y + Math.sin(angleToPlayer) * TILE_SIZE * 0.8;
-                // Tween to new position if not a wall
-                if (!this.isWall(nx, ny)) {
+                const next = this._nextEnemyStep(e, flow);
+                if (next) {
                     this.tweens.add({
                         targets:  e.sprite,
-                        x: nx, y: ny,
+                        x: next.x, y: next.y,
                         duration: interval * 0.8,
                         ease: 'Linear',
                     });
@@ -666,6 +704,7 @@ export class GameScene extends Phaser.Scene {
 
                     const dmg = 10;
                     e.hp -= dmg;
+                    this.gm.recordDamage(e.data, dmg);
                     this._showDamageNumber(e.sprite.x, e.sprite.y, dmg);
                     this._knockback(e, b.vx, b.vy);
 